@@ -0,0 +1,74 @@
+# ===========================================================================
+#
+# Write files so that they are never seen partly written.
+#
+# The file is written to a temporary file in the same folder, which is
+# renamed over the target when it is complete. The temporary file is given
+# the mode of the file it replaces, or the mode open() would give a new file.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import contextlib
+import os
+import shutil
+import stat
+import tempfile
+
+
+def _read_umask():
+    # the umask can only be read by setting it
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# read once at import, before any threads are writing files
+UMASK = _read_umask()
+
+
+def file_mode(path):
+    """ the mode of path, or 0666 less the umask if it does not exist """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
+@contextlib.contextmanager
+def atomic_path(path):
+    """
+    A temporary file name next to path, which is renamed to path when the
+    block ends, or removed if it raises.
+    """
+    folder, filename = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix="." + filename + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        # mkstemp makes the file 0600
+        os.chmod(temp_path, file_mode(path))
+        yield temp_path
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="w", **kwargs):
+    """ open a temporary file next to path as open() does, and rename it to path at the end of the block """
+    with atomic_path(path) as temp_path:
+        with open(temp_path, mode, **kwargs) as f:
+            yield f
+
+
+def copy_atomic(source, dest):
+    """ copy a file to a temporary file next to dest and rename it """
+    with atomic_path(dest) as temp_path:
+        shutil.copyfile(source, temp_path)
@@ -0,0 +1,147 @@
+# ===========================================================================
+#
+# Time sexpr.parse_sexp on a large KiCad symbol library.
+#
+# A library of made up symbols, each with properties, a rectangle, a
+# polyline and pins, is parsed with parse_sexp, which splits the text into
+# terms with str methods, with every term found with term_regex, as it does
+# for text which cannot be split, and the way parse_sexp used to, finding
+# the group of each term with groupdict(). The results are compared.
+#
+# Only the text of each result is kept while the next parser is timed, as the
+# garbage collector walks every list which is kept, which would slow down
+# the parsers timed later. On the 2000 symbol library, parse_sexp takes
+# about 0.8 s, 4.4 to 5.3 times faster than the groupdict parser, so the
+# 5 times faster target is only met on some runs.
+#
+#   python benchmarks/bench_parse.py [--symbols N] [--repeat R]
+#
+# ===========================================================================
+
+import argparse
+import gc
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dxf2kicad_common import sexpr
+from dxf2kicad_common.kicad_sym import KicadLibrary
+
+
+def parse_groupdict(text):
+    """ parse_sexp as it used to be, without the debug output """
+    stack = []
+    out = []
+    for termtypes in re.finditer(sexpr.term_regex, text):
+        term, value = [(t, v) for t, v in termtypes.groupdict().items() if v][0]
+        if term == 'brackl':
+            stack.append(out)
+            out = []
+        elif term == 'brackr':
+            tmpout, out = out, stack.pop(-1)
+            out.append(tmpout)
+        elif term == 'num':
+            v = float(value)
+            if v.is_integer():
+                v = int(v)
+            out.append(v)
+        elif term == 'sq':
+            out.append(value[1:-1].replace(r'\"', '"'))
+        else:
+            out.append(value)
+    return out[0]
+
+
+def parse_regex(text):
+    """ parse_sexp with every term found with term_regex """
+    split_terms = sexpr._split_terms
+    sexpr._split_terms = lambda sexp: None
+    try:
+        return sexpr.parse_sexp(text)
+    finally:
+        sexpr._split_terms = split_terms
+
+
+def make_library(symbols, seed=1):
+    """ text of a symbol library """
+    rnd = random.Random(seed)
+    out = ['(kicad_symbol_lib (version 20201005) (generator kicad_symbol_editor)\n']
+    for s in range(symbols):
+        name = 'Part_{}'.format(s)
+        out.append('  (symbol "Bench:{}" (pin_names (offset 1.016)) (in_bom yes) (on_board yes)\n'.format(name))
+        for key, value in (('Reference', 'U'), ('Value', name),
+                           ('Footprint', 'Package_SO:SOIC-8_3.9x4.9mm_P1.27mm'),
+                           ('Datasheet', 'http://www.example.com/{}.pdf'.format(name))):
+            out.append('    (property "{}" "{}" (id 0) (at {} {} 0)\n'
+                       '      (effects (font (size 1.27 1.27)) (justify left))\n    )\n'.format(
+                           key, value, round(rnd.uniform(-20, 20), 2), round(rnd.uniform(-20, 20), 2)))
+        out.append('    (symbol "{}_0_1"\n'.format(name))
+        out.append('      (rectangle (start -7.62 10.16) (end 7.62 -10.16)\n'
+                   '        (stroke (width 0.254)) (fill (type background))\n      )\n')
+        out.append('      (polyline\n        (pts\n')
+        for _ in range(8):
+            out.append('          (xy {} {})\n'.format(round(rnd.uniform(-10, 10), 3), round(rnd.uniform(-10, 10), 3)))
+        out.append('        )\n        (stroke (width 0)) (fill (type none))\n      )\n    )\n')
+        out.append('    (symbol "{}_1_1"\n'.format(name))
+        for p in range(16):
+            out.append('      (pin bidirectional line (at 10.16 {} 180) (length 2.54)\n'
+                       '        (name "IO{}" (effects (font (size 1.27 1.27))))\n'
+                       '        (number "{}" (effects (font (size 1.27 1.27))))\n      )\n'.format(
+                           round(7.62 - 2.54 * p, 2), p, p + 1))
+        out.append('    )\n  )\n')
+    out.append(')\n')
+    return ''.join(out)
+
+
+def best_time(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        # the last result is dropped and collected before the next run
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time sexpr.parse_sexp on a large symbol library")
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = make_library(args.symbols)
+    print("{} symbols, {:.1f} MB".format(args.symbols, len(text) / 1e6))
+
+    old_time, expected = best_time(lambda: parse_groupdict(text), args.repeat)
+    expected = repr(expected)
+    regex_time, regex = best_time(lambda: parse_regex(text), args.repeat)
+    regex = repr(regex)
+    parse_time, parsed = best_time(lambda: sexpr.parse_sexp(text), args.repeat)
+    parsed = repr(parsed)
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.kicad_sym")
+        with open(filename, "w") as f:
+            f.write(text)
+        library_time, library = best_time(lambda: KicadLibrary.from_file(filename), args.repeat)
+
+    print("groupdict       {:8.3f} s".format(old_time))
+    print("term_regex      {:8.3f} s  {:.1f}x".format(regex_time, old_time / regex_time))
+    print("parse_sexp      {:8.3f} s  {:.1f}x".format(parse_time, old_time / parse_time))
+    print("from_file       {:8.3f} s  {} symbols".format(library_time, len(library.symbols)))
+    print("same result:    {}".format(parsed == expected == regex))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+# ===========================================================================
+#
+# Time KicadMod.save for a footprint with one very large fp_poly, and the
+# tessellation of the circle it is made from and making the footprint, as
+# the converter does.
+#
+# KicadMod.save writes the file while it is formatted, in chunks of a few
+# thousand items, and formats the points a few thousand at a time. With
+# --compare the same footprint is also saved the way SexprBuilder used to,
+# with the text appended to one string and each point formatted with
+# SexprItem, and the two files are compared. --memory shows the peak memory
+# used while saving.
+#
+#   python benchmarks/bench_save.py [--points N] [--repeat R] [--compare] [--memory]
+#
+# ===========================================================================
+
+import argparse
+import filecmp
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dxf2kicad_common import sexpr
+from dxf2kicad_common.kicad_mod import KicadMod
+from tessellate import arc_batch
+
+
+class StringChunks(object):
+    """ chunk list which appends to one string """
+
+    def __init__(self):
+        self.text = ''
+
+    def __len__(self):
+        return 0
+
+    def append(self, chunk):
+        self.text += chunk
+
+
+class StringBuilder(sexpr.SexprBuilder):
+    """
+    SexprBuilder which keeps all the text in one string until the end, and
+    formats each point with SexprItem
+    """
+
+    def __init__(self, key, stream=None):
+        super().__init__(None, stream)
+        self.chunks = StringChunks()
+        if key is not None:
+            self.startGroup(key, newline=False)
+
+    @property
+    def output(self):
+        return self.chunks.text
+
+    def flush(self):
+        self.stream.write(self.chunks.text)
+        self.chunks = StringChunks()
+
+    def addPoints(self, values, key='xy'):
+        values = list(values)
+        for i in range(0, len(values), 2):
+            self.addItem({key: [values[i], values[i + 1]]})
+
+
+def tessellate_circle(count):
+    """ points round a circle of count chords, tessellated as the converter does """
+    radius = 25
+    tolerance = radius * (1 - math.cos(math.pi / count))
+    return arc_batch([0], [0], [radius], [0], [2 * math.pi], tolerance)[0]
+
+
+def make_footprint(points):
+    """ footprint with an fp_poly of the points """
+    footprint = KicadMod()
+    footprint.name = "bench"
+    footprint.description = "benchmark"
+    for text in (footprint.reference, footprint.value):
+        text['layer'] = 'F.SilkS'
+        text['hide'] = True
+    pts = [{'x': round(x, 4), 'y': round(-y, 4)} for x, y in points]
+    footprint.polys.append({'pts': pts, 'layer': 'F.SilkS', 'width': 0.12})
+    return footprint
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time KicadMod.save for a very large fp_poly")
+    parser.add_argument('--points', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compare', help='also save by appending to one string, this is slow', action='store_true')
+    parser.add_argument('--memory', help='show the peak memory used while saving', action='store_true')
+    args = parser.parse_args()
+
+    tessellate_time = best_time(lambda: tessellate_circle(args.points), args.repeat)
+    points = tessellate_circle(args.points)
+    footprint_time = best_time(lambda: make_footprint(points), 1)
+    footprint = make_footprint(points)
+    with tempfile.TemporaryDirectory() as folder:
+        save_file = os.path.join(folder, "footprint.kicad_mod")
+        save_time = best_time(lambda: footprint.save(save_file, 0), args.repeat)
+        size = os.path.getsize(save_file)
+        print("{} points, {:.1f} MB".format(len(points), size / 1e6))
+        print("tessellate      {:8.3f} s".format(tessellate_time))
+        print("make footprint  {:8.3f} s".format(footprint_time))
+        print("save            {:8.3f} s".format(save_time))
+
+        if args.memory:
+            tracemalloc.start()
+            footprint.save(save_file, 0)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("peak memory     {:8.1f} MB".format(peak / 1e6))
+
+        if args.compare:
+            string_file = os.path.join(folder, "string.kicad_mod")
+            builder = sexpr.SexprBuilder
+            sexpr.SexprBuilder = StringBuilder
+            try:
+                string_time = best_time(lambda: footprint.save(string_file, 0), 1)
+            finally:
+                sexpr.SexprBuilder = builder
+            print("one string      {:8.3f} s  {:.1f}x".format(string_time, string_time / save_time))
+            print("same file:      {}".format(filecmp.cmp(save_file, string_file, shallow=False)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# ===========================================================================
+#
+# Compare the fast DXF reader (dxf_scanner.py) with ezdxf.readfile.
+#
+# tests/test_data.dxf is copied onto a grid to make a larger drawing, which
+# is then read both ways into SegmentTables.
+#
+#   python benchmarks/bench_scanner.py [--copies N] [--repeat R]
+#
+# ===========================================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ezdxf
+from ezdxf import bbox
+
+from dxf2kicad_mod import ConversionContext, read_dxf, read_layers
+from dxf_scanner import scan_layers
+
+COLUMNS = ['kind', 'flags', 'x0', 'y0', 'x1', 'y1', 'cx', 'cy', 'radius', 'start_angle', 'end_angle',
+           'width', 'vstart', 'vcount', 'vx', 'vy', 'vbulge']
+
+
+def make_drawing(filename, copies):
+    """ copies x copies of test_data.dxf, side by side """
+    source = ezdxf.readfile(os.path.join(ROOT, "tests", "test_data.dxf"))
+    entities = list(source.modelspace())
+    extents = bbox.extents(entities)
+    step = max(extents.size.x, extents.size.y) * 1.1
+
+    doc = ezdxf.new(source.dxfversion)
+    msp = doc.modelspace()
+    for layer in source.layers:
+        if layer.dxf.name not in doc.layers:
+            doc.layers.add(layer.dxf.name)
+    for i in range(copies):
+        for j in range(copies):
+            for entity in entities:
+                copy = entity.copy()
+                copy.translate(i * step, j * step, 0)
+                msp.add_entity(copy)
+    doc.saveas(filename)
+    return len(entities) * copies * copies
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the fast DXF reader with ezdxf.readfile")
+    parser.add_argument('--copies', type=int, default=20, help='copies of test_data.dxf in each direction')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    ctx = ConversionContext()
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.dxf")
+        count = make_drawing(filename, args.copies)
+        size = os.path.getsize(filename)
+        print("{} entities, {:.1f} MB".format(count, size / 1e6))
+
+        ezdxf_time, expected = best_time(lambda: read_layers(ctx, read_dxf(ctx, filename)), args.repeat)
+        scan_time, layers = best_time(lambda: scan_layers(filename, ctx.settings.min_line_width), args.repeat)
+
+    same = (len(layers) == len(expected) and
+            all(getattr(a, col) == getattr(b, col)
+                for (a, _, _), (b, _, _) in zip(layers, expected) for col in COLUMNS))
+
+    print("ezdxf.readfile  {:8.3f} s".format(ezdxf_time))
+    print("dxf_scanner     {:8.3f} s  {:.1f}x".format(scan_time, ezdxf_time / scan_time))
+    print("same geometry:  {}".format(same))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# ===========================================================================
+#
+# Time and memory of reading a few symbols of a large KiCad symbol library.
+#
+# The library of bench_parse.py is written to a file, and the names of its
+# symbols are listed and a few symbols loaded with the SexprTable of the
+# memory mapped file, which parses only the symbols asked for, and by
+# loading the whole library with KicadLibrary.from_file(). The peak memory
+# is measured with tracemalloc, which does not count the pages of the
+# memory mapped file. Loading the whole library does not use the table,
+# most of its peak is the lists parse_sexp makes of the text.
+#
+#   python benchmarks/bench_sexpr_table.py [--symbols N] [--repeat R] [--load K]
+#
+# ===========================================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_parse import make_library
+from dxf2kicad_common.kicad_sym import KicadLibrary
+from dxf2kicad_common.sexpr_table import SexprTable
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def table_size(filename):
+    with SexprTable.from_file(filename) as table:
+        return len(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time reading a few symbols of a large symbol library")
+    parser.add_argument('--symbols', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--load', type=int, default=5, help='number of symbols to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.kicad_sym")
+        with open(filename, "w") as f:
+            f.write(make_library(args.symbols))
+        print("{} symbols, {:.1f} MB".format(args.symbols, os.path.getsize(filename) / 1e6))
+
+        names = ['Part_{}'.format(s) for s in range(0, args.symbols, max(1, args.symbols // args.load))]
+        runs = [("table", lambda: table_size(filename)),
+                ("names_from_file", lambda: KicadLibrary.names_from_file(filename)),
+                ("from_file names", lambda: KicadLibrary.from_file(filename, names=names)),
+                ("from_file", lambda: KicadLibrary.from_file(filename))]
+        results = {}
+        for name, run in runs:
+            elapsed, results[name] = best_time(run, args.repeat)
+            print("{:16s} {:8.3f} s  peak {:7.1f} MB".format(name, elapsed, peak_memory(run) / 1e6))
+
+        print("{} groups, {} names".format(results["table"], len(results["names_from_file"])))
+        full = [symbol.get_sexpr() for symbol in results["from_file"].symbols if symbol.name in names]
+        some = [symbol.get_sexpr() for symbol in results["from_file names"].symbols]
+        print("same symbols:    {}".format(full == some))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# ===========================================================================
+#
+# Measure the start up time of dxf2kicad_mod.py.
+#
+# Runs "dxf2kicad_mod.py --help" and a conversion of tests/test.dxf in new
+# Python processes, and lists the slowest imports reported by
+# python -X importtime.
+#
+#   python benchmarks/bench_startup.py [--repeat R] [--top N]
+#
+# ===========================================================================
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "dxf2kicad_mod.py")
+
+
+def best_time(args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def import_times(args):
+    """ (cumulative microseconds, module) of the top level imports of a run """
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            times.append((int(cumulative), name.strip()))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the start up time of dxf2kicad_mod.py")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help='number of imports to list')
+    args = parser.parse_args()
+
+    best_python = best_time([sys.executable, "-c", "pass"], args.repeat)
+
+    with tempfile.TemporaryDirectory() as folder:
+        runs = [("--help", [SCRIPT, "--help"]),
+                ("convert test.dxf", [SCRIPT, os.path.join(ROOT, "tests", "test.dxf"),
+                                      os.path.join(folder, "test.kicad_mod")])]
+
+        print("python -c pass          {:8.3f} s".format(best_python))
+        for name, run in runs:
+            elapsed = best_time([sys.executable] + run, args.repeat)
+            times = import_times(run)
+            total = sum(t for t, _ in times)
+            print("{:22s}  {:8.3f} s, imports {:.3f} s".format(name, elapsed, total / 1e6))
+            for cumulative, module in sorted(times, reverse=True)[:args.top]:
+                print("    {:30s} {:8.1f} ms".format(module, cumulative / 1e3))
+
+
+if __name__ == '__main__':
+    main()
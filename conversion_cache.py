@@ -0,0 +1,148 @@
+# ===========================================================================
+#
+# On-disk cache of converted footprints.
+#
+# Footprints are stored under a key made from everything the conversion
+# depends on (see cache_key() in dxf2kicad_mod.py), so an unchanged DXF file
+# is not read or converted again.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import hashlib
+import os
+import threading
+
+from atomic_file import copy_atomic
+
+# default size limit of the cache folder, in bytes
+DEFAULT_CACHE_SIZE = 500 * 1024 * 1024
+
+CACHE_SUFFIX = ".kicad_mod"
+
+# when the cache is over its size limit, entries are removed until it is
+# below this fraction of it, so that it is not walked again for a while
+EVICT_TO = 0.9
+
+# estimated size of each cache folder in this process, the size when it was
+# last walked plus the entries added since. It is kept here and not in the
+# ConversionCache, which is pickled to the batch workers with every file.
+_sizes = {}
+_sizes_lock = threading.Lock()
+
+
+def file_digest(filename):
+    """ sha256 of the contents of a file, as hex """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """ a cache key from strings """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ConversionCache(object):
+    """
+    Footprint files stored by key in a folder.
+
+    When the folder holds more than max_size bytes the least recently used
+    entries are removed. Entries are only ever added by renaming a complete
+    file into place, so any number of processes can share the folder; an
+    entry removed by another process while being read is just a miss.
+
+    The folder is only walked to find its size when a process adds its
+    first entry, and when the size it has estimated since then is over
+    max_size. The estimate does not include entries added by other
+    processes, so a shared folder can be over max_size by what they have
+    added since their last walk.
+    """
+
+    def __init__(self, folder, max_size=DEFAULT_CACHE_SIZE):
+        self.folder = folder
+        self.max_size = max_size
+
+    def path(self, key):
+        return os.path.join(self.folder, key[:2], key + CACHE_SUFFIX)
+
+    def get(self, key, dest):
+        """ copy the entry for key to dest, returns False if there is none """
+        path = self.path(key)
+        try:
+            copy_atomic(path, dest)
+        except FileNotFoundError:
+            return False
+
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True
+
+    def put(self, key, source):
+        """ store a copy of the file source as the entry for key """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        copy_atomic(source, path)
+
+        folder = os.path.abspath(self.folder)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            # already removed by another process
+            size = 0
+        with _sizes_lock:
+            total = _sizes.get(folder)
+            if total is not None:
+                total += size
+                _sizes[folder] = total
+        if total is None or total > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """ if the cache is over max_size, remove the least recently used entries until it is under EVICT_TO of it """
+        entries = []
+        total = 0
+        for folder, dirs, files in os.walk(self.folder):
+            for name in files:
+                if not name.endswith(CACHE_SUFFIX):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total > self.max_size:
+            entries.sort()
+            for mtime, size, path in entries:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # already removed by another process
+                    pass
+                except OSError:
+                    # in use
+                    continue
+                total -= size
+                if total <= self.max_size * EVICT_TO:
+                    break
+
+        with _sizes_lock:
+            _sizes[os.path.abspath(self.folder)] = total
@@ -0,0 +1,211 @@
+# ===========================================================================
+#
+# Local conversion server, for build systems which convert many files.
+#
+# Starting Python and importing ezdxf takes longer than converting a small
+# footprint, so the server keeps a pool of worker processes with everything
+# loaded, and converts the files sent to it over HTTP on localhost. Use
+# dxf2kicad_client.py to send it files.
+#
+#   POST /convert   {"dxf": path, "name": footprint name, "settings": {...}, "options": {...}}
+#                   returns {"footprint": text, "queued": seconds, "converted": seconds}
+#   GET /status     returns the counts of requests
+#
+# "settings" is in the format of a settings file, and "options" can have
+# "native_arcs", "units", "fast" and "tedit", as on the command line.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dxf2kicad_mod import ConversionContext, DxfConverter, Settings, Units, load_layers
+
+DEFAULT_PORT = 8421
+
+# requests waiting for a worker, more are refused
+DEFAULT_QUEUE_SIZE = 256
+
+
+def make_context(settings=None, options=None):
+    """ ConversionContext for the settings and options of a request """
+    options = options or {}
+    settings = Settings(settings) if settings else Settings()
+    if options.get("native_arcs"):
+        settings.native_arcs = True
+    if str(options.get("units", "mm")).lower() == Units.MIL.value:
+        settings.use_mil()
+    return ConversionContext(settings, fast=bool(options.get("fast")), tedit=options.get("tedit"))
+
+
+def convert_job(dxf_path, name, settings, options):
+    """ convert a DXF file in a worker process, returns (footprint file text, seconds taken) """
+    start = time.perf_counter()
+    ctx = make_context(settings, options)
+    if not name:
+        name = os.path.splitext(os.path.basename(dxf_path))[0]
+
+    # the same as convert_file() writing name.kicad_mod
+    dxf, layers = load_layers(ctx, dxf_path)
+    footprint = DxfConverter(dxf, ctx).convert(name, "Converted from " + name + ".kicad_mod", layers)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "footprint.kicad_mod")
+        footprint.save(path, ctx.tedit)
+        with open(path, "r", newline="") as f:
+            text = f.read()
+    return text, time.perf_counter() - start
+
+
+class RequestError(Exception):
+    """ a request which can't be converted, with the HTTP status to return """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ConversionServer(ThreadingHTTPServer):
+    """
+    HTTP server which hands conversions to a pool of jobs worker processes.
+    Each request waits in its own thread, up to queue_size of them, and any
+    more are refused with 503.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, jobs=None, queue_size=DEFAULT_QUEUE_SIZE, verbose=0):
+        super().__init__(address, ConversionHandler)
+        self.jobs = jobs or os.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+        self.queue_size = queue_size
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.verbose = verbose
+
+        self.lock = threading.Lock()
+        self.counts = {"waiting": 0, "converted": 0, "failed": 0, "refused": 0}
+
+    def count(self, name, change=1):
+        with self.lock:
+            self.counts[name] += change
+
+    def status(self):
+        with self.lock:
+            status = dict(self.counts)
+        status["workers"] = self.jobs
+        status["queue_size"] = self.queue_size
+        return status
+
+    def convert(self, request):
+        """ convert the file of a request, returns the response """
+        dxf_path = request.get("dxf")
+        if not isinstance(dxf_path, str) or not os.path.isabs(dxf_path):
+            raise RequestError(400, "'dxf' must be an absolute path")
+        if not os.path.isfile(dxf_path):
+            raise RequestError(404, "no file {}".format(dxf_path))
+
+        if not self.slots.acquire(blocking=False):
+            self.count("refused")
+            raise RequestError(503, "too many requests waiting")
+        try:
+            self.count("waiting")
+            start = time.perf_counter()
+            future = self.pool.submit(convert_job, dxf_path, request.get("name"),
+                                      request.get("settings"), request.get("options"))
+            try:
+                text, converted = future.result()
+            except Exception as ex:
+                self.count("failed")
+                raise RequestError(500, "{}: {}".format(type(ex).__name__, ex))
+            finally:
+                self.count("waiting", -1)
+        finally:
+            self.slots.release()
+
+        self.count("converted")
+        total = time.perf_counter() - start
+        return {"footprint": text, "queued": max(0.0, total - converted), "converted": converted}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self.send_json(200, self.server.status())
+        else:
+            self.send_json(404, {"error": "unknown path {}".format(self.path)})
+
+    def do_POST(self):
+        if self.path != "/convert":
+            self.send_json(404, {"error": "unknown path {}".format(self.path)})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length).decode("utf-8"))
+            except ValueError:
+                raise RequestError(400, "the request is not JSON")
+            if not isinstance(request, dict):
+                raise RequestError(400, "the request is not a JSON object")
+            response = self.server.convert(request)
+        except RequestError as ex:
+            self.log_message("%s: %s", ex.status, ex)
+            self.send_json(ex.status, {"error": str(ex)})
+            return
+
+        self.log_message("%s: queued %.3f s, converted %.3f s",
+                         request["dxf"], response["queued"], response["converted"])
+        self.send_json(200, response)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve DXF to KiCad footprint conversions on localhost')
+    parser.add_argument('-p', '--port', help='Port to listen on. Default is {}.'.format(DEFAULT_PORT), type=int, default=DEFAULT_PORT)
+    parser.add_argument('-j', '--jobs', help='Number of worker processes. Default is the number of CPUs.', type=int)
+    parser.add_argument('-q', '--queue-size', help='Number of requests which can wait for a worker. Default is {}.'.format(DEFAULT_QUEUE_SIZE), type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument('-v', '--verbose', help='Log each request', action='count')
+    args = parser.parse_args()
+
+    server = ConversionServer(("127.0.0.1", args.port), args.jobs, args.queue_size, args.verbose)
+    print("Serving on http://127.0.0.1:{} with {} workers, press Ctrl+C to stop".format(args.port, server.jobs))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# ===========================================================================
+#
+# Client for conversion_server.py.
+#
+# Sends a DXF file name to a running server and writes the footprint it
+# returns. Only uses the standard library, so it starts quickly.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+from atomic_file import atomic_write
+
+DEFAULT_PORT = 8421
+
+
+class ConversionError(Exception):
+    """ the server could not convert the file """
+
+
+def request_conversion(dxf_path, name=None, settings=None, options=None, port=DEFAULT_PORT, timeout=None):
+    """
+    Ask the server on localhost to convert a DXF file. settings is a dict as in
+    a settings file, and options as described in conversion_server.py.
+    Returns the response, with the footprint file text in "footprint".
+    """
+    request = {"dxf": os.path.abspath(dxf_path), "name": name, "settings": settings, "options": options or {}}
+    data = json.dumps(request).encode("utf-8")
+    http_request = urllib.request.Request("http://127.0.0.1:{}/convert".format(port), data,
+                                          {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as ex:
+        try:
+            message = json.loads(ex.read().decode("utf-8"))["error"]
+        except (ValueError, KeyError):
+            message = str(ex)
+        raise ConversionError(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a DXF file to a KiCad footprint with a running conversion_server.py')
+    parser.add_argument('DXF_file', help="DXF file")
+    parser.add_argument('footprint_file', help="KiCad footprint file name", nargs='?')
+    parser.add_argument('-u', '--units', help='File units: MM or MIL.', default="mm")
+    parser.add_argument('-a', '--native-arcs', help='Output unconnected arcs as fp_arc/fp_circle instead of line segments.', action='store_true')
+    parser.add_argument('-f', '--fast', help='Read simple ASCII DXF files with a fast built-in reader.', action='store_true')
+    parser.add_argument('--settings', help='JSON settings file.')
+    parser.add_argument('--deterministic', help='Write the same tedit timestamp every time: $SOURCE_DATE_EPOCH, or 0 if not set.', action='store_true')
+    parser.add_argument('-p', '--port', help='Port of the server. Default is {}.'.format(DEFAULT_PORT), type=int, default=DEFAULT_PORT)
+    parser.add_argument('-v', '--verbose', help='Show the time taken.', action='store_true')
+    args = parser.parse_args()
+
+    footprint_file = args.footprint_file
+    if not footprint_file:
+        footprint_file = os.path.splitext(os.path.basename(args.DXF_file))[0] + ".kicad_mod"
+
+    settings = None
+    if args.settings:
+        with open(args.settings, "r") as f:
+            settings = json.load(f)
+
+    options = {"units": args.units, "native_arcs": args.native_arcs, "fast": args.fast}
+    if args.deterministic:
+        options["tedit"] = int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+
+    try:
+        response = request_conversion(args.DXF_file, os.path.splitext(os.path.basename(footprint_file))[0],
+                                      settings, options, args.port)
+    except (ConversionError, urllib.error.URLError) as ex:
+        print("[Error]: {}: {}".format(args.DXF_file, ex), file=sys.stderr)
+        return 1
+
+    with atomic_write(footprint_file, newline="") as f:
+        f.write(response["footprint"])
+    if args.verbose:
+        print("{}: queued {:.3f} s, converted {:.3f} s".format(footprint_file, response["queued"], response["converted"]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# The KiCad file modules from kicad-library-utils, which dxf2kicad_mod uses to
+# write footprints. They import each other relatively, so they are imported
+# as dxf2kicad_common.<module>.
@@ -5,12 +5,11 @@ import copy
 import time
 import re
 import math
-import os
-import sys
+from itertools import chain
+from operator import itemgetter
 
-sys.path.append(os.path.join('..','common'))
-import sexpr
-from boundingbox import BoundingBox
+from . import sexpr
+from .boundingbox import BoundingBox
 
 # Rotate a point by given angle (in degrees)
 def _rotatePoint(point, degrees):
@@ -82,8 +81,8 @@ class KicadMod(object):
             return
 
         # read the s-expression data
-        f = open(filename)
-        sexpr_data = ''.join(f.readlines())
+        with open(filename) as f:
+            sexpr_data = f.read()
 
         # parse s-expr
         sexpr_data = sexpr.parse_sexp(sexpr_data)
@@ -585,6 +584,27 @@ class KicadMod(object):
              }
         self.lines.append( line)
 
+    # Add an arc: start is the center, end is the start point of the arc
+    def addArc(self, start, end, angle, layer, width):
+        arc={
+               'start': {'x': start[0], 'y': start[1]},
+               'end': {'x': end[0], 'y': end[1]},
+               'angle': angle,
+               'layer': layer,
+               'width': width
+             }
+        self.arcs.append(arc)
+
+    # Add a circle: end is any point on the circle
+    def addCircle(self, center, end, layer, width):
+        circle={
+               'center': {'x': center[0], 'y': center[1]},
+               'end': {'x': end[0], 'y': end[1]},
+               'layer': layer,
+               'width': width
+             }
+        self.circles.append(circle)
+
     def addRectangle(self, start, end, layer, width):
         self.addLine( [ start[0], start[1] ], [ end[0], start[1] ], layer, width)
         self.addLine( [ start[0], start[1] ], [ start[0], end[1] ], layer, width)
@@ -943,82 +963,57 @@ class KicadMod(object):
         se.endGroup(False)
         se.endGroup(True)
 
+    def _formatPoints(self, se, points, items):
+        """
+        Add (key x y) for each (key, point) of points, with the numbers of
+        all of them formatted in one call, and then the preformatted items
+        """
+        numbers = se.numbers.numbers([v for key, point in points for v in (point['x'], point['y'])])
+        text = ['({} {} {})'.format(key, numbers[2*i], numbers[2*i+1]) for i, (key, point) in enumerate(points)]
+        se.addText(' '.join(text + items), newline=False)
+
     def _formatLine(self, line, se):
         se.startGroup('fp_line', newline=True, indent=False)
 
-        start = line['start']
-        end = line['end']
+        self._formatPoints(se, [('start', line['start']), ('end', line['end'])],
+                           [se.numbers.token('layer', line['layer']),
+                            se.numbers.token('width', line['width'])])
 
-        fp_line = [
-            {'start': [start['x'], start['y']]},
-            {'end': [end['x'], end['y']]},
-            {'layer': line['layer']},
-            {'width': line['width']}
-            ]
-
-        se.addItems(fp_line, newline=False)
         se.endGroup(newline=False)
 
     def _formatRect(self, line, se):
         se.startGroup('fp_rect', newline=True, indent=False)
 
-        start = line['start']
-        end = line['end']
-
-        fp_line = [
-            {'start': [start['x'], start['y']]},
-            {'end': [end['x'], end['y']]},
-            {'layer': line['layer']},
-            {'width': line['width']}
-            ]
+        self._formatPoints(se, [('start', line['start']), ('end', line['end'])],
+                           [se.numbers.token('layer', line['layer']),
+                            se.numbers.token('width', line['width'])])
 
-        se.addItems(fp_line, newline=False)
         se.endGroup(newline=False)
 
     def _formatCircle(self, circle, se):
         se.startGroup('fp_circle', newline=True, indent=False)
 
-        center = circle['center']
-        end = circle['end']
+        self._formatPoints(se, [('center', circle['center']), ('end', circle['end'])],
+                           [se.numbers.token('layer', circle['layer']),
+                            se.numbers.token('width', circle['width'])])
 
-        fp_circle = [
-            {'center': [center['x'], center['y']]},
-            {'end': [end['x'], end['y']]},
-            {'layer': circle['layer']},
-            {'width': circle['width']}
-            ]
-
-        se.addItems(fp_circle, newline=False)
         se.endGroup(newline=False)
 
     def _formatArc(self, arc, se):
         se.startGroup('fp_arc', newline=True, indent=False)
 
-        start = arc['start']
-        end = arc['end']
+        self._formatPoints(se, [('start', arc['start']), ('end', arc['end'])],
+                           [sexpr.SexprItem(arc['angle'], 'angle'),
+                            se.numbers.token('layer', arc['layer']),
+                            se.numbers.token('width', arc['width'])])
 
-        fp_arc = [
-            {'start': [start['x'], start['y']]},
-            {'end': [end['x'], end['y']]},
-            {'angle': arc['angle']},
-            {'layer': arc['layer']},
-            {'width': arc['width']}
-            ]
-
-        se.addItems(fp_arc, newline=False)
         se.endGroup(newline=False)
 
     def _formatPoly(self, poly, se):
         se.startGroup('fp_poly', newline=True, indent=False)
 
-        pts = []
-        for p in poly['pts']:
-            pts.append ({'xy':[ p['x'], p['y'] ] })
-
         se.startGroup('pts', newline=True, indent=True)
-        fp_poly = [ pts ]
-        for p in pts:
-            se.addItem(p, newline=True)
+        se.addPoints(chain.from_iterable(map(itemgetter('x', 'y'), poly['pts'])))
         se.endGroup(newline=True)
 
         fp_poly = [
@@ -1137,14 +1132,19 @@ class KicadMod(object):
 
         se.endGroup(newline=True)
 
-    def save(self, filename=None):
+    def save(self, filename=None, tedit=None):
+        """
+        tedit is the timestamp (seconds since the epoch) written to the file,
+        the current time if None. Give a fixed value to always write the same
+        file for the same footprint.
+        """
         if not filename:
             filename = self.filename
 
-        se = sexpr.SexprBuilder('module')
-
-        # Hex value of current epoch timestamp (in seconds)
-        tedit = hex(int(time.time())).upper()[2:]
+        # Hex value of epoch timestamp (in seconds)
+        if tedit is None:
+            tedit = time.time()
+        tedit = hex(int(tedit)).upper()[2:]
 
         # Output must be precisely formatted
 
@@ -1174,63 +1174,65 @@ class KicadMod(object):
         header.append({'layer': self.layer})
         header.append({'tedit': tedit})
 
-        se.addItems(header, newline=False)
-        se.addItems({'descr': self.description}, indent=True)
-        se.addItems({'tags': self.tags})
+        # The file is written while it is formatted, a primitive at a time
+        with open(filename, 'w', newline='\n') as f:
+            se = sexpr.SexprBuilder('module', f)
 
+            se.addItems(header, newline=False)
+            se.addItems({'descr': self.description}, indent=True)
+            se.addItems({'tags': self.tags})
 
-        # Following items are optional (only written if non-zero)
-        se.addOptItem('autoplace_cost90', self.autoplace_cost90)
-        se.addOptItem('autoplace_cost180', self.autoplace_cost180)
-        se.addOptItem('solder_mask_margin', self.solder_mask_margin)
-        se.addOptItem('solder_paste_margin', self.solder_paste_margin)
-        se.addOptItem('solder_paste_ratio', self.solder_paste_ratio)
-        se.addOptItem('clearance', self.clearance)
 
-        # Set attribute, the default is 'virtual' and not written to the file
-        attr = self.attribute.lower()
-        if attr in ['smd', 'through_hole']:
-            se.addItems({'attr': attr})
+            # Following items are optional (only written if non-zero)
+            se.addOptItem('autoplace_cost90', self.autoplace_cost90)
+            se.addOptItem('autoplace_cost180', self.autoplace_cost180)
+            se.addOptItem('solder_mask_margin', self.solder_mask_margin)
+            se.addOptItem('solder_paste_margin', self.solder_paste_margin)
+            se.addOptItem('solder_paste_ratio', self.solder_paste_ratio)
+            se.addOptItem('clearance', self.clearance)
 
-        # Add text items
-        self._formatText('reference', self.reference, se)
-        self._formatText('value', self.value, se)
+            # Set attribute, the default is 'virtual' and not written to the file
+            attr = self.attribute.lower()
+            if attr in ['smd', 'through_hole']:
+                se.addItems({'attr': attr})
 
-        for text in self.userText:
-            self._formatText('user', text, se)
+            # Add text items
+            self._formatText('reference', self.reference, se)
+            self._formatText('value', self.value, se)
 
-        # Add Line Data
-        for line in self.lines:
-            self._formatLine(line, se)
+            for text in self.userText:
+                self._formatText('user', text, se)
 
-        # Add Rect Data
-        for rect in self.rects:
-            self._formatRect(rect, se)
+            # Add Line Data
+            for line in self.lines:
+                self._formatLine(line, se)
 
-        # Add Circle Data
-        for circle in self.circles:
-            self._formatCircle(circle, se)
+            # Add Rect Data
+            for rect in self.rects:
+                self._formatRect(rect, se)
 
-        # Add Arc Data
-        for arc in self.arcs:
-            self._formatArc(arc, se)
+            # Add Circle Data
+            for circle in self.circles:
+                self._formatCircle(circle, se)
 
-        # Add Poly Data
-        for poly in self.polys:
-            self._formatPoly(poly, se)
+            # Add Arc Data
+            for arc in self.arcs:
+                self._formatArc(arc, se)
 
-        # Add Pad Data
-        for pad in self.pads:
-            self._formatPad(pad, se)
+            # Add Poly Data
+            for poly in self.polys:
+                self._formatPoly(poly, se)
 
-        # Add Model Data
-        for model in self.models:
-            self._formatModel(model, se)
+            # Add Pad Data
+            for pad in self.pads:
+                self._formatPad(pad, se)
 
-        se.endGroup(True)
+            # Add Model Data
+            for model in self.models:
+                self._formatModel(model, se)
 
-        with open(filename, 'w', newline='\n') as f:
-            f.write(se.output)
+            se.endGroup(True)
+            se.flush()
             f.write('\n')
 
 if __name__ == '__main__':
@@ -5,12 +5,10 @@ from dataclasses import dataclass, field
 from typing import List
 
 import re, math
-import sys, os
-common = os.path.abspath(os.path.join(sys.path[0], '..','common'))
-if not common in sys.path:
-    sys.path.append(common)
+import sys
 
-import sexpr
+from . import sexpr
+from .sexpr_table import SexprTable
 import pprint
 
 def mil_to_mm(mil):
@@ -46,6 +44,10 @@ def _get_array(data, value, result=None, level=0, max_level=None):
                 result.append(data)
     return result
 
+def _part_name(name):
+    """return the name of a symbol without the library name"""
+    return name.split(':', 1)[-1]
+
 def _get_array2(data, value):
     ret = []
     for i in data:
@@ -858,17 +860,26 @@ class KicadLibrary(KicadSymbolBase):
         return sexpr.format_sexp(sexpr.build_sexp(sx), max_nesting=4)
 
     @classmethod
-    def from_file(cls, filename):
+    def from_file(cls, filename, names=None):
         library = KicadLibrary(filename)
 
-        # read the s-expression data
-        f_name = open(filename)
-        lines = ''.join(f_name.readlines())
+        if names is None:
+            # read the s-expression data
+            f_name = open(filename)
+            lines = f_name.read()
 
-        #i parse s-expr
-        sexpr_data = sexpr.parse_sexp(lines)
-        sym_list = _get_array(sexpr_data, 'symbol')
-        f_name.close()
+            #i parse s-expr
+            sexpr_data = sexpr.parse_sexp(lines)
+            sym_list = _get_array(sexpr_data, 'symbol')
+            f_name.close()
+        else:
+            # parse only the symbols with these names
+            names = set(names)
+            sym_list = []
+            with SexprTable.from_file(filename) as table:
+                for node in table.root.children('symbol'):
+                    if _part_name(node[1]) in names:
+                        sym_list.extend(_get_array(node.value(), 'symbol'))
 
         # itertate over symbol
         for item in sym_list:
@@ -948,6 +959,12 @@ class KicadLibrary(KicadSymbolBase):
 
         return library
 
+    @classmethod
+    def names_from_file(cls, filename):
+        """ names of the symbols of a library, without parsing the symbols """
+        with SexprTable.from_file(filename) as table:
+            return [_part_name(node[1]) for node in table.root.children('symbol')]
+
 if __name__ == '__main__':
     if len(sys.argv) >= 2:
         a = KicadLibrary.from_file(sys.argv[1])
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# code extracted from: http://rosettacode.org/wiki/S-Expressions
+
+from __future__ import print_function
+from itertools import islice
+import re
+
+dbg = False
+
+term_regex = r'''(?mx)
+    \s*(?:
+        (?P<brackl>\()|
+        (?P<brackr>\))|
+        (?P<num>[+-]?\d+\.\d+(?=[\s)]|$)|\-?\d+(?=[\s)]|$))|
+        (?P<sq>"(?:[^"]|(?<=\\)")*")|
+        (?P<s>[^(^)\s]+)
+       )'''
+
+term_re = re.compile(term_regex)
+
+# Terms which are only separated by spaces, brackets and quoted strings are
+# split with str methods: quoted strings, the same as sq, numbers, the same
+# as num, and what else ends a term in term_regex, a '^', or a term straight
+# before '(' or a quoted string, where a number is a string. joined_re finds
+# a term before '(' starting from the '(', which is much faster than trying
+# every character as the end of a term
+quoted_re = re.compile(r'("[^"]*(?:(?<=\\)"[^"]*)*")')
+number_re = re.compile(r'[+-]?\d+\.\d+|-?\d+')
+joined_re = re.compile(r'\((?<=[^\s()]\()')
+
+class _Atoms(dict):
+    # value of each term which is not a bracket or a quoted string
+    def __missing__(self, term):
+        if number_re.fullmatch(term):
+            v = float(term)
+            if v.is_integer(): v = int(v)
+        else:
+            v = term
+        self[term] = v
+        return v
+
+def _split_terms(sexp):
+    '''
+    The text between the quoted strings, at even indexes, and the quoted
+    strings, unescaped, at odd indexes. Returns None if the terms are not
+    all separated by spaces, brackets and quoted strings.
+    '''
+    parts = quoted_re.split(sexp)
+    # joined with '(', a term straight before a quoted string is found too
+    text = '('.join(parts[0::2])
+    if '^' in text or '"' in text or joined_re.search(text):
+        return None
+    parts[1::2] = [q[1:-1].replace(r'\"', '"') for q in parts[1::2]]
+    return parts
+
+def _regex_terms(sexp):
+    '''
+    The same as _split_terms() for any text, a term at a time with
+    term_regex: the brackets at even indexes and the other terms, parsed,
+    at odd indexes.
+    '''
+    parts = []
+    brackets = ''
+    if dbg: print("%-6s %-s" % tuple("term value".split()))
+    for termtypes in term_re.finditer(sexp):
+        term = termtypes.lastgroup
+        value = termtypes.group(term)
+        if dbg: print("%-7s %-r" % (term, value))
+        if term == 'brackl' or term == 'brackr':
+            brackets += value
+            continue
+        elif term == 'num':
+            v = float(value)
+            if v.is_integer(): v = int(v)
+            value = v
+        elif term == 'sq':
+            value = value[1:-1].replace(r'\"', '"')
+        elif term != 's':
+            raise NotImplementedError("Error: %r" % (term, value))
+        parts.append(brackets)
+        parts.append(value)
+        brackets = ''
+    parts.append(brackets)
+    return parts
+
+def parse_terms(sexp):
+    # Most text is split into terms with str methods, which is a few times
+    # faster than term_regex, and the rest a term at a time with term_regex
+    parts = None if dbg else _split_terms(sexp)
+    if parts is None:
+        parts = _regex_terms(sexp)
+
+    stack = []
+    out = []
+    append = out.append
+    atom = _Atoms().__getitem__
+    is_value = False
+    for part in parts:
+        if is_value:
+            append(part)
+        else:
+            for term in part.replace('(', ' ( ').replace(')', ' ) ').split():
+                if term == '(':
+                    stack.append(out)
+                    out = []
+                    append = out.append
+                elif term == ')':
+                    assert stack, "Trouble with nesting of brackets"
+                    term = out
+                    out = stack.pop()
+                    append = out.append
+                    append(term)
+                else:
+                    append(atom(term))
+        is_value = not is_value
+    assert not stack, "Trouble with nesting of brackets"
+    return out[0]
+
+def parse_sexp(sexp):
+    return parse_terms(sexp)
+
+# Form a valid sexpr (single line)
+def SexprItem(val, key=None):
+    if key:
+        fmt = "(" + key + " {val})"
+    else:
+        fmt = "{val}"
+    
+    t = type(val)
+    
+    if val is None or t == str and len(val) == 0:
+        val = '""'
+    elif t in [list, tuple]:
+        val = ' '.join([SexprItem(v) for v in val])
+    elif t == dict:
+        values = []
+        for key in val.keys():
+            values.append(SexprItem(val[key],key))
+        val = ' '.join(values)
+    elif t == float:
+        val = str(round(val,10)).rstrip('0').rstrip('.')
+    elif t == int:
+        val = str(val)
+    elif t == str and re.search(r'[\s()\"]', val):
+        val = '"%s"' % repr(val)[1:-1].replace('"', '\"') 
+    
+    return fmt.format(val=val)
+    
+# Format many numbers at once, the same as SexprItem
+class NumberFormatter(object):
+    # Numbers are formatted with one % operation for a whole list, which
+    # gives the same text as str(round(val, precision)) while the result has
+    # at most 15 significant digits and no exponent. The trailing zeros are
+    # removed with str.replace, fewest passes by removing 8, 4, 2 and then 1
+    # of them. Lists with other numbers are formatted one at a time.
+    def __init__(self, precision=10):
+        if precision < 1:
+            raise ValueError("precision must be at least 1")
+        self.precision = precision
+        self.format = '%.{}f '.format(precision)
+        self.limit = 10.0 ** (15 - precision)
+        self.zeros = ['0' * (1 << i) + ' ' for i in reversed(range(precision.bit_length()))]
+        self.tokens = {}
+
+    def number(self, val):
+        if type(val) == float:
+            return str(round(val, self.precision)).rstrip('0').rstrip('.')
+        return SexprItem(val)
+
+    def numbers(self, values):
+        """ list of the numbers in values (floats and ints) as text """
+        if not values:
+            return []
+        if (not set(map(type, values)) <= {float, int} or
+                not (-self.limit < min(values) and max(values) < self.limit)):
+            return [self.number(val) for val in values]
+
+        text = ' ' + (self.format * len(values)) % tuple(values)
+        for zeros in self.zeros:
+            text = text.replace(zeros, ' ')
+        text = text.replace('. ', ' ')
+        # str() writes numbers below 0.0001 with an exponent
+        if ' 0.0000' in text or ' -0.0000' in text:
+            return [self.number(val) for val in values]
+        return text.split(' ')[1:-1]
+
+    def token(self, key, val):
+        """ (key val) the same as SexprItem, kept for the next time it is used """
+        # repr, as -0.0 == 0.0 but they are formatted differently
+        token = (key, type(val), repr(val))
+        try:
+            return self.tokens[token]
+        except KeyError:
+            text = self.tokens[token] = SexprItem(val, key)
+            return text
+
+class SexprBuilder(object):
+    # The text is collected as a list of chunks and joined when output is
+    # read, appending to one string copies it every time.
+    # With a stream, the chunks are written to it every FLUSH_CHUNKS chunks
+    # and by flush(), and output only has the text not written yet.
+    FLUSH_CHUNKS = 4096
+
+    def __init__(self, key, stream=None, precision=10):
+        self.indent = 0
+        self.chunks = []
+        self.items = []
+        self.stream = stream
+        self.numbers = NumberFormatter(precision)
+        if key is not None:
+            self.startGroup(key, newline=False)
+
+    @property
+    def output(self):
+        if len(self.chunks) > 1:
+            self.chunks = [''.join(self.chunks)]
+        return self.chunks[0] if self.chunks else ''
+
+    @output.setter
+    def output(self, text):
+        self.chunks = [text]
+
+    def flush(self):
+        """ write the text so far to the stream """
+        self.stream.write(''.join(self.chunks))
+        self.chunks = []
+       
+    def _indent(self):
+        self.chunks.append(' ' * 2 * self.indent)
+   
+    def _newline(self):
+        self.chunks.append('\n')
+        
+    def _addItems(self):
+        if self.items:
+            self.chunks.append(' '.join(map(str,self.items)))
+            self.items = []
+       
+    def startGroup(self, key=None, newline=True, indent=False):
+        self._addItems()
+        if newline and indent:
+            self.indent += 1
+        if newline:
+            self._newline()
+            self._indent()
+        self.chunks.append('(')
+        if key:
+            self.chunks.append(str(key) + ' ')
+            
+    def endGroup(self, newline=True):
+        self._addItems()
+        if newline:
+            self._newline()
+            if self.indent > 0:
+                self.indent -= 1
+            self._indent()
+        self.chunks.append(')')
+        if self.stream is not None and len(self.chunks) >= self.FLUSH_CHUNKS:
+            self.flush()
+        
+    def addOptItem(self, key, item, newline=True, indent=False):
+        if item in [None, 0, False]:
+            return
+            
+        self.addItems({key: item}, newline=newline, indent=indent)
+            
+    def addItem(self, item, newline=True, indent=False):
+        self._addItems()
+        if newline and indent:
+            self.indent += 1
+        if newline:
+            self.newLine()
+        self.items.append(SexprItem(item))
+            
+    # Add preformatted text, without quoting
+    def addText(self, text, newline=True):
+        self._addItems()
+        if newline:
+            self.newLine()
+        self.items.append(text)
+
+    # Add (key x y) on a new line for each pair of numbers in values,
+    # an iterable of x, y, x, y, ... formatted a few thousand at a time
+    def addPoints(self, values, key='xy'):
+        self._addItems()
+        line = '\n' + ' ' * 2 * self.indent + '(' + key + ' %s %s)'
+        values = iter(values)
+        while True:
+            numbers = self.numbers.numbers(list(islice(values, 2 * self.FLUSH_CHUNKS)))
+            if not numbers:
+                break
+            self.chunks.append((line * (len(numbers) // 2)) % tuple(numbers))
+            if self.stream is not None:
+                self.flush()
+
+    # Add a (preformatted) item
+    def addItems(self, items, newline=True, indent=False):
+        self._addItems()
+        if indent:
+            self.indent += 1
+        if newline:
+            self.newLine()
+        if type(items) in [list, tuple]:
+            for item in items:
+                self.items.append(SexprItem(item))
+        else:
+            self.items.append(SexprItem(items))
+            
+    def newLine(self, indent=False):
+        self._addItems()
+        if self.stream is not None and len(self.chunks) >= self.FLUSH_CHUNKS:
+            self.flush()
+        self._newline()
+        if indent:
+            self.indent += 1
+        self._indent()
+        
+    def unIndent(self):
+        if self.indent > 0:
+            self.indent -= 1
+        
+def build_sexp(exp, key=None):
+    out = ''
+    
+    # Special case for multi-values
+    if type(exp) == type([]):
+        out += '('+ ' '.join(build_sexp(x) for x in exp) + ')'
+        return out
+    #elif type(exp) == type('') and re.search(r'[\s()]', exp):
+    #    out += '"%s"' % repr(exp)[1:-1].replace('"', r'\"')
+    #    print(exp, '"%s"' % repr(exp)[1:-1].replace('"', r'\"'))
+    elif type(exp) == float:
+        out += str(exp)
+    elif type(exp) == int:
+        out += str(exp)
+    elif type(exp) == str:
+        out += exp
+    else:
+        if exp == '':
+            out += '""'
+        else:
+            out += '%s' % exp
+    
+    if key is not None:
+        out = "({key} {val})".format(key=key, val=out)
+        
+    return out
+
+def format_sexp(sexp, indentation_size=2, max_nesting=2):
+    out = ''
+    n = 0
+    for termtypes in term_re.finditer(sexp):
+        indentation = ''
+        term = termtypes.lastgroup
+        value = termtypes.group(term)
+        if term == 'brackl':
+            if out:
+                if n <= max_nesting:
+                    if out[-1] == ' ': out = out[:-1]
+                    indentation = '\n' + (' ' * indentation_size * n)
+                else:
+                    if out[-1] == ')': out += ' '
+            n += 1
+        elif term == 'brackr':
+            if out and out[-1] == ' ': out = out[:-1]
+            n -= 1
+        elif term == 'num':
+            value += ' '
+        elif term == 'sq':
+            value += ' '
+        elif term == 's':
+            value += ' '
+        else:
+            raise NotImplementedError("Error: %r" % (term, value))
+
+        out += indentation + value
+
+    out += '\n'
+    return out
+
+if __name__ == '__main__':
+    sexp = ''' ( ( data "quoted data" 123 4.5)
+         (data "with \\"escaped quotes\\"")
+         (data (123 (4.5) "(more" "data)")))'''
+
+    print('Input S-expression: %r' % (sexp, ))
+    parsed = parse_sexp(sexp)
+    print("\nParsed to Python:", parsed)
+
+    print("\nThen back to: '%s'" % build_sexp(parsed))
+    print("\nThen back to: '%s'" % format_sexp(build_sexp(parsed)))
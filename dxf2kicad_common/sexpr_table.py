@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# Read parts of a large s-expression file without parsing all of it.
+#
+# SexprTable finds where each group of the text starts and ends, and keeps
+# the offsets in arrays of integers, in the order the groups start in, with
+# the number of groups inside each group. The text can be a memory mapped
+# file, which is not read into memory. SexprNode reads the head, the terms
+# or the parsed value of a group from the text when they are asked for.
+#
+# Quoted strings are taken to start at the start of a term, as KiCad writes
+# them: a '"' inside an unquoted term (a"b) is not supported.
+
+from array import array
+import mmap
+import re
+
+from . import sexpr
+
+numpy = None
+_numpy_checked = False
+
+# quoted strings, the same as sexpr.quoted_re, and brackets
+bracket_re = re.compile(rb'"[^"]*(?:(?<=\\)"[^"]*)*"|[()]')
+head_re = re.compile(rb'\s*([^\s()]+)')
+# bytes of the text _table_numpy() reads at a time
+CHUNK_SIZE = 1 << 18
+
+def _have_numpy():
+    # import numpy the first time, returns False if it is not installed
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as module
+            numpy = module
+        except ImportError:
+            pass
+    return numpy is not None
+
+def _table_re(data):
+    '''
+    start, end and size (number of groups inside) of each group, by
+    matching the brackets and quoted strings one at a time
+    '''
+    start = array('q')
+    end = array('q')
+    size = array('q')
+    stack = []
+    for m in bracket_re.finditer(data):
+        token = m.group()
+        if token == b'(':
+            stack.append(len(start))
+            start.append(m.start())
+            end.append(0)
+            size.append(0)
+        elif token == b')':
+            assert stack, "Trouble with nesting of brackets"
+            i = stack.pop()
+            end[i] = m.end()
+            size[i] = len(start) - i - 1
+    assert not stack, "Trouble with nesting of brackets"
+    return start, end, size
+
+def _table_numpy(data, chunk_size=CHUNK_SIZE):
+    '''
+    The same as _table_re() with numpy, reading chunk_size bytes of the
+    text at a time, so that no array is made as large as the text. A
+    bracket is in a quoted string if an odd number of quotes are before
+    it, and the brackets at each depth are pairs of '(' and ')' in the
+    order they are in the text. Whether the chunk starts in a quoted
+    string, the byte before it and the groups still open at its start
+    are kept from the chunks before.
+    Returns None if the quotes are not in pairs or the brackets do not
+    nest, for _table_re() to find the trouble.
+    '''
+    start = array('q')
+    end = array('q')
+    size = array('q')
+    # the open group at each depth, from the chunks before
+    stack = numpy.empty(0, dtype=numpy.int64)
+    in_string = 0
+    last = 0
+    for offset in range(0, len(data), chunk_size):
+        buf = numpy.frombuffer(data, dtype=numpy.uint8, offset=offset,
+                               count=min(chunk_size, len(data) - offset))
+        quotes = numpy.flatnonzero(buf == ord('"'))
+        before = buf[quotes - 1]
+        before[quotes == 0] = last
+        quotes = quotes[before != ord('\\')]
+        opens = numpy.flatnonzero(buf == ord('('))
+        opens = opens[(numpy.searchsorted(quotes, opens) + in_string) % 2 == 0]
+        closes = numpy.flatnonzero(buf == ord(')'))
+        closes = closes[(numpy.searchsorted(quotes, closes) + in_string) % 2 == 0]
+        in_string = (in_string + len(quotes)) % 2
+        last = buf[-1]
+        del buf
+
+        first = len(start)
+        count = len(opens)
+        pos = numpy.concatenate((opens, closes))
+        order = numpy.argsort(pos, kind='stable')
+        is_close = order >= count
+        depth = len(stack) + numpy.cumsum(numpy.where(is_close, -1, 1))
+        if len(depth) and depth.min() < 0:
+            return None
+        # depth of the '(' of each bracket, then the brackets by depth: a
+        # ')' closes the '(' before it, or the group open from the chunks
+        # before if it is the first at its depth
+        level = depth + is_close
+        by_level = numpy.argsort(level, kind='stable')
+        level = level[by_level]
+        is_close = is_close[by_level]
+        order = order[by_level]
+        paired = is_close.copy()
+        paired[0:1] = False
+        paired[1:] &= ~is_close[:-1] & (level[1:] == level[:-1])
+        carried = is_close & ~paired
+        # a '(' which is not closed in the chunk
+        left_open = ~is_close
+        left_open[:-1] &= ~paired[1:]
+
+        chunk_end = numpy.zeros(count, dtype=numpy.int64)
+        chunk_inside = numpy.zeros(count, dtype=numpy.int64)
+        close_pos = pos[order[paired]]
+        open_index = order[numpy.flatnonzero(paired) - 1]
+        chunk_end[open_index] = close_pos + offset + 1
+        chunk_inside[open_index] = numpy.searchsorted(opens, close_pos) - open_index - 1
+
+        new_depth = depth[-1] if len(depth) else len(stack)
+        new_stack = numpy.empty(new_depth, dtype=numpy.int64)
+        new_stack[:min(new_depth, len(stack))] = stack[:new_depth]
+        new_stack[level[left_open] - 1] = first + order[left_open]
+
+        start.frombytes((opens + offset).astype(numpy.int64).tobytes())
+        end.frombytes(chunk_end.tobytes())
+        size.frombytes(chunk_inside.tobytes())
+        close_pos = pos[order[carried]]
+        groups = stack[level[carried] - 1]
+        inside = first + numpy.searchsorted(opens, close_pos) - groups - 1
+        for i, e, n in zip(groups.tolist(), (close_pos + offset + 1).tolist(), inside.tolist()):
+            end[i] = e
+            size[i] = n
+        stack = new_stack
+
+    if in_string or len(stack):
+        return None
+    return start, end, size
+
+def _atoms(text):
+    # the terms of text up to the first bracket, which is included in text
+    # so that a number straight before it is parsed as parse_terms() does
+    out = []
+    for termtypes in sexpr.term_re.finditer(text.decode('utf-8')):
+        term = termtypes.lastgroup
+        value = termtypes.group(term)
+        if term == 'brackl' or term == 'brackr':
+            break
+        elif term == 'num':
+            v = float(value)
+            if v.is_integer(): v = int(v)
+            out.append(v)
+        elif term == 'sq':
+            out.append(value[1:-1].replace(r'\"', '"'))
+        else:
+            out.append(value)
+    return out
+
+class SexprTable(object):
+    '''
+    The groups of an s-expression, the text of which is a str, bytes or a
+    memory mapped file (from_file()). Offsets are in bytes of the UTF-8
+    text, and the groups are numbered in the order they start in, so the
+    groups inside group i are i + 1 to i + size[i].
+    '''
+
+    def __init__(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.data = data
+        table = None
+        if len(data) and _have_numpy():
+            table = _table_numpy(data)
+        if table is None:
+            table = _table_re(data)
+        self.start, self.end, self.size = table
+        assert len(self.start), "No s-expression"
+
+        # id of the head of each group, -1 until it is read
+        self.heads = array('l', [-1]) * len(self.start)
+        self.head_names = []
+        self.head_ids = {}
+
+    @classmethod
+    def from_file(cls, filename):
+        with open(filename, 'rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file
+                data = b''
+        try:
+            return cls(data)
+        except Exception:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            raise
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def root(self):
+        return SexprNode(self, 0)
+
+    def head_id(self, i):
+        head = self.heads[i]
+        if head < 0:
+            m = head_re.match(self.data, self.start[i] + 1)
+            name = m.group(1).decode('utf-8') if m else None
+            head = self.head_ids.get(name)
+            if head is None:
+                head = len(self.head_names)
+                self.head_ids[name] = head
+                self.head_names.append(name)
+            self.heads[i] = head
+        return head
+
+    def head(self, i):
+        return self.head_names[self.head_id(i)]
+
+    def children(self, i, head=None):
+        # groups straight inside group i, with the head if it is given
+        size = self.size
+        j = i + 1
+        last = i + size[i]
+        while j <= last:
+            if head is None or self.head(j) == head:
+                yield j
+            j += size[j] + 1
+
+class SexprNode(object):
+    '''
+    A group of a SexprTable. Nothing is read from the text until the
+    head, the terms or the value are asked for.
+    '''
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def head(self):
+        # the first term, None if it is a group
+        return self.table.head(self.index)
+
+    @property
+    def text(self):
+        table = self.table
+        return table.data[table.start[self.index]:table.end[self.index]].decode('utf-8')
+
+    def children(self, head=None):
+        for j in self.table.children(self.index, head):
+            yield SexprNode(self.table, j)
+
+    def find(self, head):
+        for child in self.children(head):
+            return child
+        return None
+
+    def terms(self):
+        # the terms of the group, parsed, with SexprNodes for the groups
+        table = self.table
+        data = table.data
+        out = []
+        pos = table.start[self.index] + 1
+        for j in table.children(self.index):
+            out.extend(_atoms(data[pos:table.start[j] + 1]))
+            out.append(SexprNode(table, j))
+            pos = table.end[j]
+        out.extend(_atoms(data[pos:table.end[self.index]]))
+        return out
+
+    def __getitem__(self, i):
+        return self.terms()[i]
+
+    def __len__(self):
+        return len(self.terms())
+
+    def value(self):
+        # the group parsed, the same as its part of parse_sexp()
+        return sexpr.parse_sexp(self.text)
+
+    def __repr__(self):
+        return 'SexprNode(%r, %d)' % (self.head, self.index)
@@ -34,24 +34,31 @@
 #
 # ===========================================================================
 
+# ezdxf and the KiCad footprint writer are only imported when they are used, as
+# loading them takes longer than converting a small file
+
 import argparse
-import ezdxf
-from ezdxf.math import Vec3
-from math import *
 import math
 import sys
 import os
 import json
+import glob
+import copy
+import time
+import traceback
 from enum import Enum
 
 from kicad_layers import KicadLayer
-
-common = os.path.abspath(os.path.join(sys.path[0], 'common'))
-if not common in sys.path:
-    sys.path.append(common)
-
-from kicad_mod import *
-from kicad_sym import *
+from endpoint_index import EndpointIndex
+from segment_table import SegmentTable, SEG_LINE, SEG_ARC, SEG_POLY, SEG_CIRCLE, segment_points
+from tessellate import DEFAULT_ARC_TOLERANCE, arc_sweep, bulge_to_arc
+from shapes import Shapes, SHAPE_POLY, SHAPE_LINES, matrix_from_m44, matrix_scale
+from hatch import hatch_polygons
+from dxf_scanner import scan_layers, ScanError
+from atomic_file import atomic_path
+from conversion_cache import ConversionCache, DEFAULT_CACHE_SIZE, file_digest, make_key
+from geometry_snapshot import snapshot_path, source_info, save_snapshot, load_snapshot
+from incremental import state_path, row_fingerprint, component_key, connected_components, load_state, save_state
 
 
 class Units(Enum):
@@ -73,21 +80,69 @@ class Point (object):
         return "{:6g}, {:6g}".format (self.x, self.y)
 
 
+# smallest number of segments worth starting worker processes for
+PARALLEL_MIN_SEGMENTS = 20000
+
+# entities read from the modelspace when streaming
+STREAM_TYPES = ["LINE", "ARC", "CIRCLE", "LWPOLYLINE", "POLYLINE", "HATCH", "INSERT"]
+
+# seconds between checks for changed files in watch mode
+WATCH_INTERVAL = 0.1
+
+# KiCad layers which only take outlines
+DEFAULT_OUTLINE_LAYERS = ["Edge.Cuts", "F.CrtYd", "B.CrtYd", "F.Fab", "B.Fab"]
+
+
 class Settings(object):
     # by default mm, will be converted to Mil if Mil selected
 
     def __init__(self, dct=None):
         if dct:
             self.units = dct.get('units', "mm")
-            self.layers = dct.get('layer', {"0":KicadLayer.F_Cu} )
+            # save_to_file() writes 'layers', older files have 'layer'
+            self.layers = dct.get('layers', dct.get('layer', {"0":KicadLayer.F_Cu}) )
             self.distance_error = dct.get('distance_error', 0.1)
             self.min_line_width = dct.get('min_line_width', 0.2)
+            self.arc_tolerance = dct.get('arc_tolerance', DEFAULT_ARC_TOLERANCE)
+            self.layer_arc_tolerance = dct.get('layer_arc_tolerance', {})
+            self.native_arcs = dct.get('native_arcs', False)
+            self.outline_layers = dct.get('outline_layers', DEFAULT_OUTLINE_LAYERS)
         else:
             self.units = "mm"
             self.layers = {"0":KicadLayer.F_Cu}
             self.distance_error = 0.025
             #self.distance_error = 0.1
             self.min_line_width = 0.2
+            # max distance between an arc and the lines it is converted to
+            self.arc_tolerance = DEFAULT_ARC_TOLERANCE
+            # per DXF layer overrides of arc_tolerance
+            self.layer_arc_tolerance = {}
+            # output unconnected arcs as fp_arc/fp_circle instead of line segments
+            self.native_arcs = False
+            # layers where CIRCLEs are output as fp_circle rather than filled polygons
+            self.outline_layers = DEFAULT_OUTLINE_LAYERS
+
+    def get_arc_tolerance (self, layer):
+        return self.layer_arc_tolerance.get (layer, self.arc_tolerance)
+
+    def is_outline_layer (self, layer):
+        return layer in self.outline_layers or self.get_layer_name (layer) in self.outline_layers
+
+    def get_layer_name (self, layer):
+        if layer in self.layers:
+            return self.layers.get (layer, layer)
+        elif layer in KicadLayer.standard_layers:
+            return layer
+        else:
+            return KicadLayer.F_Cu
+
+    def use_mil (self):
+        """ convert the lengths from mm, for a drawing in mils """
+        self.units = Units.MIL
+        self.distance_error = to_mil (self.distance_error)
+        self.min_line_width = to_mil (self.min_line_width)
+        self.arc_tolerance = to_mil (self.arc_tolerance)
+        self.layer_arc_tolerance = {layer: to_mil (tolerance) for layer, tolerance in self.layer_arc_tolerance.items()}
 
 
     def save_to_file (cls, filename):
@@ -95,37 +150,70 @@ class Settings(object):
         with open(filename, 'w') as file:
             file.write(json_data) 
 
+    @classmethod
+    def read_file (cls, filename):
+        """ the settings in a JSON file, raises an exception if it can't be read """
+        with open(filename, 'r') as file:
+            dct = json.loads(file.read())
+        if not isinstance(dct, dict):
+            raise ValueError("expected a JSON object")
+        return Settings(dct)
+
     @classmethod
     def load_from_file (cls, filename):
         try:
-            with open(filename, 'r') as file:
-                json_data = file.read()
-                return Settings(json.loads(json_data)) 
+            return cls.read_file(filename)
         except Exception as ex:
             print ("error reading settings file {} {}".format(filename, ex, file=sys.stderr))
             return Settings()
 
-def debug_print (s):
-    if args.verbose and args.verbose>1:
-        print (s)
-
-def verbose_print (s):
-    if args.verbose and args.verbose>0:
-        print (s)
+class ConversionContext(object):
+    """
+    The settings and output options for a conversion, passed to each part of
+    the converter. Conversions with different contexts can run at the same time.
+    """
+
+    def __init__(self, settings=None, verbose=0, jobs=1, stream=False, fast=False, tedit=None, cache=None, snapshot=False,
+                 incremental=False):
+        self.settings = settings if settings else Settings()
+        # 1 shows brief information, 2 complete information
+        self.verbose = verbose or 0
+        # number of layers to convert at once
+        self.jobs = jobs
+        # read DXF files with stream_layers()
+        self.stream = stream
+        # try the fast reader for simple ASCII DXF files first
+        self.fast = fast
+        # timestamp written to footprint files, the current time if None
+        self.tedit = tedit
+        # a ConversionCache for convert_file(), or None
+        self.cache = cache
+        # keep the geometry read from DXF files in snapshot files next to them
+        self.snapshot = snapshot
+        # convert only the parts of a file which changed since the footprint was last written
+        self.incremental = incremental
+
+    def debug_print (self, s):
+        if self.verbose > 1:
+            print (s)
+
+    def verbose_print (self, s):
+        if self.verbose > 0:
+            print (s)
+
+    def to_mm (self, val):
+        if self.settings.units == Units.MIL:
+            return val * 0.0254
+        return val
+
+    def pt_to_mm (self, pt):
+        if self.settings.units == Units.MIL:
+            return [pt[0] * 0.0254, pt[1] * 0.0254]
+        return pt
 
 def to_mil (val):
     return val * 1000 / 25.4
 
-def to_mm (val):
-    if settings.units == Units.MIL:
-        return val * 0.0254
-    return val
-
-def pt_to_mm (pt):
-    if settings.units == Units.MIL:
-        return [pt[0] * 0.0254, pt[1] * 0.0254]
-    return pt
-
 #
 def clip(subjectPolygon, clipPolygon):
     def inside(p):
@@ -176,256 +264,608 @@ def distance_between_points (p1, p2):
     dy = math.fabs(p1[1] - p2[1])
     return math.sqrt (dx*dx + dy*dy)
 
+def get_point (vec):
+    # vec is an ezdxf Vec3
+    return [vec.x, vec.y]
+
+def get_points (entity):
+    """ (x, y, bulge) of each vertex of a polyline entity """
+    if entity.dxftype() == "LWPOLYLINE":
+        return list (entity.get_points('xyb'))
+
+    elif entity.dxftype() == "POLYLINE":
+        points = []
+        for pt in entity.vertices:
+            # pt is VERTEX
+            # pt.dxf.location is Vec3
+            points.append ((pt.dxf.location.x, pt.dxf.location.y, pt.dxf.bulge))
+        return points
+
+    else:
+        raise Exception ("entity {} has no points".format(entity))
+
 #
-def find_center(start, end, angle):
+def add_entity (ctx, table, entity):
+    """ add the geometry of an entity to a SegmentTable """
+    dxftype = entity.dxftype()
 
-    dx = end[0] - start[0]
-    dy = end[1] - start[1]
+    if dxftype in ["LWPOLYLINE", "POLYLINE"]:
 
-    mid = [(start[0] + dx / 2), (start[1] + dy / 2)]
+        num_points = len(entity)
+        ctx.verbose_print ("poly {} {} {}".format(entity, num_points, entity.is_closed))
 
-    dlen = math.sqrt(dx * dx + dy * dy)
-    dist = dlen / (2 * math.tan(angle / 2))
+        # todo: segments may have different widths
+        if dxftype == "LWPOLYLINE":
+            width = entity.dxf.const_width
+        else:
+            width = entity.dxf.default_start_width
+        width = max(width, ctx.settings.min_line_width)
+        points = get_points(entity)
 
-    center = [(mid[0] + dist * (dy / dlen)), (mid[1] - dist * (dx / dlen)) ]
+        table.add_polyline (points, entity.is_closed, dxftype == "LWPOLYLINE", width, entity.dxf.handle)
 
-    radius = math.sqrt(dist * dist + (dlen / 2) * (dlen / 2))
+    elif dxftype == "LINE":
+        table.add_line (get_point(entity.dxf.start), get_point(entity.dxf.end),
+                        entity.dxf.thickness, entity.dxf.handle)
+        ctx.verbose_print ("added {}".format(entity))
 
-    arc_start = math.atan2(start[1] - center[1], start[0] - center[0])
-    arc_end = math.atan2(end[1] - center[1], end[0] - center[0])
+    elif dxftype == "CIRCLE":
+        table.add_circle (get_point(entity.dxf.center), entity.dxf.radius,
+                          entity.dxf.thickness, entity.dxf.handle)
+        ctx.verbose_print ("added {}".format(entity))
 
-    return radius, center[0], center[1], arc_start, arc_end
-#
+    elif dxftype == "ARC":
+        table.add_arc (get_point(entity.dxf.center), entity.dxf.radius,
+                       entity.dxf.start_angle, entity.dxf.end_angle,
+                       entity.dxf.thickness, entity.dxf.handle)
+        ctx.verbose_print ("added {}".format(entity))
+
+    else:
+        ctx.verbose_print ("entity {} discarded".format(entity))
+
+
+
+def extract_segments (ctx, layer, entities):
+    """ read the geometry of the entities on a layer into a SegmentTable """
+    table = SegmentTable (layer)
+
+    for entity in entities:
+        add_entity (ctx, table, entity)
+
+    return table
+
+
+def partition_entities (entities):
+    """ bucket entities by layer, returns {layer: [entities]} in the order first seen """
+    buckets = {}
+    for entity in entities:
+        layer = entity.dxf.layer
+        bucket = buckets.get(layer)
+        if bucket is None:
+            bucket = buckets[layer] = []
+        bucket.append (entity)
+    return buckets
+
+def partition_layers (dxf):
+    """
+    Bucket the modelspace entities by layer in a single pass.
+    Returns {layer: [entities]} in layer table order, then any layers not in
+    the layer table in the order first seen. Empty layers are left out.
+    """
+    buckets = partition_entities (dxf.modelspace())
+
+    layers = {}
+    for layer in dxf.layers:
+        name = layer.dxf.name
+        if name in buckets:
+            layers[name] = buckets.pop(name)
+    layers.update (buckets)
+    return layers
+
+def read_layers (ctx, dxf):
+    """ the modelspace of a DXF document as a list of (SegmentTable, hatches, inserts), one per layer """
+    layers = partition_layers (dxf)
+    ctx.debug_print ("Layers: {}".format(list(layers)))
+
+    result = []
+    for layer, entities in layers.items():
+
+        ctx.verbose_print ("layer {} to {}".format (layer, ctx.settings.get_layer_name(layer)))
+
+        others, hatches, inserts = split_entities (entities)
+        result.append ((extract_segments (ctx, layer, others), hatches, inserts))
+    return result
+
+def layer_ends (dxf_path):
+    """ index of the last entity of each layer in the modelspace of a DXF file, as read by stream_layers() """
+    from ezdxf.addons import iterdxf
+
+    ends = {}
+    for n, entity in enumerate (iterdxf.modelspace (dxf_path, types=STREAM_TYPES)):
+        ends[entity.dxf.layer] = n
+    return ends
+
+def stream_layers (ctx, dxf_path):
+    """
+    Read the modelspace of a DXF file like read_layers(), without loading the
+    whole document. Each entity is added to the SegmentTable of its layer as
+    it is read and then dropped, so only the compact tables are kept.
+    Yields (n, (table, hatches, inserts)) for each layer as soon as its last
+    entity is read, where n is the place of the layer in the order first seen,
+    so only the layers which are not finished yet are kept in memory. The last
+    entity of each layer is found by reading the file once before.
+    The blocks are not read, so INSERTs are skipped.
+    """
+    from ezdxf.addons import iterdxf
+
+    ends = layer_ends (dxf_path)
+    numbers = {}
+    tables = {}
+    hatches = {}
+    skipped = 0
+    for n, entity in enumerate (iterdxf.modelspace (dxf_path, types=STREAM_TYPES)):
+        layer = entity.dxf.layer
+        table = tables.get (layer)
+        if table is None:
+            ctx.verbose_print ("layer {} to {}".format (layer, ctx.settings.get_layer_name(layer)))
+            numbers[layer] = len (numbers)
+            table = tables[layer] = SegmentTable (layer)
+            hatches[layer] = []
+
+        dxftype = entity.dxftype()
+        if dxftype == "HATCH":
+            hatches[layer].append (entity)
+        elif dxftype == "INSERT":
+            skipped += 1
+        else:
+            add_entity (ctx, table, entity)
+
+        if n == ends[layer]:
+            yield numbers[layer], (tables.pop (layer), hatches.pop (layer), [])
+
+    if skipped:
+        print ("[Warning]: {} INSERTs skipped, blocks are not read when streaming".format(skipped), file=sys.stderr)
 
 #
-def get_start_end_pts(entity):
-    if "LINE" == entity.dxf.dxftype:
-        start = get_point(entity.dxf.start)
-        end = get_point(entity.dxf.end)
-        debug_print("LINE {} {}".format(start, end))
-        return (start, end)
-
-    elif "ARC" == entity.dxf.dxftype:
-        center = get_point (entity.dxf.center)
-        start = (center[0] + entity.dxf.radius * math.cos(radians(entity.dxf.start_angle)),
-              center[1] + entity.dxf.radius * math.sin(radians(entity.dxf.start_angle)), 0)
-        end = (center[0] + entity.dxf.radius * math.cos(radians(entity.dxf.end_angle)),
-            center[1] + entity.dxf.radius * math.sin(radians(entity.dxf.end_angle)), 0)
-        debug_print("ARC {} {}".format(start, end))
-        return (start,end)
-
-    elif entity.dxf.dxftype in ["LWPOLYLINE", "POLYLINE"]:
-        ety_points = get_points (entity)
-        return (ety_points[0], ety_points[-1])
 
-    else:
-        print("[Error]: Unexpected dxftype {}".format(entity.dxf.dxftype), file=sys.stderr)
+class LayerConverter:
+    """
+    Chains the segments of one layer into polygons and lines.
+    Only uses the segment table and the context, so can run in a worker process.
+    """
+
+    def __init__ (self, ctx, segments, arc_tolerance, distance_error):
+        self.ctx = ctx
+        self.settings = ctx.settings
+        self.segments = segments
+        self.layer = segments.layer
+        self.arc_tolerance = arc_tolerance
+        self.distance_error = distance_error
+        self.shapes = Shapes()
+        self.cur_poly = []
+        # for each shape, (0, row) for rows which are not chained, or (1, first row) for chains
+        self.sources = []
+        self.source = None
 
+    def add_poly (self, poly_points, width, layer):
+        self.shapes.add_poly (poly_points, width, layer)
+        self.sources.append (self.source)
 
-def is_poly (entity):
-    if entity.dxf.dxftype in ['LWPOLYLINE', "POLYLINE"]:
-        return True
-    else:
-        return False
+    # compatible with v5
+    def add_lines (self, poly_points, width, layer):
+        self.shapes.add_lines (poly_points, width, layer)
+        self.sources.append (self.source)
+
+    def add_arc (self, center, start, sweep, width, layer):
+        self.shapes.add_arc (center, start, sweep, width, layer)
+        self.sources.append (self.source)
+
+    # add a chain of segments as fp_line/fp_arc
+    def add_segments (self, shapes, width, layer):
+
+        for shape, direction in shapes:
+            kind = self.segments.kind[shape]
+            if kind == SEG_LINE:
+                points = [self.segments.start_point(shape), self.segments.end_point(shape)]
+                if direction == -1:
+                    points.reverse()
+                self.add_lines (points, width, layer)
+
+            elif kind == SEG_ARC:
+                self.add_arc ( (self.segments.cx[shape], self.segments.cy[shape]),
+                               self.segments.start_point(shape),
+                               arc_sweep (self.segments.start_angle[shape], self.segments.end_angle[shape]),
+                               width, layer)
+
+    # add an open polyline as fp_line/fp_arc
+    def add_poly_segments (self, shape, width, layer):
+
+        vertices = self.segments.vertices(shape)
+        for j, point in enumerate(vertices[:-1]):
+            next_point = vertices[j + 1]
+            if point[0] == next_point[0] and point[1] == next_point[1]:
+                continue
+            if point[2] == 0:
+                self.add_lines ([point, next_point], width, layer)
+            else:
+                cx, cy, radius, start, sweep = bulge_to_arc (point, next_point, point[2])
+                self.add_arc ( (cx, cy), point, math.degrees(sweep), width, layer)
 
-def get_point (vec : Vec3):
-    return [vec.x, vec.y]
+    def is_near (self, p1, p2):
+        dx = math.fabs(p1[0] - p2[0])
+        dy = math.fabs(p1[1] - p2[1])
+        if (dx < self.distance_error) and (dy < self.distance_error):
+            return True
+        else:
+            return False
+        
 
-def get_points (entity):
-    if entity.dxf.dxftype == "LWPOLYLINE":
-        points = []
-        for pt in entity.get_points('xyb'):
-            # pt is tuple (x,y,bulge)
-            points.append (pt)
-        return points
+    def start_new_shape (self):
 
-    elif entity.dxf.dxftype == "POLYLINE":
-        points = []
-        for pt in entity.vertices:
-            # pt is VERTEX
-            # pt.dxf.location is Vec3
-            points.append ([pt.dxf.location.x, pt.dxf.location.y, pt.dxf.bulge])
-        return points
+        if self.cur_poly:
+            #todo : width
+            self.add_poly (self.cur_poly, 0, self.layer)
 
-    elif entity.dxf.dxftype == "LINE":
-        return [ get_point(entity.dxf.start), get_point(entity.dxf.end) ]
+        self.cur_poly = []
 
-    elif entity.dxf.dxftype == "ARC":
-        center = get_point (entity.dxf.center)
-        return [center]
+        if len(self.not_processed_data) > 0:
+            self.current_shape, start, end = self.not_processed_data.pop() #pick up one
+            self.cur_shapes = [(self.current_shape, 1)]
+            self.source = (1, self.current_shape)
 
-    else:
-        raise Exception ("entity {} has no points".format(entity))
+            self.point_to_close = start
+            self.pts_next = end
 
-def is_poly_closed (poly_points):
-    dx = math.fabs(poly_points[0][0] - poly_points[-1][0])
-    dy = math.fabs(poly_points[0][1] - poly_points[-1][1])
-    if (dx < settings.distance_error) and (dy < settings.distance_error):
-        return True
-    else:
-        return False
+            self.ctx.debug_print ("starting point {}".format(self.point_to_close))
 
-#
-def add_points(ety, direction, cur_poly):
+            self.cur_poly.extend (segment_points(self.segments, self.current_shape, 1, self.arc_tolerance))
+        else:
+            self.pts_next = None
 
-    points = []
-    if 'LINE' == ety.dxf.dxftype:
-        points = get_points (ety)
 
-    elif 'ARC' == ety.dxf.dxftype:
 
-        step = 1.0/ety.dxf.radius
-        angle = ety.dxf.start_angle
-        center = get_point(ety.dxf.center)
+    def is_chained (self, i):
+        """ if row i is joined to the rows it meets, otherwise it is converted on its own """
+        kind = self.segments.kind[i]
+        if kind == SEG_POLY or kind == SEG_CIRCLE:
+            return False
+        return not (self.settings.native_arcs and kind == SEG_ARC
+                    and arc_sweep (self.segments.start_angle[i], self.segments.end_angle[i]) == 360)
 
-        debug_print ("angle {} {}".format( ety.dxf.start_angle, ety.dxf.end_angle))
+    def convert (self):
+        """ chain the segments into polygons and lines, returns the Shapes """
+        layer = self.layer
 
-        if (ety.dxf.start_angle > ety.dxf.end_angle):
-            ety.dxf.end_angle += 360
-        while True:
-            points.append( (center[0] + ety.dxf.radius * math.cos(radians(angle)),
-                            center[1] + ety.dxf.radius * math.sin(radians(angle))) )
-            angle +=  step
-            if (angle > ety.dxf.end_angle):
-                break
+        self.not_processed_data = EndpointIndex (self.distance_error)
 
-    elif ety.dxf.dxftype in ["LWPOLYLINE", "POLYLINE"]:
-        ety_points = get_points(ety)
-        for j,point in enumerate(ety_points):
-            #print ("{} {} ".format (j, point))
-            if ety.dxf.dxftype == "LWPOLYLINE" and j == len(ety_points)-1:
-                break
+        for i in range(len(self.segments)):
+            self.source = (0, i)
+            if self.is_chained (i):
+                self.not_processed_data.add (i, self.segments.start_point(i), self.segments.end_point(i))
 
-            #dbg ("%d %2.1f,%2.1f %2.3f" % (j, ety.points[j][0], ety.points[j][1], ety.bulge[j]))
+            elif self.segments.kind[i] == SEG_POLY:
+                width = self.segments.width[i]
+                self.cur_poly = segment_points (self.segments, i, 1, self.arc_tolerance)
 
-            if point[2] == 0:
-                points.append (point)
-            else:
-                if point[2] < 0:
-                    p2 = ety_points[j]
-                    p1 = ety_points[(j+1) % len(ety_points)]
+                if self.is_near (self.cur_poly[0], self.cur_poly[-1]):
+                    self.add_poly (self.cur_poly, width, layer)
                 else:
-                    p1 = ety_points[j]
-                    p2 = ety_points[(j+1) % len(ety_points)]
-
-                pl = []
-                if p1[0] != p2[0] and p1[1] != p2[1]:
-                    angle = math.atan(point[2]) * 4.0
-                    radius, xc, yc, start_angle, end_angle = find_center(p1, p2, angle)
-                    #dbg ("        r=%2.1f c=(%2.1f,%2.1f) sa=%2.1f ea=%2.1f" % (radius, xc, yc, degrees(start_angle), degrees(end_angle)))
-                    if end_angle < start_angle:
-                        end_angle += 2 * math.pi
-                    angle = start_angle
-                    step = math.radians(1.0/radius)
-                    while 1:
-                        pl.append( (xc + radius * math.cos(angle), yc + radius * math.sin(angle)) )
-                        angle += step
-                        if angle > max(start_angle, end_angle):
-                            break
-                    #
-                    if start_angle < end_angle :
-                        pl.reverse()
-                    for p in pl:
-                        points.append (p)
+                    if self.segments.is_closed (i):
+                        self.cur_poly.append (self.cur_poly[0])
+                        self.add_poly (self.cur_poly, width, layer)
+                    elif self.settings.native_arcs:
+                        self.add_poly_segments (i, width, layer)
+                    else:
+                        self.add_lines (self.cur_poly, width, layer)
 
-    else:
-        print ("[Error]: Unexpected dxftype {}".format(entity.dxftype), file=sys.stderr)
+            elif self.segments.kind[i] == SEG_CIRCLE:
+                if self.settings.is_outline_layer (layer):
+                    self.add_arc ( (self.segments.cx[i], self.segments.cy[i]), self.segments.start_point(i),
+                                   360, self.segments.width[i], layer)
+                else:
+                    self.add_poly (segment_points (self.segments, i, 1, self.arc_tolerance),
+                                   self.segments.width[i], layer)
 
-    #
-    if direction == -1:
-        points.reverse()
+            else:
+                # a full circle arc, with native arcs
+                self.add_arc ( (self.segments.cx[i], self.segments.cy[i]), self.segments.start_point(i),
+                               360, self.segments.width[i], layer)
 
-    # don't add last point?
-    for point in points:
-        cur_poly.append (point)
+        #
+        self.cur_poly = []
+        self.start_new_shape()
+        self.ctx.debug_print ("Not Processed Shape: {}".format (len(self.not_processed_data)))
 
+        while self.pts_next:
+            pt = self.pts_next
+            self.ctx.debug_print ("Searching entity which is connected with {}".format(pt))
+            #
+            match = self.not_processed_data.find (pt)
 
-def get_layer_name (layer):
-    if layer in settings.layers:
-        return settings.layers.get (layer, layer)
-    elif layer in KicadLayer.standard_layers:
-        return layer
-    else:
-        return KicadLayer.F_Cu
+            if match is None:
 
-#
+                self.ctx.debug_print ("No match found, check if we could close the loop")
+
+                if self.is_near (self.point_to_close, pt):
+                    self.ctx.debug_print ("shape closed at {}".format(pt))
+                    self.cur_poly.append (pt)
+                    # find next shape
+                    self.start_new_shape()
+                    self.ctx.debug_print ("Not Processed Shape: {}".format(len(self.not_processed_data)))
+
+                else:
+                    if self.ctx.verbose:
+                        nearest_pt, nearest_dist = self.not_processed_data.nearest (pt)
+                        self.ctx.verbose_print ("unconnected line on layer {} at {} - nearest was {} {:.4f}".
+                                       format (layer, Point(pt=self.pts_next), nearest_pt, nearest_dist))
+
+                    if self.settings.native_arcs:
+                        self.add_segments (self.cur_shapes, self.segments.width[self.current_shape], layer)
+                    else:
+                        self.add_lines (self.cur_poly, self.segments.width[self.current_shape], layer)
+
+                    self.cur_poly = []
+                    self.start_new_shape()
+            else:
+                key, matched_shape, direction, self.pts_next = match
+                self.ctx.debug_print ("Got the Point {}".format(Point(pt=pt)))
+
+                self.ctx.debug_print ("now print the line on {}".format(self.segments.describe(matched_shape)))
+                self.cur_poly.extend (segment_points(self.segments, matched_shape, direction, self.arc_tolerance))
+                self.cur_shapes.append ((matched_shape, direction))
+
+                self.ctx.debug_print ("removed from the set, {}".format(self.segments.describe(matched_shape)))
+                self.not_processed_data.remove(key) #remove from the set
+
+                self.ctx.debug_print ("Not Processed Shape: {}".format (len(self.not_processed_data)))
+
+        return self.shapes
+
+
+def convert_layer (ctx, segments, arc_tolerance, distance_error):
+    """ convert the segments of one layer, returns Shapes in DXF coordinates """
+    segments.tessellate (arc_tolerance)
+    return LayerConverter (ctx, segments, arc_tolerance, distance_error).convert()
+
+def convert_layer_incremental (ctx, segments, arc_tolerance, distance_error, previous):
+    """
+    Convert the segments of one layer like convert_layer(), reusing the shapes
+    of the connected components in previous which have not changed. previous
+    is the state of the layer from the last run, {component key: [(phase,
+    position, shape items)]}. Returns the Shapes and the new state.
+    """
+    converter = LayerConverter (ctx, segments, arc_tolerance, distance_error)
+    fingerprints = [row_fingerprint (segments, i) for i in range(len(segments))]
+    components = connected_components (segments, [converter.is_chained (i) for i in range(len(segments))],
+                                       distance_error)
+
+    # groups of shapes by source, the same order as convert_layer() is (phase, row) for
+    # rows which are not chained, then (phase, -first row) for chains
+    groups = []
+    state = {}
+    changed = []
+    position = {}
+    for rows in components:
+        key = component_key (segments, rows, fingerprints)
+        saved = previous.get (key)
+        if saved is None:
+            state[key] = []
+            for n, i in enumerate(rows):
+                position[i] = (key, n)
+            changed.extend (rows)
+        else:
+            state[key] = saved
+            for phase, n, items in saved:
+                groups.append (((phase, rows[n] if phase == 0 else -rows[n]), items))
+
+    ctx.verbose_print ("layer {}: {} of {} segments changed".format (segments.layer, len(changed), len(segments)))
+
+    if changed:
+        changed.sort()
+        table = segments.subset (changed)
+        table.tessellate (arc_tolerance)
+        converter = LayerConverter (ctx, table, arc_tolerance, distance_error)
+        shapes = converter.convert()
+
+        by_source = {}
+        for item, (phase, row) in zip (shapes.items, converter.sources):
+            by_source.setdefault ((phase, changed[row]), []).append (item)
+        for (phase, i), items in by_source.items():
+            key, n = position[i]
+            state[key].append ((phase, n, items))
+            groups.append (((phase, i if phase == 0 else -i), items))
+
+    groups.sort (key=lambda group: group[0])
+    shapes = Shapes()
+    for order, items in groups:
+        shapes.items.extend (items)
+    return shapes, state
+
+def split_entities (entities):
+    """ split out the entities which are not chained: returns (others, hatches, inserts) """
+    others = []
+    hatches = []
+    inserts = []
+    for entity in entities:
+        kind = entity.dxftype()
+        if kind == "HATCH":
+            hatches.append (entity)
+        elif kind == "INSERT":
+            inserts.append (entity)
+        else:
+            others.append (entity)
+    return others, hatches, inserts
 
 class DxfConverter:
 
-    def __init__ (self, dxf):
+    def __init__ (self, dxf, ctx=None):
         self.dxf = dxf
+        self.ctx = ctx if ctx else ConversionContext()
+        self.settings = self.ctx.settings
         self.footprint = None
-
-    def add_poly (self, poly_points, width, layer):
+        self.shapes = Shapes()
+        # converted blocks, by (block name, layer for entities on layer 0, scale)
+        self.block_cache = {}
+        self.blocks_expanding = set()
+        # with ctx.incremental, the state of each layer from the last run, read by
+        # convert_file(), and the new state of each layer
+        self.previous = None
+        self.state = {}
+
+    def write_poly (self, poly_points, width, layer):
         points = []
         for point in poly_points:
             # in KiCad Y axis has opposite direction
-            pt_mm = pt_to_mm (point)
+            pt_mm = self.ctx.pt_to_mm (point)
             points.append ({'x': round(pt_mm[0],4), 'y':round(-pt_mm[1],4)})
-        poly = {'layer':get_layer_name(layer), 'width':to_mm(width), 'pts':points}
+        poly = {'layer':self.settings.get_layer_name(layer), 'width':self.ctx.to_mm(width), 'pts':points}
 
         self.footprint.polys.append (poly)
 
-    # compatible with v5
-    def add_lines (self, poly_points, width, layer):
+    def write_lines (self, poly_points, width, layer):
 
         for j,point in enumerate(poly_points[:-1]):
             # in KiCad Y axis has opposite direction
-            start = pt_to_mm( [point[0], -point[1]] )
-            end = pt_to_mm ( [ poly_points [j + 1][0], -poly_points [j + 1][1] ] )
-            self.footprint.addLine(start, end, get_layer_name(layer), to_mm(width) )
+            start = self.ctx.pt_to_mm( [point[0], -point[1]] )
+            end = self.ctx.pt_to_mm ( [ poly_points [j + 1][0], -poly_points [j + 1][1] ] )
+            self.footprint.addLine(start, end, self.settings.get_layer_name(layer), self.ctx.to_mm(width) )
+
+    def write_arc (self, center, start, sweep, width, layer):
+        # in KiCad Y axis has opposite direction, and positive arc angles are clockwise
+        center = self.ctx.pt_to_mm ( [center[0], -center[1]] )
+        start = self.ctx.pt_to_mm ( [start[0], -start[1]] )
+        if sweep == 360:
+            self.footprint.addCircle(center, start, self.settings.get_layer_name(layer), self.ctx.to_mm(width) )
+        else:
+            self.footprint.addArc(center, start, -sweep, self.settings.get_layer_name(layer), self.ctx.to_mm(width) )
+
+    # write the converted shapes to the footprint
+    def write_shapes (self, shapes):
+
+        for kind, layer, width, data in shapes.items:
+            if kind == SHAPE_POLY:
+                self.write_poly (data, width, layer)
+            elif kind == SHAPE_LINES:
+                self.write_lines (data, width, layer)
+            else:
+                self.write_arc (data[0], data[1], data[2], width, layer)
 
     # requires v6?
     def add_lines_v6 (self, poly_points, width, layer):
         points = []
         for point in poly_points:
             # in KiCad Y axis has opposite direction
-            pt_mm = pt_to_mm (point)
+            pt_mm = self.ctx.pt_to_mm (point)
             points.append ({'x': round(pt_mm[0],4), 'y':round(-pt_mm[1],4)})
         # width must be > 0
-        poly = {'layer':get_layer_name(layer), 'width':0.001, 'pts':points, 'fill': 'none'}
+        poly = {'layer':self.settings.get_layer_name(layer), 'width':0.001, 'pts':points, 'fill': 'none'}
 
         self.footprint.polys.append (poly)
 
 
-    def is_near (self, p1, p2):
-        dx = math.fabs(p1[0] - p2[0])
-        dy = math.fabs(p1[1] - p2[1])
-        if (dx < settings.distance_error) and (dy < settings.distance_error):
-            return True
+
+    def convert_entities (self, layer, entities, zero_layer=None, scale=1):
+        """
+        Convert the entities on one layer, adding the results to self.shapes.
+        Inside a block, entities on layer 0 take the layer of the INSERT (zero_layer),
+        and scale is the size of the block in the drawing, used to keep the
+        tolerances the same in the drawing.
+        """
+        if layer == "0" and zero_layer is not None:
+            layer = zero_layer
+
+        others, hatches, inserts = split_entities (entities)
+        self.shapes.extend (convert_layer (self.ctx, extract_segments (self.ctx, layer, others),
+                                           self.settings.get_arc_tolerance (layer) / scale,
+                                           self.settings.distance_error / scale))
+        self.convert_unchained (layer, hatches, inserts, scale)
+
+    def layer_job (self, segments):
+        """ the function and arguments to convert the segments of a layer """
+        args = (self.ctx, segments, self.settings.get_arc_tolerance (segments.layer), self.settings.distance_error)
+        if self.previous is None:
+            return convert_layer, args
+        return convert_layer_incremental, args + (self.previous.get (segments.layer, {}),)
+
+    def add_layer_result (self, layer, result):
+        """ add the result of the function from layer_job() """
+        if self.previous is None:
+            self.shapes.extend (result)
         else:
-            return False
-        
+            shapes, self.state[layer] = result
+            self.shapes.extend (shapes)
 
-    def start_new_shape (self, layer):
+    def layer_shapes (self, layer, result, hatches, inserts):
+        """ the shapes of a layer, from the result of the function from layer_job() and the unchained entities """
+        self.shapes = Shapes()
+        self.add_layer_result (layer, result)
+        self.convert_unchained (layer, hatches, inserts)
+        return self.shapes
 
-        if self.cur_poly:
-            #todo : width
-            self.add_poly (self.cur_poly, 0, layer)
+    def convert_unchained (self, layer, hatches, inserts, scale=1):
 
-        self.cur_poly = []
+        # hatch boundaries are complete loops, so don't need chaining
+        for hatch in hatches:
+            for points in hatch_polygons (hatch, self.settings.get_arc_tolerance (layer) / scale):
+                self.shapes.add_poly (points, 0, layer)
 
-        if len(self.not_processed_data) > 0:
-            self.current_shape = self.not_processed_data.pop() #pick up one
-            points = get_start_end_pts(self.current_shape)
+        for insert in inserts:
+            self.expand_insert (insert, layer, scale)
 
-            self.point_to_close = points[0]
-            self.pts_next = points[1]
+    def expand_insert (self, insert, layer, scale):
 
-            debug_print ("starting point {}".format(self.point_to_close))
+        name = insert.dxf.name
+        if name in self.blocks_expanding:
+            print ("[Error]: Block {} contains itself".format(name), file=sys.stderr)
+            return
 
-            add_points(self.current_shape, 1, self.cur_poly)
+        if insert.mcount > 1:
+            placements = insert.multi_insert()
         else:
-            self.pts_next = None
+            placements = [insert]
 
+        tolerance = self.settings.get_arc_tolerance (layer) / scale
+        for placement in placements:
+            matrix = matrix_from_m44 (placement.matrix44())
+            block_shapes = self.convert_block (name, layer, scale * matrix_scale(matrix))
+            self.shapes.extend (block_shapes.transformed (matrix, tolerance))
 
-    def convert_layers (self, dxf, footprint_path):
+    def convert_block (self, name, zero_layer, scale):
+        """ convert a block definition, the result is cached and in block coordinates """
+        key = (name, zero_layer, scale)
+        shapes = self.block_cache.get (key)
+        if shapes is not None:
+            return shapes
 
-        basename = os.path.splitext(os.path.basename(footprint_path))[0]
+        self.ctx.verbose_print ("block {} on layer {} scale {:g}".format (name, zero_layer, scale))
+
+        # convert into a new list, saving the list of the caller
+        saved = self.shapes
+        self.shapes = Shapes()
+        self.blocks_expanding.add (name)
+
+        for layer, entities in partition_entities (self.dxf.blocks[name]).items():
+            self.convert_entities (layer, entities, zero_layer, scale)
+
+        self.blocks_expanding.discard (name)
+        shapes = self.shapes
+        self.shapes = saved
+
+        self.block_cache[key] = shapes
+        return shapes
+
+    def convert (self, name, description=None, layers=None):
+        """
+        convert the drawing into a new footprint, which is returned without saving it.
+        layers is the result of read_layers(), read from self.dxf if None, or of
+        stream_layers(), where each layer is converted as soon as it is read.
+        """
+
+        from dxf2kicad_common.kicad_mod import KicadMod
 
         self.footprint = KicadMod ()
-        self.footprint.name = basename
-        self.footprint.description = "Converted from " + os.path.basename(footprint_path)
+        self.footprint.name = name
+        self.footprint.description = description if description else "Converted from DXF"
         self.footprint.tags = "DXF"
         self.footprint.layer = KicadLayer.F_Cu
         self.footprint.attribute = 'virtual'
@@ -440,165 +880,361 @@ class DxfConverter:
         self.footprint.value['pos']['y'] = 4
         self.footprint.value['font']['thickness'] = 0.2
 
-        print ("Creating {}".format(basename))
-
-        layers = [layer.dxf.name for layer in dxf.layers]
-        debug_print ("Layers: {}".format(layers))
+        if layers is None:
+            layers = read_layers (self.ctx, self.dxf)
 
-        self.cur_poly = []
+        # todo: get drawing extent
 
-        model_space = dxf.modelspace()
+        # (n, layer), the shapes are added in the order of n
+        if isinstance (layers, list):
+            size = sum (len(segments) for segments, hatches, inserts in layers)
+            workers = min (self.ctx.jobs, len(layers))
+            numbered = list (enumerate (layers))
+            if workers > 1 and size >= PARALLEL_MIN_SEGMENTS:
+                min_segments = 0
+                # biggest layers first, the results are still added in layer order
+                numbered.sort (key=lambda item: -len(item[1][0]))
+            else:
+                min_segments = None
+        else:
+            # streamed, the size of each layer is only known when it is read,
+            # so layers of PARALLEL_MIN_SEGMENTS or more go to worker processes
+            workers = self.ctx.jobs
+            min_segments = PARALLEL_MIN_SEGMENTS if workers > 1 else None
+            numbered = layers
+
+        shapes = {}
+        results = {}
+        pool = None
+        try:
+            for n, (segments, hatches, inserts) in numbered:
+                function, args = self.layer_job (segments)
+                if min_segments is not None and len(segments) >= min_segments:
+                    if pool is None:
+                        from concurrent.futures import ProcessPoolExecutor
+                        pool = ProcessPoolExecutor (max_workers=workers)
+                    results[n] = (segments.layer, pool.submit (function, *args), hatches, inserts)
+                else:
+                    shapes[n] = self.layer_shapes (segments.layer, function (*args), hatches, inserts)
 
-        # todo: get drawing extent
+            for n, (layer, result, hatches, inserts) in results.items():
+                shapes[n] = self.layer_shapes (layer, result.result(), hatches, inserts)
+        finally:
+            if pool is not None:
+                pool.shutdown ()
 
-        for layer in layers:
+        self.shapes = Shapes()
+        for n in sorted (shapes):
+            self.shapes.extend (shapes[n])
 
-            verbose_print ("layer {} to {}".format (layer, get_layer_name(layer)))
+        self.write_shapes (self.shapes)
+        return self.footprint
 
-            self.layer_data = model_space.query ('*[layer =="{}"]'.format(layer))
-            self.not_processed_data = []
+    def convert_layers (self, dxf, footprint_path, layers=None):
 
-            for entity in self.layer_data:
-                if entity.dxf.dxftype in  ["LWPOLYLINE", "POLYLINE"]:
+        basename = os.path.splitext(os.path.basename(footprint_path))[0]
 
-                    num_points = entity.__len__()
-                    verbose_print ("poly {} {} {}".format(entity, num_points, entity.is_closed))
+        print ("Creating {}".format(basename))
 
-                    # todo: segments may have different widths
-                    if entity.dxf.dxftype == "LWPOLYLINE":
-                        num_points -= 1
-                        width = entity.dxf.const_width
-                    else:
-                        width = entity.dxf.default_start_width
-                    width = max(width, settings.min_line_width)
-                    points = get_points(entity)
-
-                    if num_points == 2:
-                        #print ("simple poly")
-                        #todo: handle bulge
-                        start = points[0]
-                        end   = points[1]
-                        line = model_space.add_line (start, end)
-                        line.dxf.thickness =  max(entity.dxf.default_start_width, settings.min_line_width)
-                        self.not_processed_data.append (line)
-                        debug_print ("added line {}".format(line.dxf.thickness))
-                    else:
-                        self.cur_poly = []
-                        add_points(entity, 1, self.cur_poly)
-
-                        if is_poly_closed (self.cur_poly):
-                            self.add_poly (self.cur_poly, width, layer)
-                        else:
-                            if entity.is_closed:
-                                self.cur_poly.append (self.cur_poly[0])
-                                self.add_poly (self.cur_poly, width, layer)
-                            else:
-                                self.add_lines (self.cur_poly, width, layer)
-
-                elif entity.dxf.dxftype in  ["ARC", "LINE"]:
-                    self.not_processed_data.append (entity)
-                    verbose_print ("added {}".format(entity))
+        footprint = self.convert (basename, "Converted from " + os.path.basename(footprint_path), layers)
 
-                else:
-                    verbose_print ("entity {} discarded".format(entity))
+        # write footprint to a temporary file, which replaces the file when it is complete
+        with atomic_path (footprint_path) as temp_path:
+            footprint.save (temp_path, self.ctx.tedit)
 
-            #
-            self.cur_poly = []
-            self.start_new_shape(layer)
-            debug_print ("Not Processed Shape: {}".format (len(self.not_processed_data)))
 
-            while self.pts_next:
+def read_dxf (ctx, dxf_path):
+    import ezdxf
 
-                if is_poly (self.current_shape):
-                    debug_print ("cur is poly")
-                    self.start_new_shape(layer)
-                    continue
-                #
-                pt = self.pts_next
-                debug_print ("Searching entity which is connected with {}".format(pt))
-                #
-                matched_entity = None
-                nearest_pt = None
-                nearest_dist = math.inf
-
-                for entity in self.not_processed_data:
-                    points = get_start_end_pts(entity)
-
-                    d = distance_between_points (points[0], pt)
-                    if d < nearest_dist:
-                        nearest_dist = d
-                        nearest_pt = points[0]
-
-                    if self.is_near (points[0], pt):
-                        # matched
-                        matched_entity = entity
-                        direction = 1 # from start to end
-                        self.pts_next = points[1]
-                        debug_print ("Got the Point {}".format(Point(pt=points[0])))
-                        break
-
-                    d = distance_between_points (points[1], pt)
-                    if d < nearest_dist:
-                        nearest_dist = d
-                        nearest_pt = points[1]
-
-                    if self.is_near (points[1], pt):
-                        # matched
-                        matched_entity = entity
-                        direction = -1 # from end to start
-                        self.pts_next = points[0]
-                        debug_print ("Got the Point {}".format(Point(pt=points[1])))
-                        break
-
-                if matched_entity == None:
-
-                    debug_print ("No match found, check if we could close the loop")
-
-                    if self.is_near (self.point_to_close, pt):
-                        debug_print ("shape closed at {}".format(pt))
-                        self.cur_poly.append (pt)
-                        # find next shape
-                        self.start_new_shape(layer)
-                        debug_print ("Not Processed Shape: {}".format(len(self.not_processed_data)))
+    dxf = ezdxf.readfile(dxf_path)
 
-                    else:
-                        verbose_print ("unconnected line on layer {} at {} - nearest was {} {:.4f}".
-                                       format (layer, Point(pt=self.pts_next), nearest_pt, nearest_dist))
+    ctx.debug_print ("DXF version : {}".format(dxf.dxfversion))
+    ctx.debug_print ("Entity Count: {}".format (len(dxf.entities)))
+    return dxf
 
-                        self.add_lines (self.cur_poly, self.current_shape.dxf.thickness, layer)
+def convert (dxf_or_path, options=None, name=None):
+    """
+    Convert a DXF document, or the DXF file at a path, to a footprint.
+    options is a ConversionContext, the defaults are used if None.
+    The name defaults to the DXF file name. Returns the KicadMod without saving it.
+    """
+    ctx = options if options else ConversionContext()
+    if isinstance (dxf_or_path, (str, os.PathLike)):
+        filename = os.path.basename (dxf_or_path)
+        if not name:
+            name = os.path.splitext (filename)[0]
+        description = "Converted from " + filename
+        dxf, layers = load_layers (ctx, dxf_or_path)
+    else:
+        dxf = dxf_or_path
+        layers = None
+        if not name:
+            name = "DXF"
+        description = None
+    return DxfConverter (dxf, ctx).convert (name, description, layers)
+
+def load_layers (ctx, dxf_path):
+    """
+    Read a DXF file the way set in ctx. Returns (document, None) when the file
+    was loaded with ezdxf, otherwise (None, layers) as from read_layers() or
+    stream_layers().
+    With ctx.snapshot, the layers are read from the snapshot of the file when
+    it is up to date, and a snapshot is saved when it is not.
+    """
+    if not ctx.snapshot:
+        return read_source (ctx, dxf_path)
+
+    path = snapshot_path (dxf_path)
+    key = snapshot_key (ctx)
+    layers = load_snapshot (path, dxf_path, key)
+    if layers is not None:
+        ctx.verbose_print ("{}: read from {}".format (dxf_path, path))
+        return None, layers
+
+    source = source_info (dxf_path)
+    dxf, layers = read_source (ctx, dxf_path)
+    if layers is None:
+        layers = read_layers (ctx, dxf)
+    elif not isinstance (layers, list):
+        # streamed, all the layers are saved
+        layers = [layer for n, layer in sorted (layers, key=lambda item: item[0])]
+
+    # hatches and inserts are kept as ezdxf entities, which are not saved
+    if any (hatches or inserts for segments, hatches, inserts in layers):
+        ctx.verbose_print ("{}: has HATCH or INSERT entities, no snapshot saved".format (dxf_path))
+    else:
+        save_snapshot (path, source, layers, key)
+    return dxf, layers
 
-                        self.cur_poly = []
-                        self.start_new_shape(layer)
-                else:
-                    debug_print ("now print the line on {}".format(matched_entity))
-                    add_points(matched_entity, direction, self.cur_poly)
+def read_source (ctx, dxf_path):
+    """ read a DXF file with the reader set in ctx, for load_layers() """
+    if ctx.fast:
+        try:
+            return None, scan_layers (dxf_path, ctx.settings.min_line_width)
+        except ScanError as ex:
+            ctx.verbose_print ("{}: {}, reading with ezdxf".format (dxf_path, ex))
+
+    if ctx.stream:
+        return None, stream_layers (ctx, dxf_path)
+
+    return read_dxf (ctx, dxf_path), None
+
+def converter_version ():
+    """ digest of the converter's source files and the ezdxf version, so the cache is not used after either changes """
+    global _converter_version
+    if _converter_version is None:
+        # found without importing them, so a cache hit does not load ezdxf
+        from importlib.metadata import version
+        from importlib.util import find_spec
+
+        names = ("segment_table", "tessellate", "endpoint_index", "shapes", "hatch", "dxf_scanner",
+                 "geometry_snapshot", "incremental", "atomic_file", "kicad_layers",
+                 "dxf2kicad_common.kicad_mod", "dxf2kicad_common.sexpr")
+        files = [os.path.abspath(__file__)] + [find_spec (name).origin for name in names]
+        _converter_version = make_key (version ("ezdxf"), *[file_digest (f) for f in files])
+    return _converter_version
+
+_converter_version = None
+
+def snapshot_key (ctx):
+    """ key for the settings the geometry in a snapshot depends on """
+    return make_key (converter_version(), repr(ctx.settings.min_line_width), str(ctx.stream))
+
+def incremental_key (ctx):
+    """ key for everything the state saved by an incremental conversion depends on, apart from the segments """
+    return make_key (converter_version(), json.dumps (vars(ctx.settings), sort_keys=True, default=str))
+
+def cache_key (ctx, dxf_path, footprint_path):
+    """ cache key for everything the footprint file written by convert_file() depends on """
+    settings = json.dumps (vars(ctx.settings), sort_keys=True, default=str)
+    return make_key (converter_version(), file_digest (dxf_path), settings,
+                     os.path.basename (footprint_path), str(ctx.stream), str(ctx.tedit))
+
+def convert_file (ctx, dxf_path, footprint_path, states=None):
+    """
+    Convert a DXF file to a footprint file. With ctx.incremental, the state of
+    the last conversion is read from the file next to the footprint and saved
+    there, or kept in states, a dict by footprint file, if given.
+    """
+    if ctx.cache:
+        footprint_key = cache_key (ctx, dxf_path, footprint_path)
+        if ctx.cache.get (footprint_key, footprint_path):
+            print ("Creating {} (cached)".format (os.path.splitext(os.path.basename(footprint_path))[0]))
+            return
+
+    dxf, layers = load_layers (ctx, dxf_path)
+
+    converter = DxfConverter(dxf, ctx)
+    if ctx.incremental:
+        state_key = incremental_key (ctx)
+        incremental_path = state_path (footprint_path)
+        if states is None:
+            converter.previous = load_state (incremental_path, state_key)
+        else:
+            saved_key, state = states.get (footprint_path, (None, {}))
+            converter.previous = state if saved_key == state_key else {}
+    converter.convert_layers(dxf, footprint_path, layers)
 
-                    debug_print ("removed from the set, {}".format(matched_entity))
-                    self.not_processed_data.remove(matched_entity) #remove from the set
+    if ctx.incremental:
+        if states is None:
+            save_state (incremental_path, state_key, converter.state)
+        else:
+            states[footprint_path] = (state_key, converter.state)
+    if ctx.cache:
+        ctx.cache.put (footprint_key, footprint_path)
+
+def convert_worker (ctx, dxf_path, footprint_path, states=None):
+    """ convert one file in a batch, returns None or the reason it failed """
+    try:
+        convert_file (ctx, dxf_path, footprint_path, states)
+        return None
+    except Exception as ex:
+        if ctx.verbose:
+            return traceback.format_exc()
+        return "{}: {}".format (type(ex).__name__, ex)
+
+def is_batch_input (path):
+    """ a directory, or a glob pattern which is not the name of a file, such as part[1].dxf """
+    if os.path.isfile(path):
+        return False
+    return os.path.isdir(path) or any (c in path for c in "*?[")
 
-                    debug_print ("Not Processed Shape: {}".format (len(self.not_processed_data)))
+def batch_files (source, library):
+    """ list of (DXF file, footprint file) for a directory or glob of DXF files, and a .pretty folder """
+    if os.path.isdir(source):
+        pattern = os.path.join (source, "*")
+    else:
+        pattern = source
+    dxf_files = sorted (f for f in glob.glob (pattern) if os.path.splitext(f)[1].lower() == ".dxf")
+
+    if not library:
+        folder = os.path.dirname (pattern) or os.getcwd()
+        library = os.path.basename (os.path.abspath (folder)) + ".pretty"
+
+    return [(f, os.path.join (library, os.path.splitext(os.path.basename(f))[0] + ".kicad_mod")) for f in dxf_files], library
+
+def batch_convert (ctx, source, library):
+    """
+    Convert a directory or glob of DXF files into a footprint library, ctx.jobs
+    files at once. Returns the number of failures.
+    """
+    files, library = batch_files (source, library)
+    if not files:
+        print ("[Error]: No DXF files found in {}".format(source), file=sys.stderr)
+        return 1
+
+    os.makedirs (library, exist_ok=True)
+
+    # each file is converted in one process
+    file_ctx = copy.copy (ctx)
+    file_ctx.jobs = 1
+
+    failures = []
+    if ctx.jobs == 1:
+        for dxf_path, footprint_path in files:
+            error = convert_worker (file_ctx, dxf_path, footprint_path)
+            if error:
+                failures.append ((dxf_path, error))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor (max_workers=ctx.jobs) as pool:
+            results = [pool.submit (convert_worker, file_ctx, dxf_path, footprint_path) for dxf_path, footprint_path in files]
+            for (dxf_path, footprint_path), result in zip (files, results):
+                try:
+                    error = result.result()
+                except Exception as ex:
+                    # the worker process died
+                    error = "{}: {}".format (type(ex).__name__, ex)
+                if error:
+                    failures.append ((dxf_path, error))
+
+    print ("Converted {} of {} files to {}".format (len(files) - len(failures), len(files), library))
+    if failures:
+        print ("Failed:", file=sys.stderr)
+        for dxf_path, error in failures:
+            print ("  {}: {}".format (dxf_path, error.rstrip()), file=sys.stderr)
+    return len(failures)
+
+def file_signature (path):
+    """ modification time and size of a file, None if there is no file """
+    try:
+        st = os.stat (path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def watch (ctx, list_files, settings_file=None, load_settings=None):
+    """
+    Convert each (DXF file, footprint file) from list_files() whenever the DXF
+    file changes, until interrupted. When settings_file changes,
+    load_settings() makes the new settings and all the files are converted
+    again, or the settings are kept if it raises. The incremental state of
+    each file is kept in memory, so only the parts of a drawing which changed
+    are converted again.
+    """
+    ctx = copy.copy (ctx)
+    ctx.incremental = True
+    states = {}
+    # signature of each DXF file when it was last converted, and when last seen
+    converted = {}
+    seen = {}
+    settings_signature = file_signature (settings_file) if settings_file else None
+    settings_seen = settings_signature
+
+    print ("Watching for changes, press Ctrl+C to stop")
+    try:
+        while True:
+            if settings_file:
+                signature = file_signature (settings_file)
+                if signature != settings_signature and signature is not None:
+                    # the same wait as for the DXF files below
+                    if settings_seen != signature:
+                        settings_seen = signature
+                    else:
+                        settings_signature = signature
+                        try:
+                            ctx.settings = load_settings ()
+                            converted = {}
+                        except Exception as ex:
+                            print ("[Error]: {}: {}, settings not changed".format (settings_file, ex), file=sys.stderr)
+
+            for dxf_path, footprint_path in list_files ():
+                signature = file_signature (dxf_path)
+                if signature is None or signature == converted.get (dxf_path):
+                    continue
+                # wait until the file has stayed the same for one interval, it may still be being written
+                if seen.get (dxf_path) != signature:
+                    seen[dxf_path] = signature
+                    continue
 
-        # write footprint
-        self.footprint.save(footprint_path)
+                converted[dxf_path] = signature
+                error = convert_worker (ctx, dxf_path, footprint_path, states)
+                if error:
+                    print ("[Error]: {}: {}".format (dxf_path, error.rstrip()), file=sys.stderr)
 
+            time.sleep (WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
 
 #
 def dump_file (dxf):
-    model_space = dxf.modelspace()
-    layers = [layer.dxf.name for layer in dxf.layers]
+    layers = partition_layers (dxf)
 
-    #print ("Layers: {}".format(layers))
+    #print ("Layers: {}".format(list(layers)))
 
-    for layer in layers:
+    for layer, layer_data in layers.items():
         print ("Layer: {}".format(layer))
 
-        layer_data = model_space.query ('*[layer =="{}"]'.format(layer))
-
         for entity in layer_data:
             if entity.dxf.dxftype == "ARC":
                 info = "{} {} {} {}".format (entity.dxf.center, entity.dxf.radius, entity.dxf.start_angle, entity.dxf.end_angle)
+            elif entity.dxf.dxftype == "CIRCLE":
+                info = "{} {}".format (entity.dxf.center, entity.dxf.radius)
             elif entity.dxf.dxftype == "LINE":
                 info = "{} {}".format(entity.dxf.start, entity.dxf.end)
+            elif entity.dxf.dxftype == "HATCH":
+                info = "{} paths:{}".format (entity.dxf.pattern_name, len(entity.paths))
             elif entity.dxf.dxftype == "INSERT":
                 info = "{} {} {}".format(entity.dxf.name, entity.dxf.xscale, entity.dxf.yscale)
             elif entity.dxf.dxftype == "POLYLINE":
@@ -610,42 +1246,85 @@ def dump_file (dxf):
             print ("  {} {}".format(entity, info))
 
 
-if __name__ == '__main__':
+def settings_from_args (args, strict=False):
+    """ the settings for the command line options, strict raises if the settings file can't be read """
+    if args.settings and strict:
+        settings = Settings.read_file (args.settings)
+    elif args.settings:
+        settings = Settings.load_from_file (args.settings)
+    else:
+        settings = Settings()
+
+    if args.native_arcs:
+        settings.native_arcs = True
 
+    if args.units.lower() == Units.MIL.value:
+        settings.use_mil()
+    return settings
 
-    #settings = Settings.load_from_file ("settings.json")
-    settings = Settings()
-    #settings.save_to_file("settings.json")
+def footprint_file_name (args):
+    """ the footprint file for a single DXF file """
+    if args.footprint_file:
+        return args.footprint_file
+    out_file = os.path.basename(args.DXF_file)
+    return os.path.splitext(out_file)[0] + ".kicad_mod"
 
+
+def main ():
     #
     parser = argparse.ArgumentParser(description='Convert a DXF file to a KiCad footprint')
-    parser.add_argument('DXF_file', help="DXF file")
-    parser.add_argument('footprint_file', help="KiCad footprint file name", nargs='?')
+    parser.add_argument('DXF_file', help="DXF file, or a directory or glob of DXF files to convert into a library")
+    parser.add_argument('footprint_file', help="KiCad footprint file name, or .pretty folder for a directory or glob", nargs='?')
     parser.add_argument('-v', '--verbose', help='Enable verbose output. -v shows brief information, -vv shows complete information', action='count')
     parser.add_argument('-d', '--dump', help='Dump the DXF file.', action='store_true')
     parser.add_argument('-u', '--units', help='File units: MM or MIL.', default="mm")
+    parser.add_argument('--settings', help='JSON settings file, as written by Settings.save_to_file().')
+    parser.add_argument('-w', '--watch', help='Keep running, and convert the DXF files again whenever they or the settings file change.', action='store_true')
+    parser.add_argument('-a', '--native-arcs', help='Output unconnected arcs as fp_arc/fp_circle instead of line segments.', action='store_true')
+    parser.add_argument('-s', '--stream', help='Read the DXF file an entity at a time, to use less memory for very large files. Blocks are not supported.', action='store_true')
+    parser.add_argument('-f', '--fast', help='Read simple ASCII DXF files with a fast built-in reader, using ezdxf for anything it does not support.', action='store_true')
+    parser.add_argument('--cache', help='Folder to keep converted footprints in, DXF files which have not changed are not converted again.')
+    parser.add_argument('--cache-size', help='Size limit of the cache folder in MB. Default is {}.'.format(DEFAULT_CACHE_SIZE // (1024 * 1024)), type=int)
+    parser.add_argument('--snapshot', help='Save the geometry read from each DXF file in a .snapshot file next to it, and read that instead while the DXF file is unchanged.', action='store_true')
+    parser.add_argument('-i', '--incremental', help='Save the converted shapes next to the footprint file, and next time only convert the parts of the drawing which changed.', action='store_true')
+    parser.add_argument('--deterministic', help='Write the same tedit timestamp every time: $SOURCE_DATE_EPOCH, or 0 if not set. Always used with --cache.', action='store_true')
+    parser.add_argument('-j', '--jobs', help='Number of files, or layers of a large file, to convert at once. Default is the number of CPUs.', type=int, default=os.cpu_count())
     args = parser.parse_args()
 
-    if os.path.splitext(args.DXF_file)[1].lower() == ".dxf":
+    settings = settings_from_args (args)
+
+    ctx = ConversionContext (settings, args.verbose, max(1, args.jobs), args.stream, args.fast)
+    ctx.snapshot = args.snapshot
+    ctx.incremental = args.incremental
 
-        if args.units.lower() == Units.MIL:
-            settings.units = Units.MIL
-            settings.distance_error = to_mil (settings.distance_error)
-            settings.min_line_width = to_mil (settings.min_line_width)
+    if args.deterministic or args.cache:
+        ctx.tedit = int (os.environ.get ("SOURCE_DATE_EPOCH", 0))
+    if args.cache:
+        cache_size = args.cache_size * 1024 * 1024 if args.cache_size is not None else DEFAULT_CACHE_SIZE
+        ctx.cache = ConversionCache (args.cache, cache_size)
 
-        dxf = ezdxf.readfile(args.DXF_file)
+    if args.watch:
+        if is_batch_input (args.DXF_file):
+            files, library = batch_files (args.DXF_file, args.footprint_file)
+            os.makedirs (library, exist_ok=True)
+            list_files = lambda: batch_files (args.DXF_file, library)[0]
+        else:
+            out_file = footprint_file_name (args)
+            list_files = lambda: [(args.DXF_file, out_file)]
+        watch (ctx, list_files, args.settings, lambda: settings_from_args (args, strict=True))
+
+    elif is_batch_input (args.DXF_file):
+        failures = batch_convert (ctx, args.DXF_file, args.footprint_file)
+        sys.exit (1 if failures else 0)
 
-        debug_print ("DXF version : {}".format(dxf.dxfversion))
-        debug_print ("Entity Count: {}".format (len(dxf.entities)))
+    elif os.path.splitext(args.DXF_file)[1].lower() == ".dxf":
 
         if args.dump:
+            dxf = read_dxf (ctx, args.DXF_file)
             dump_file(dxf)
         else:
-            if args.footprint_file:
-                out_file = args.footprint_file
-            else:
-                out_file = os.path.basename(args.DXF_file)
-                out_file = os.path.splitext(out_file)[0] + ".kicad_mod"
+            convert_file (ctx, args.DXF_file, footprint_file_name (args))
 
-            converter = DxfConverter(dxf)
-            converter.convert_layers(dxf, out_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+# ===========================================================================
+#
+# Fast reader for simple ASCII DXF files.
+#
+# Reads the LINE, ARC, CIRCLE, LWPOLYLINE and POLYLINE entities in the
+# ENTITIES section straight from the group codes into SegmentTables, without
+# building an ezdxf document. Anything else raises ScanError, and the caller
+# reads the file with ezdxf instead.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import mmap
+import os
+import re
+
+from segment_table import SegmentTable
+
+BINARY_DXF_SIGNATURE = b"AutoCAD Binary DXF\r\n\x1a\x00"
+
+# entity types read by the scanner, VERTEX and SEQEND only inside a POLYLINE
+SCAN_TYPES = {b"LINE", b"ARC", b"CIRCLE", b"LWPOLYLINE", b"POLYLINE"}
+
+# POLYLINE flags for 3D meshes
+POLYLINE_MESH = 16 | 64
+
+_ENTITIES_START = re.compile(rb"(?:^|\n)[ \t]*0[ \t]*\r?\nSECTION[ \t]*\r?\n[ \t]*2[ \t]*\r?\nENTITIES[ \t]*\r?\n")
+_LAYER_TABLE_START = re.compile(rb"\n[ \t]*0[ \t]*\r?\nTABLE[ \t]*\r?\n[ \t]*2[ \t]*\r?\nLAYER[ \t]*\r?\n")
+_SECTION_END = re.compile(rb"\n[ \t]*0[ \t]*\r?\nENDSEC[ \t]*\r?\n?")
+_TABLE_END = re.compile(rb"\n[ \t]*0[ \t]*\r?\nENDTAB[ \t]*\r?\n?")
+
+
+class ScanError(Exception):
+    """ the file has something the scanner does not read """
+
+
+def _text(value):
+    try:
+        return value.decode("ascii")
+    except UnicodeDecodeError:
+        raise ScanError("non-ASCII text {!r}".format(value[:20]))
+
+
+def _float(value):
+    try:
+        return float(value)
+    except ValueError:
+        raise ScanError("bad number {!r}".format(value[:20]))
+
+
+def _int(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ScanError("bad integer {!r}".format(value[:20]))
+
+
+def _entities(chunk):
+    """ the tags of each entity in a chunk of an ASCII DXF file, as (type, [(code, value)]) """
+    lines = chunk.split(b"\n")
+    dxftype = None
+    tags = []
+    try:
+        for code, value in zip(lines[0::2], lines[1::2]):
+            code = int(code)
+            if code == 0:
+                if dxftype is not None:
+                    yield dxftype, tags
+                dxftype = value.strip()
+                tags = []
+            else:
+                tags.append((code, value.strip()))
+    except ValueError:
+        raise ScanError("bad group code {!r}".format(code[:20]))
+    if dxftype is not None:
+        yield dxftype, tags
+
+
+def _layer_names(data):
+    """ layer names in the order of the layer table """
+    start = _LAYER_TABLE_START.search(data)
+    if not start:
+        return []
+    end = _TABLE_END.search(data, start.end() - 1)
+    if not end:
+        raise ScanError("no end to the layer table")
+
+    names = []
+    for dxftype, tags in _entities(data[start.end():end.start() + 1]):
+        if dxftype == b"LAYER":
+            for code, value in tags:
+                if code == 2:
+                    names.append(_text(value))
+                    break
+    return names
+
+
+class _Layers(object):
+    """ SegmentTables by layer name, in the order first seen """
+
+    def __init__(self):
+        self.tables = {}
+
+    def get(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = SegmentTable(name)
+        return table
+
+
+def _common(tags):
+    """ layer, handle and if the entity is in paper space """
+    layer = "0"
+    handle = None
+    paper_space = False
+    for code, value in tags:
+        if code == 8:
+            layer = _text(value)
+        elif code == 5:
+            handle = _text(value)
+        elif code == 67:
+            paper_space = _int(value) == 1
+    return layer, handle, paper_space
+
+
+def _values(tags, defaults):
+    """ dict of the values of the codes in defaults, as floats """
+    values = dict(defaults)
+    for code, value in tags:
+        if code in values:
+            values[code] = _float(value)
+    return values
+
+
+def _lwpolyline_points(tags):
+    points = []
+    x = None
+    y = 0.0
+    bulge = 0.0
+    for code, value in tags:
+        if code == 10:
+            if x is not None:
+                points.append((x, y, bulge))
+            x = _float(value)
+            y = 0.0
+            bulge = 0.0
+        elif code == 20:
+            y = _float(value)
+        elif code == 42:
+            bulge = _float(value)
+    if x is not None:
+        points.append((x, y, bulge))
+    return points
+
+
+def _flags(tags):
+    for code, value in tags:
+        if code == 70:
+            return _int(value)
+    return 0
+
+
+def scan_layers(dxf_path, min_line_width):
+    """
+    Read the modelspace of an ASCII DXF file into a list of
+    (SegmentTable, [], []), one per layer, like read_layers() in
+    dxf2kicad_mod.py. Raises ScanError if the file has anything else.
+    """
+    with open(dxf_path, "rb") as f:
+        # mmap cannot map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ScanError("empty file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(BINARY_DXF_SIGNATURE)] == BINARY_DXF_SIGNATURE:
+                raise ScanError("binary DXF")
+
+            layer_order = _layer_names(data)
+
+            start = _ENTITIES_START.search(data)
+            if not start:
+                raise ScanError("no ENTITIES section")
+            end = _SECTION_END.search(data, start.end() - 1)
+            if not end:
+                raise ScanError("no end to the ENTITIES section")
+            chunk = data[start.end():end.start() + 1]
+
+    layers = _Layers()
+    polyline = None
+    for dxftype, tags in _entities(chunk):
+        if polyline is not None:
+            # the VERTEXes of a POLYLINE, up to the SEQEND
+            if dxftype == b"VERTEX":
+                values = _values(tags, {10: 0.0, 20: 0.0, 42: 0.0})
+                polyline[5].append((values[10], values[20], values[42]))
+                continue
+            if dxftype != b"SEQEND":
+                raise ScanError("{} in a POLYLINE".format(_text(dxftype)))
+            layer, handle, paper_space, flags, width, points = polyline
+            polyline = None
+            if not paper_space:
+                layers.get(layer).add_polyline(points, bool(flags & 1), False, max(width, min_line_width), handle)
+            continue
+
+        if dxftype not in SCAN_TYPES:
+            raise ScanError("unsupported entity {}".format(_text(dxftype)))
+
+        layer, handle, paper_space = _common(tags)
+
+        if dxftype == b"POLYLINE":
+            flags = _flags(tags)
+            if flags & POLYLINE_MESH:
+                raise ScanError("POLYLINE mesh")
+            width = _values(tags, {40: 0.0})[40]
+            polyline = (layer, handle, paper_space, flags, width, [])
+            continue
+
+        if paper_space:
+            continue
+
+        table = layers.get(layer)
+        if dxftype == b"LINE":
+            values = _values(tags, {10: 0.0, 20: 0.0, 11: 0.0, 21: 0.0, 39: 0.0})
+            table.add_line((values[10], values[20]), (values[11], values[21]), values[39], handle)
+
+        elif dxftype == b"ARC":
+            values = _values(tags, {10: 0.0, 20: 0.0, 40: 1.0, 50: 0.0, 51: 360.0, 39: 0.0})
+            table.add_arc((values[10], values[20]), values[40], values[50], values[51], values[39], handle)
+
+        elif dxftype == b"CIRCLE":
+            values = _values(tags, {10: 0.0, 20: 0.0, 40: 1.0, 39: 0.0})
+            table.add_circle((values[10], values[20]), values[40], values[39], handle)
+
+        else:
+            points = _lwpolyline_points(tags)
+            width = _values(tags, {43: 0.0})[43]
+            table.add_polyline(points, bool(_flags(tags) & 1), True, max(width, min_line_width), handle)
+
+    if polyline is not None:
+        raise ScanError("POLYLINE without SEQEND")
+
+    # layer table order first, then the others, the same as partition_layers()
+    tables = layers.tables
+    result = [(tables.pop(name), [], []) for name in layer_order if name in tables]
+    result.extend((table, [], []) for table in tables.values())
+    return result
@@ -0,0 +1,142 @@
+# ===========================================================================
+#
+# Spatial hash of segment end points, used by the loop-chaining engine in
+# dxf2kicad_mod.py to find connected segments without scanning every
+# unprocessed segment.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import math
+
+
+class EndpointIndex(object):
+    """
+    Grid index of the start and end points of a set of segments.
+
+    Cells are `cell_size` square, so any end point within `cell_size` of a query
+    point (in both x and y) is in one of the 9 cells around it. Items keep
+    their insertion order: find() returns the earliest inserted match and pop()
+    the latest inserted item, the same as scanning and popping a plain list.
+    """
+
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError("cell size must be > 0, got {}".format(cell_size))
+        self.cell_size = cell_size
+        self.cells = {}
+        self.items = {}
+        self.next_key = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def _cell(self, pt):
+        return (math.floor(pt[0] / self.cell_size), math.floor(pt[1] / self.cell_size))
+
+    def add(self, item, start, end):
+        key = self.next_key
+        self.next_key += 1
+        self.items[key] = (item, start, end)
+        for end_index, pt in enumerate((start, end)):
+            self.cells.setdefault(self._cell(pt), []).append((key, end_index))
+        return key
+
+    def remove(self, key):
+        item, start, end = self.items.pop(key)
+        for end_index, pt in enumerate((start, end)):
+            cell = self._cell(pt)
+            entries = self.cells[cell]
+            entries.remove((key, end_index))
+            if not entries:
+                del self.cells[cell]
+        return item
+
+    def pop(self):
+        """ remove the most recently added item, returns (item, start, end) """
+        key = next(reversed(self.items))
+        entry = self.items[key]
+        self.remove(key)
+        return entry
+
+    def find(self, pt):
+        """
+        Find an item with an end point within cell_size of pt.
+        Returns (key, item, direction, next_pt) or None, where direction is 1 if
+        the start point matched and -1 if the end point matched, and next_pt is
+        the other end of the item.
+        """
+        cx, cy = self._cell(pt)
+        tolerance = self.cell_size
+        best = None
+        for x in (cx - 1, cx, cx + 1):
+            for y in (cy - 1, cy, cy + 1):
+                for entry in self.cells.get((x, y), ()):
+                    if best is not None and entry > best:
+                        continue
+                    key, end_index = entry
+                    p = self.items[key][1 + end_index]
+                    if math.fabs(p[0] - pt[0]) < tolerance and math.fabs(p[1] - pt[1]) < tolerance:
+                        best = entry
+
+        if best is None:
+            return None
+
+        key, end_index = best
+        item, start, end = self.items[key]
+        if end_index == 0:
+            return key, item, 1, end
+        else:
+            return key, item, -1, start
+
+    def _cell_points(self, cell):
+        for key, end_index in self.cells.get(cell, ()):
+            yield self.items[key][1 + end_index]
+
+    def nearest(self, pt):
+        """
+        Find the end point nearest to pt, returns (point, distance).
+        Searches rings of cells outward from pt, falling back to a scan of the
+        occupied cells once a ring would be larger than that.
+        """
+        nearest_pt = None
+        nearest_dist = math.inf
+
+        def check(points):
+            nonlocal nearest_pt, nearest_dist
+            for p in points:
+                d = math.hypot(p[0] - pt[0], p[1] - pt[1])
+                if d < nearest_dist:
+                    nearest_dist = d
+                    nearest_pt = p
+
+        cx, cy = self._cell(pt)
+        ring = 0
+        while self.cells:
+            if 8 * ring > len(self.cells):
+                for cell in self.cells:
+                    check(self._cell_points(cell))
+                break
+
+            if ring == 0:
+                check(self._cell_points((cx, cy)))
+            else:
+                for x in range(cx - ring, cx + ring + 1):
+                    check(self._cell_points((x, cy - ring)))
+                    check(self._cell_points((x, cy + ring)))
+                for y in range(cy - ring + 1, cy + ring):
+                    check(self._cell_points((cx - ring, y)))
+                    check(self._cell_points((cx + ring, y)))
+
+            # anything in the next ring is at least this far away
+            if nearest_dist <= ring * self.cell_size:
+                break
+            ring += 1
+
+        return nearest_pt, nearest_dist
@@ -0,0 +1,150 @@
+# ===========================================================================
+#
+# Snapshot of the geometry read from a DXF file.
+#
+# The SegmentTables of each layer are saved in a binary file next to the DXF
+# file, and read back while the DXF file is unchanged, so changing the layer
+# names or tolerances and converting again does not read the DXF file.
+#
+# The file is a JSON header followed by the raw contents of the table
+# columns, which are copied straight from a memory map into the arrays.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+from atomic_file import atomic_write
+from conversion_cache import file_digest
+from segment_table import SegmentTable
+
+SNAPSHOT_SUFFIX = ".snapshot"
+
+SNAPSHOT_MAGIC = b"DXF2KICAD_MOD SNAPSHOT 1\n"
+
+# the columns of a SegmentTable which are saved
+ROW_COLUMNS = ("kind", "flags", "x0", "y0", "x1", "y1", "cx", "cy", "radius",
+               "start_angle", "end_angle", "width", "vstart", "vcount")
+VERTEX_COLUMNS = ("vx", "vy", "vbulge")
+
+# column data starts on a multiple of this
+ALIGNMENT = 8
+
+
+def snapshot_path(dxf_path):
+    return dxf_path + SNAPSHOT_SUFFIX
+
+
+def _column_formats():
+    """ typecode and item size of each column, the snapshot can't be read with other sizes or byte order """
+    table = SegmentTable("0")
+    formats = {name: [getattr(table, name).typecode, getattr(table, name).itemsize]
+               for name in ROW_COLUMNS + VERTEX_COLUMNS}
+    formats["byteorder"] = sys.byteorder
+    return formats
+
+
+def source_info(dxf_path):
+    """ size, modification time and digest of a DXF file, taken before it is read """
+    st = os.stat(dxf_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_digest(dxf_path)}
+
+
+def save_snapshot(path, source, layers, key):
+    """
+    Save the SegmentTables of layers, a list of (SegmentTable, hatches,
+    inserts) with no hatches or inserts, as the snapshot of the DXF file
+    described by source, from source_info(). key is a string for the
+    settings the tables were read with.
+    """
+    header = {
+        "key": key,
+        "source": source,
+        "formats": _column_formats(),
+        "layers": [{"name": table.layer, "rows": len(table), "vertices": len(table.vx), "handles": table.handles}
+                   for table, hatches, inserts in layers],
+    }
+    header = json.dumps(header).encode("utf-8")
+    start = len(SNAPSHOT_MAGIC) + 8 + len(header)
+
+    with atomic_write(path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        offset = start
+        for table, hatches, inserts in layers:
+            for name in ROW_COLUMNS + VERTEX_COLUMNS:
+                padding = -offset % ALIGNMENT
+                f.write(b"\0" * padding)
+                data = getattr(table, name).tobytes()
+                f.write(data)
+                offset += padding + len(data)
+
+
+def load_snapshot(path, dxf_path, key):
+    """
+    The layers saved by save_snapshot(), as a list of (SegmentTable, [], []).
+    Returns None if there is no snapshot, or it is not for the current
+    contents of dxf_path or for key.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        if os.fstat(f.fileno()).st_size < len(SNAPSHOT_MAGIC) + 8:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None
+            offset = len(SNAPSHOT_MAGIC)
+            size, = struct.unpack_from("<Q", data, offset)
+            offset += 8
+            try:
+                header = json.loads(data[offset:offset + size].decode("utf-8"))
+            except ValueError:
+                return None
+            offset += size
+
+            if header["key"] != key or header["formats"] != _column_formats():
+                return None
+
+            # a changed modification time alone doesn't mean the file has changed
+            source = header["source"]
+            st = os.stat(dxf_path)
+            if st.st_size != source["size"]:
+                return None
+            if st.st_mtime_ns != source["mtime_ns"] and file_digest(dxf_path) != source["sha256"]:
+                return None
+
+            view = memoryview(data)
+            try:
+                layers = []
+                for layer in header["layers"]:
+                    table = SegmentTable(layer["name"])
+                    for name in ROW_COLUMNS + VERTEX_COLUMNS:
+                        column = getattr(table, name)
+                        count = layer["rows"] if name in ROW_COLUMNS else layer["vertices"]
+                        offset += -offset % ALIGNMENT
+                        end = offset + count * column.itemsize
+                        if end > len(data):
+                            return None
+                        column.frombytes(view[offset:end])
+                        offset = end
+                    table.handles = layer["handles"]
+                    layers.append((table, [], []))
+            finally:
+                view.release()
+
+    return layers
@@ -0,0 +1,247 @@
+# ===========================================================================
+#
+# HATCH boundary paths to filled polygons.
+#
+# The boundaries are read straight from the hatch, one closed loop per path,
+# so they do not go through the chaining in dxf2kicad_mod.py. Islands are
+# joined to the loop around them with a zero width cut, as KiCad polygons
+# cannot have holes.
+#
+# ezdxf is imported by the functions which use it, so importing this module
+# doesn't load it.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import math
+
+from tessellate import arc_points, arc_sweep, bulge_points
+
+# DXF hatch styles: which islands are filled
+HATCH_STYLE_NORMAL = 0      # alternate filled and empty, from the outside in
+HATCH_STYLE_OUTER = 1       # only the outermost area, islands are empty
+HATCH_STYLE_IGNORE = 2      # islands are ignored, the outermost area is all filled
+
+
+def edge_points(edge, tolerance):
+    """ points along a boundary edge from its start to its end """
+    from ezdxf.entities.boundary_paths import EdgeType
+    from ezdxf.math import global_bspline_interpolation
+
+    if edge.type == EdgeType.LINE:
+        return [(edge.start[0], edge.start[1]), (edge.end[0], edge.end[1])]
+
+    if edge.type == EdgeType.ARC:
+        points = arc_points(edge.center[0], edge.center[1], edge.radius,
+                            math.radians(edge.start_angle),
+                            math.radians(arc_sweep(edge.start_angle, edge.end_angle)),
+                            tolerance)
+    elif edge.type == EdgeType.ELLIPSE:
+        points = [(p.x, p.y) for p in edge.construction_tool().flattening(tolerance)]
+    elif edge.control_points:
+        points = [(p.x, p.y) for p in edge.construction_tool().flattening(tolerance)]
+    else:
+        spline = global_bspline_interpolation(edge.fit_points, degree=edge.degree)
+        points = [(p.x, p.y) for p in spline.flattening(tolerance)]
+
+    # arcs and ellipses are stored counter-clockwise, whatever their direction in the path
+    if edge.type != EdgeType.SPLINE and not edge.ccw:
+        points.reverse()
+    return points
+
+
+def path_points(path, tolerance):
+    """ points around a boundary path, without repeating the first point """
+    from ezdxf.entities.boundary_paths import BoundaryPathType
+
+    points = []
+    if path.type == BoundaryPathType.POLYLINE:
+        vertices = path.vertices
+        for j, vertex in enumerate(vertices):
+            next_vertex = vertices[(j + 1) % len(vertices)]
+            if vertex[2] == 0:
+                points.append((vertex[0], vertex[1]))
+            else:
+                points.extend(bulge_points(vertex, next_vertex, vertex[2], tolerance))
+    else:
+        for edge in path.edges:
+            pl = edge_points(edge, tolerance)
+            if points and points[-1] == pl[0]:
+                del pl[0]
+            points.extend(pl)
+
+    while len(points) > 1 and points[-1] == points[0]:
+        del points[-1]
+    return points
+
+
+def signed_area(points):
+    """ positive for counter-clockwise loops """
+    area = 0
+    x0, y0 = points[-1]
+    for x1, y1 in points:
+        area += x0 * y1 - x1 * y0
+        x0, y0 = x1, y1
+    return area / 2
+
+
+def point_in_polygon(pt, points):
+    x, y = pt
+    inside = False
+    x0, y0 = points[-1]
+    for x1, y1 in points:
+        if (y1 > y) != (y0 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+        x0, y0 = x1, y1
+    return inside
+
+
+def bounds(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def contains(outer_bounds, inner_bounds):
+    return (outer_bounds[0] <= inner_bounds[0] and outer_bounds[1] <= inner_bounds[1]
+            and outer_bounds[2] >= inner_bounds[2] and outer_bounds[3] >= inner_bounds[3])
+
+
+def cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def locally_inside(points, i, pt):
+    """ whether a line from vertex i to pt starts inside the polygon """
+    before, vertex, after = points[i - 1], points[i], points[(i + 1) % len(points)]
+    if cross(before, vertex, after) > 0:
+        return cross(vertex, pt, after) <= 0 and cross(vertex, before, pt) <= 0
+    return cross(vertex, pt, before) > 0 or cross(vertex, after, pt) > 0
+
+
+def contains_sector(points, i, j):
+    """ whether the angle inside the loop at vertex i contains the one at vertex j, at the same point """
+    n = len(points)
+    return (cross(points[i - 1], points[i], points[j - 1]) > 0 and
+            cross(points[(j + 1) % n], points[i], points[(i + 1) % n]) > 0)
+
+
+def in_triangle(pt, a, b, c):
+    """ whether pt is inside the triangle or on its edges, in either direction """
+    d1, d2, d3 = cross(a, b, pt), cross(b, c, pt), cross(c, a, pt)
+    return not ((d1 < 0 or d2 < 0 or d3 < 0) and (d1 > 0 or d2 > 0 or d3 > 0))
+
+
+def bridge_vertex(points, pt):
+    """
+    Index of a vertex of the counter-clockwise loop points which can be joined
+    to pt, a point inside it, without crossing its edges: where a ray from pt
+    to the right first meets the loop, or the vertex nearest that ray if
+    another vertex is in the way.
+    """
+    hx, hy = pt
+    n = len(points)
+    qx = math.inf
+    m = None
+    for i in range(n):
+        (ax, ay), (bx, by) = points[i], points[(i + 1) % n]
+        # the edges going up are the ones seen from inside the loop to their left
+        if ay <= hy <= by and ay < by:
+            x = ax + (hy - ay) * (bx - ax) / (by - ay)
+            if hx <= x < qx:
+                qx = x
+                m = i if ax > bx else (i + 1) % n
+    if m is None:
+        return None
+
+    # a vertex inside the triangle of pt, where the ray meets the loop and
+    # that edge's end, may hide the end, take the one nearest to the ray
+    mx, my = points[m]
+    best = m
+    best_tan = math.inf
+    for i, (px, py) in enumerate(points):
+        if hx < px <= mx and in_triangle((px, py), pt, (qx, hy), (mx, my)) and locally_inside(points, i, pt):
+            tan = math.fabs(py - hy) / (px - hx)
+            if (tan < best_tan or tan == best_tan and
+                    (px < points[best][0] or px == points[best][0] and contains_sector(points, best, i))):
+                best = i
+                best_tan = tan
+    return best
+
+
+def bridge_holes(outer, holes):
+    """
+    Join holes to a counter-clockwise outer loop, each hole going clockwise
+    from its rightmost vertex to a vertex of the loop it can be seen from and
+    back. The holes are joined rightmost first, so a hole is only seen past
+    the loop and the holes already joined to it.
+    """
+    result = list(outer)
+    for hole in sorted(holes, key=lambda h: -max(p[0] for p in h)):
+        j = max(range(len(hole)), key=lambda k: hole[k][0])
+        hx, hy = hole[j]
+        i = bridge_vertex(result, (hx, hy))
+        if i is None:
+            # not inside the loop, which only rounding errors should give
+            i = min(range(len(result)), key=lambda k: (result[k][0] - hx) ** 2 + (result[k][1] - hy) ** 2)
+        result[i + 1:i + 1] = hole[j:] + hole[:j + 1] + [result[i]]
+    return result
+
+
+def hatch_polygons(hatch, tolerance):
+    """
+    Filled areas of a hatch, as a list of closed point lists (the first point
+    repeated at the end), with any islands cut into the area around them.
+    """
+    loops = []
+    for path in hatch.paths:
+        points = path_points(path, tolerance)
+        if len(points) < 3:
+            continue
+        area = signed_area(points)
+        if area == 0:
+            continue
+        if area < 0:
+            points.reverse()
+        loops.append((math.fabs(area), points, bounds(points)))
+
+    # nesting depth of each loop, counting the larger loops around it
+    loops.sort(key=lambda loop: -loop[0])
+    depth = []
+    parent = []
+    for n, (area, points, box) in enumerate(loops):
+        depth.append(0)
+        parent.append(None)
+        for m in range(n - 1, -1, -1):
+            if contains(loops[m][2], box) and point_in_polygon(points[0], loops[m][1]):
+                depth[n] = depth[m] + 1
+                parent[n] = m
+                break
+
+    style = hatch.dxf.hatch_style
+    holes = {}
+    outers = []
+    for n, (area, points, box) in enumerate(loops):
+        if style == HATCH_STYLE_IGNORE and depth[n] > 0:
+            continue
+        if style == HATCH_STYLE_OUTER and depth[n] > 1:
+            continue
+        filled = depth[n] % 2 == 0
+
+        if filled:
+            outers.append(n)
+        else:
+            holes.setdefault(parent[n], []).append(list(reversed(points)))
+
+    polygons = []
+    for n in outers:
+        points = bridge_holes(loops[n][1], holes.get(n, []))
+        points.append(points[0])
+        polygons.append(points)
+    return polygons
@@ -0,0 +1,129 @@
+# ===========================================================================
+#
+# State for converting a DXF file again after a few entities have changed.
+#
+# The segments of a layer are split into connected components, the groups of
+# segments whose end points meet. Chaining never crosses from one component
+# to another, so the shapes of a component only depend on its own segments.
+# The shapes of each component are saved with a key made from the handles
+# and geometry of its segments, and on the next run only the components with
+# a key which was not saved are chained again.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import hashlib
+import json
+import math
+
+from atomic_file import atomic_write
+from shapes import SHAPE_ARC
+
+STATE_SUFFIX = ".incremental"
+
+# offsets of the cells around a cell, and the cell itself
+NEIGHBOURS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def state_path(footprint_path):
+    return footprint_path + STATE_SUFFIX
+
+
+def row_fingerprint(table, i):
+    """ digest of the geometry of a row of a SegmentTable """
+    row = (table.kind[i], table.flags[i], table.x0[i], table.y0[i], table.x1[i], table.y1[i],
+           table.cx[i], table.cy[i], table.radius[i], table.start_angle[i], table.end_angle[i],
+           table.width[i], table.vertices(i))
+    return hashlib.blake2b(repr(row).encode("ascii"), digest_size=12).hexdigest()
+
+
+def component_key(table, rows, fingerprints):
+    """ key for a component from the handles and geometry of its rows, in order """
+    digest = hashlib.sha256()
+    for i in rows:
+        digest.update("{}:{};".format(table.handles[i], fingerprints[i]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def connected_components(table, chained, tolerance):
+    """
+    Rows of a SegmentTable grouped into components, as lists of rows in
+    order, sorted by their first row. Rows with chained[i] set are joined when
+    an end point of one is within tolerance (in both x and y) of an end point
+    of the other, the same test the chaining uses. The other rows are on
+    their own.
+    """
+    count = len(table)
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    cells = {}
+    for i in range(count):
+        if not chained[i]:
+            continue
+        for x, y in (table.start_point(i), table.end_point(i)):
+            cx = math.floor(x / tolerance)
+            cy = math.floor(y / tolerance)
+            for dx, dy in NEIGHBOURS:
+                entries = cells.get((cx + dx, cy + dy))
+                if not entries:
+                    continue
+                for j, px, py in entries:
+                    if -tolerance < px - x < tolerance and -tolerance < py - y < tolerance:
+                        a = find(i)
+                        b = find(j)
+                        if a != b:
+                            parent[max(a, b)] = min(a, b)
+            cells.setdefault((cx, cy), []).append((i, x, y))
+
+    components = {}
+    for i in range(count):
+        components.setdefault(find(i), []).append(i)
+    return list(components.values())
+
+
+def _shape_from_json(item):
+    kind, layer, width, data = item
+    if kind == SHAPE_ARC:
+        center, start, sweep = data
+        data = (tuple(center), tuple(start), sweep)
+    else:
+        data = [tuple(pt) for pt in data]
+    return (kind, layer, width, data)
+
+
+def load_state(path, key):
+    """
+    The saved shapes of the components of each layer, as
+    {layer: {component key: [(phase, position, shape items)]}}, or {} if
+    there are none or they were saved with a different key.
+    """
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get("key") != key:
+        return {}
+
+    return {layer: {component: [(phase, position, [_shape_from_json(item) for item in items])
+                                for phase, position, items in groups]
+                    for component, groups in components.items()}
+            for layer, components in state["layers"].items()}
+
+
+def save_state(path, key, layers):
+    """ save the state of each layer, as returned by load_state() """
+    with atomic_write(path) as f:
+        json.dump({"key": key, "layers": layers}, f, separators=(",", ":"))
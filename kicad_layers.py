@@ -0,0 +1,41 @@
+# ===========================================================================
+#
+# Names of the layers in KiCad footprint files.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+
+class KicadLayer(object):
+    F_Cu = "F.Cu"
+    B_Cu = "B.Cu"
+    F_Adhesive = "F.Adhes"
+    B_Adhesive = "B.Adhes"
+    F_Paste = "F.Paste"
+    B_Paste = "B.Paste"
+    F_SilkScreen = "F.SilkS"
+    B_SilkScreen = "B.SilkS"
+    F_Mask = "F.Mask"
+    B_Mask = "B.Mask"
+    Dwgs_User = "Dwgs.User"
+    Cmts_User = "Cmts.User"
+    Eco1_User = "Eco1.User"
+    Eco2_User = "Eco2.User"
+    Edge_Cuts = "Edge.Cuts"
+    Margin = "Margin"
+    F_CrtYd = "F.CrtYd"
+    B_CrtYd = "B.CrtYd"
+    F_Fab = "F.Fab"
+    B_Fab = "B.Fab"
+
+    # the layers a DXF layer name is used as is for, other names go to F.Cu
+    standard_layers = ([F_Cu] + ["In{}.Cu".format(n) for n in range(1, 31)] + [B_Cu] +
+                       [F_Adhesive, B_Adhesive, F_Paste, B_Paste, F_SilkScreen, B_SilkScreen, F_Mask, B_Mask,
+                        Dwgs_User, Cmts_User, Eco1_User, Eco2_User, Edge_Cuts, Margin,
+                        F_CrtYd, B_CrtYd, F_Fab, B_Fab])
@@ -0,0 +1,286 @@
+# ===========================================================================
+#
+# Array-backed table of the geometry on one DXF layer.
+#
+# The converter extracts each layer from the DXF document once; chaining and
+# tessellation then work on the table only, never on the ezdxf entities.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+from array import array
+import math
+
+from tessellate import DEFAULT_ARC_TOLERANCE, arc_points, arc_sweep, bulge_points, arc_batch, bulge_batch
+
+# segment type codes
+SEG_LINE = 0
+SEG_ARC = 1
+SEG_POLY = 2
+SEG_CIRCLE = 3
+
+SEG_NAMES = {SEG_LINE: "LINE", SEG_ARC: "ARC", SEG_POLY: "POLY", SEG_CIRCLE: "CIRCLE"}
+
+# segment flags
+FLAG_CLOSED = 1
+FLAG_LWPOLY = 2
+
+
+class SegmentTable(object):
+    """
+    Geometry of one layer, one row per segment, stored in columns.
+
+    All rows have start/end points (x0, y0, x1, y1) and a width.
+    Arcs also have center, radius and start/end angles in degrees.
+    Circles have center and radius, and start and end at angle 0.
+    Polylines refer to a range of the vertex columns (vx, vy, vbulge).
+    """
+
+    def __init__(self, layer):
+        self.layer = layer
+
+        self.kind = array('b')
+        self.flags = array('b')
+        self.x0 = array('d')
+        self.y0 = array('d')
+        self.x1 = array('d')
+        self.y1 = array('d')
+        self.cx = array('d')
+        self.cy = array('d')
+        self.radius = array('d')
+        self.start_angle = array('d')
+        self.end_angle = array('d')
+        self.width = array('d')
+        self.vstart = array('l')
+        self.vcount = array('l')
+
+        self.vx = array('d')
+        self.vy = array('d')
+        self.vbulge = array('d')
+
+        # source entity handles, for diagnostics
+        self.handles = []
+
+        # results of tessellate(): points of arc rows by row, of bulges by vertex,
+        # and of circles centered on the origin by radius
+        self.tolerance = None
+        self.arc_cache = {}
+        self.bulge_cache = {}
+        self.circle_cache = {}
+
+    def __len__(self):
+        return len(self.kind)
+
+    def _add_row(self, kind, flags, start, end, width, handle):
+        self.kind.append(kind)
+        self.flags.append(flags)
+        self.x0.append(start[0])
+        self.y0.append(start[1])
+        self.x1.append(end[0])
+        self.y1.append(end[1])
+        self.width.append(width)
+        self.handles.append(handle)
+        return len(self.kind) - 1
+
+    def add_line(self, start, end, width=0, handle=None):
+        i = self._add_row(SEG_LINE, 0, start, end, width, handle)
+        for col in (self.cx, self.cy, self.radius, self.start_angle, self.end_angle):
+            col.append(0)
+        self.vstart.append(0)
+        self.vcount.append(0)
+        return i
+
+    def add_arc(self, center, radius, start_angle, end_angle, width=0, handle=None):
+        start = (center[0] + radius * math.cos(math.radians(start_angle)),
+                 center[1] + radius * math.sin(math.radians(start_angle)))
+        end = (center[0] + radius * math.cos(math.radians(end_angle)),
+               center[1] + radius * math.sin(math.radians(end_angle)))
+        i = self._add_row(SEG_ARC, 0, start, end, width, handle)
+        self.cx.append(center[0])
+        self.cy.append(center[1])
+        self.radius.append(radius)
+        self.start_angle.append(start_angle)
+        self.end_angle.append(end_angle)
+        self.vstart.append(0)
+        self.vcount.append(0)
+        return i
+
+    def add_circle(self, center, radius, width=0, handle=None):
+        start = (center[0] + radius, center[1])
+        i = self._add_row(SEG_CIRCLE, FLAG_CLOSED, start, start, width, handle)
+        self.cx.append(center[0])
+        self.cy.append(center[1])
+        self.radius.append(radius)
+        self.start_angle.append(0)
+        self.end_angle.append(360)
+        self.vstart.append(0)
+        self.vcount.append(0)
+        return i
+
+    def add_poly(self, points, closed, lwpoly, width=0, handle=None):
+        """ points is a sequence of (x, y, bulge) """
+        flags = (FLAG_CLOSED if closed else 0) | (FLAG_LWPOLY if lwpoly else 0)
+        i = self._add_row(SEG_POLY, flags, points[0], points[-1], width, handle)
+        for col in (self.cx, self.cy, self.radius, self.start_angle, self.end_angle):
+            col.append(0)
+        self.vstart.append(len(self.vx))
+        self.vcount.append(len(points))
+        for pt in points:
+            self.vx.append(pt[0])
+            self.vy.append(pt[1])
+            self.vbulge.append(pt[2])
+        return i
+
+    def add_polyline(self, points, closed, lwpoly, width=0, handle=None):
+        """ add a polyline entity, as a line if it is just one straight segment """
+        if len(points) == 2 and not closed and points[0][2] == 0:
+            return self.add_line(points[0], points[1], width, handle)
+        return self.add_poly(points, closed, lwpoly, width, handle)
+
+    def start_point(self, i):
+        return (self.x0[i], self.y0[i])
+
+    def end_point(self, i):
+        return (self.x1[i], self.y1[i])
+
+    def is_closed(self, i):
+        return bool(self.flags[i] & FLAG_CLOSED)
+
+    def vertices(self, i):
+        """ (x, y, bulge) of each vertex of a polyline row """
+        first = self.vstart[i]
+        last = first + self.vcount[i]
+        return list(zip(self.vx[first:last], self.vy[first:last], self.vbulge[first:last]))
+
+    def subset(self, rows):
+        """ new table of the given rows, in the order given """
+        table = SegmentTable(self.layer)
+        for i in rows:
+            for name in ("kind", "flags", "x0", "y0", "x1", "y1", "cx", "cy", "radius",
+                         "start_angle", "end_angle", "width", "vcount"):
+                getattr(table, name).append(getattr(self, name)[i])
+            table.handles.append(self.handles[i])
+            table.vstart.append(len(table.vx))
+            first = self.vstart[i]
+            last = first + self.vcount[i]
+            table.vx.extend(self.vx[first:last])
+            table.vy.extend(self.vy[first:last])
+            table.vbulge.extend(self.vbulge[first:last])
+        return table
+
+    def describe(self, i):
+        return "{}(#{})".format(SEG_NAMES[self.kind[i]], self.handles[i])
+
+    def tessellate(self, tolerance):
+        """
+        Tessellate all the arcs and polyline bulges in one batch.
+        segment_points() uses the results when called with the same tolerance.
+        """
+        arcs = [i for i, kind in enumerate(self.kind) if kind == SEG_ARC]
+        points = arc_batch([self.cx[i] for i in arcs],
+                           [self.cy[i] for i in arcs],
+                           [self.radius[i] for i in arcs],
+                           [math.radians(self.start_angle[i]) for i in arcs],
+                           [math.radians(arc_sweep(self.start_angle[i], self.end_angle[i])) for i in arcs],
+                           tolerance)
+        self.arc_cache = {}
+        for i, pl in zip(arcs, points):
+            pl[0] = self.start_point(i)
+            pl[-1] = self.end_point(i)
+            self.arc_cache[i] = pl
+
+        # bulge segments run from a vertex to the next, wrapping round to the first
+        bulges = []
+        next_vertex = []
+        for i, kind in enumerate(self.kind):
+            if kind == SEG_POLY:
+                first = self.vstart[i]
+                last = first + self.vcount[i] - 1
+                for v in range(first, last + 1):
+                    if self.vbulge[v] != 0 and (v != last or self.is_closed(i)):
+                        bulges.append(v)
+                        next_vertex.append(v + 1 if v != last else first)
+
+        points = bulge_batch([self.vx[v] for v in bulges],
+                             [self.vy[v] for v in bulges],
+                             [self.vx[v] for v in next_vertex],
+                             [self.vy[v] for v in next_vertex],
+                             [self.vbulge[v] for v in bulges],
+                             tolerance)
+        self.bulge_cache = dict(zip(bulges, points))
+
+        # circles of the same size only differ by an offset, so each size is done once
+        radii = sorted(set(r for r, kind in zip(self.radius, self.kind) if kind == SEG_CIRCLE))
+        count = len(radii)
+        points = arc_batch([0] * count, [0] * count, radii, [0] * count, [2 * math.pi] * count, tolerance)
+        self.circle_cache = dict(zip(radii, points))
+        self.tolerance = tolerance
+
+
+def poly_points(table, i, tolerance=DEFAULT_ARC_TOLERANCE):
+    """
+    Points along a polyline row, with bulges converted to arcs.
+    The segment from the last vertex back to the first is only included for
+    closed polylines, and then without repeating the first point. Repeated
+    vertices are dropped.
+    """
+    points = []
+    vertices = table.vertices(i)
+    closed = table.is_closed(i)
+    cached = table.tolerance == tolerance
+    for j, point in enumerate(vertices):
+        if point[2] == 0 or (j == len(vertices)-1 and not closed):
+            pl = [(point[0], point[1])]
+        elif cached:
+            pl = list(table.bulge_cache[table.vstart[i] + j])
+        else:
+            pl = bulge_points(point, vertices[(j+1) % len(vertices)], point[2], tolerance)
+
+        if points and points[-1] == pl[0]:
+            del pl[0]
+        points.extend (pl)
+    return points
+
+
+def circle_points(table, i, tolerance=DEFAULT_ARC_TOLERANCE):
+    """ points around a circle row, the first point repeated at the end """
+    cx = table.cx[i]
+    cy = table.cy[i]
+    radius = table.radius[i]
+    if table.tolerance == tolerance:
+        points = table.circle_cache[radius]
+    else:
+        points = arc_points(0, 0, radius, 0, 2 * math.pi, tolerance)
+    points = [(cx + x, cy + y) for x, y in points]
+    points[-1] = points[0]
+    return points
+
+
+def segment_points(table, i, direction=1, tolerance=DEFAULT_ARC_TOLERANCE):
+    """ points along segment i, reversed if direction is -1 """
+    kind = table.kind[i]
+    if kind == SEG_LINE:
+        points = [table.start_point(i), table.end_point(i)]
+    elif kind == SEG_ARC and table.tolerance == tolerance:
+        points = list(table.arc_cache[i])
+    elif kind == SEG_ARC:
+        points = arc_points(table.cx[i], table.cy[i], table.radius[i],
+                            math.radians(table.start_angle[i]),
+                            math.radians(arc_sweep(table.start_angle[i], table.end_angle[i])),
+                            tolerance)
+        points[0] = table.start_point(i)
+        points[-1] = table.end_point(i)
+    elif kind == SEG_CIRCLE:
+        points = circle_points(table, i, tolerance)
+    else:
+        points = poly_points(table, i, tolerance)
+
+    if direction == -1:
+        points.reverse()
+    return points
@@ -0,0 +1,100 @@
+# ===========================================================================
+#
+# Converted shapes, in DXF coordinates, before they are written to the
+# footprint.
+#
+# Keeping the output in this form lets the converter cache the result of
+# converting a block once, and then place a copy of it for every INSERT.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import math
+
+from tessellate import arc_points
+
+# shape kinds
+SHAPE_POLY = 'poly'     # filled polygon, data is a list of points
+SHAPE_LINES = 'lines'   # open polyline, data is a list of points
+SHAPE_ARC = 'arc'       # data is (center, start point, counter-clockwise sweep in degrees), 360 for a circle
+
+
+def matrix_from_m44(m44):
+    """ 2D affine (a, b, c, d, e, f) from an ezdxf Matrix44, x' = a*x + c*y + e, y' = b*x + d*y + f """
+    ux = m44.ux
+    uy = m44.uy
+    origin = m44.origin
+    return (ux.x, ux.y, uy.x, uy.y, origin.x, origin.y)
+
+
+def matrix_scale(matrix):
+    """ largest scale factor of an affine transform """
+    a, b, c, d, e, f = matrix
+    return max(math.hypot(a, b), math.hypot(c, d))
+
+
+class Shapes(object):
+    """
+    List of (kind, layer, width, data) in the order they were added.
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add_poly(self, points, width, layer):
+        self.items.append((SHAPE_POLY, layer, width, points))
+
+    def add_lines(self, points, width, layer):
+        self.items.append((SHAPE_LINES, layer, width, points))
+
+    def add_arc(self, center, start, sweep, width, layer):
+        self.items.append((SHAPE_ARC, layer, width, (center, start, sweep)))
+
+    def extend(self, other):
+        self.items.extend(other.items)
+
+    def transformed(self, matrix, tolerance):
+        """
+        Copy of the shapes with an affine transform applied.
+        Arcs stay arcs under rotation, uniform scale and mirroring; otherwise
+        they become ellipses and are converted to lines within tolerance
+        (in the transformed coordinates).
+        """
+        a, b, c, d, e, f = matrix
+
+        def transform(pt):
+            return (a * pt[0] + c * pt[1] + e, b * pt[0] + d * pt[1] + f)
+
+        sx = math.hypot(a, b)
+        sy = math.hypot(c, d)
+        det = a * d - b * c
+        similar = math.isclose(sx, sy) and math.fabs(a * c + b * d) <= 1e-9 * sx * sy
+        width_scale = math.sqrt(math.fabs(det))
+
+        result = Shapes()
+        for kind, layer, width, data in self.items:
+            width = width * width_scale
+            if kind == SHAPE_ARC:
+                center, start, sweep = data
+                if similar:
+                    if det < 0 and sweep != 360:
+                        sweep = -sweep
+                    result.add_arc(transform(center), transform(start), sweep, width, layer)
+                else:
+                    radius = math.hypot(start[0] - center[0], start[1] - center[1])
+                    angle = math.atan2(start[1] - center[1], start[0] - center[0])
+                    points = arc_points(center[0], center[1], radius, angle, math.radians(sweep),
+                                        tolerance / max(sx, sy))
+                    result.add_lines([transform(pt) for pt in points], width, layer)
+            else:
+                result.items.append((kind, layer, width, [transform(pt) for pt in data]))
+        return result
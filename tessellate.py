@@ -0,0 +1,198 @@
+# ===========================================================================
+#
+# Arc tessellation.
+#
+# Arcs are split into equal chords, using as few chords as possible while
+# keeping every chord within a given distance (the sagitta) of the true arc.
+#
+# ===========================================================================
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ===========================================================================
+
+import math
+
+# numpy if it is installed, imported by have_numpy() when first needed, as it is
+# slow to import and not needed to start the converter
+numpy = None
+_numpy_checked = False
+
+# default maximum distance between a chord and the arc, in mm
+DEFAULT_ARC_TOLERANCE = 0.005
+
+# largest angle (radians) covered by one chord, however small the arc
+MAX_ARC_STEP = math.radians(45)
+
+
+def arc_step_count(radius, sweep, tolerance):
+    """ number of chords needed to keep an arc within tolerance """
+    if tolerance < radius:
+        max_step = min(2 * math.acos(1 - tolerance / radius), MAX_ARC_STEP)
+    else:
+        max_step = MAX_ARC_STEP
+    return max(1, int(math.ceil(math.fabs(sweep) / max_step)))
+
+
+def arc_points(cx, cy, radius, start, sweep, tolerance):
+    """
+    Points along an arc from angle start through sweep (radians, positive is
+    counter-clockwise), including both end points.
+    """
+    n = arc_step_count(radius, sweep, tolerance)
+    step = sweep / n
+    return [(cx + radius * math.cos(start + k * step),
+             cy + radius * math.sin(start + k * step)) for k in range(n + 1)]
+
+
+def arc_sweep(start_angle, end_angle):
+    """ counter-clockwise sweep in degrees of a DXF arc, a full circle if the angles are equal """
+    sweep = (end_angle - start_angle) % 360
+    if sweep == 0:
+        sweep = 360
+    return sweep
+
+
+def bulge_to_arc(p1, p2, bulge):
+    """
+    Convert a polyline bulge between two vertices into an arc.
+    Returns (cx, cy, radius, start, sweep) with angles in radians.
+    """
+    dx = p2[0] - p1[0]
+    dy = p2[1] - p1[1]
+    chord = math.hypot(dx, dy)
+    sweep = 4 * math.atan(bulge)
+    radius = chord / (2 * math.sin(math.fabs(sweep) / 2))
+
+    # signed distance from the chord midpoint to the center, to the left of p1->p2
+    offset = radius * math.cos(sweep / 2) * (1 if bulge > 0 else -1)
+    cx = (p1[0] + p2[0]) / 2 - offset * dy / chord
+    cy = (p1[1] + p2[1]) / 2 + offset * dx / chord
+
+    start = math.atan2(p1[1] - cy, p1[0] - cx)
+    return cx, cy, radius, start, sweep
+
+
+def bulge_points(p1, p2, bulge, tolerance):
+    """
+    Points along the arc between two polyline vertices with the given bulge,
+    from p1 up to but not including p2.
+    """
+    if p1[0] == p2[0] and p1[1] == p2[1]:
+        return [(p1[0], p1[1])]
+
+    cx, cy, radius, start, sweep = bulge_to_arc(p1, p2, bulge)
+    points = arc_points(cx, cy, radius, start, sweep, tolerance)
+    points[0] = (p1[0], p1[1])
+    return points[:-1]
+
+
+#
+# Batch tessellation
+#
+# These take equal length sequences describing many arcs and return one point
+# list per arc, the same as calling arc_points() / bulge_points() on each.
+# NumPy is used when it is available, otherwise the arcs are done one by one.
+#
+
+def _arc_batch_python(cx, cy, radius, start, sweep, tolerance):
+    return [arc_points(cx[j], cy[j], radius[j], start[j], sweep[j], tolerance)
+            for j in range(len(cx))]
+
+
+def _arc_batch_numpy(cx, cy, radius, start, sweep, tolerance):
+    cx = numpy.asarray(cx, dtype=float)
+    cy = numpy.asarray(cy, dtype=float)
+    radius = numpy.asarray(radius, dtype=float)
+    start = numpy.asarray(start, dtype=float)
+    sweep = numpy.asarray(sweep, dtype=float)
+
+    # same as arc_step_count()
+    small = tolerance >= radius
+    ratio = numpy.where(small, 0.0, tolerance / numpy.where(small, 1.0, radius))
+    max_step = numpy.where(small, MAX_ARC_STEP,
+                           numpy.minimum(2 * numpy.arccos(1 - ratio), MAX_ARC_STEP))
+    n = numpy.maximum(1, numpy.ceil(numpy.fabs(sweep) / max_step)).astype(numpy.int64)
+    step = sweep / n
+
+    # one entry per output point: the arc it belongs to and its index k along the arc
+    counts = n + 1
+    ends = numpy.cumsum(counts)
+    arc = numpy.repeat(numpy.arange(len(n)), counts)
+    k = numpy.arange(ends[-1]) - numpy.repeat(ends - counts, counts)
+
+    angle = start[arc] + k * step[arc]
+    x = (cx[arc] + radius[arc] * numpy.cos(angle)).tolist()
+    y = (cy[arc] + radius[arc] * numpy.sin(angle)).tolist()
+
+    points = list(zip(x, y))
+    result = []
+    first = 0
+    for last in ends.tolist():
+        result.append(points[first:last])
+        first = last
+    return result
+
+
+def have_numpy():
+    """ import numpy the first time, returns False if it is not installed """
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy as module
+            numpy = module
+        except ImportError:
+            pass
+    return numpy is not None
+
+
+def arc_batch(cx, cy, radius, start, sweep, tolerance):
+    """ tessellate many arcs, angles in radians """
+    if len(cx) == 0:
+        return []
+    if not have_numpy():
+        return _arc_batch_python(cx, cy, radius, start, sweep, tolerance)
+    return _arc_batch_numpy(cx, cy, radius, start, sweep, tolerance)
+
+
+def bulge_batch(x1, y1, x2, y2, bulge, tolerance):
+    """ tessellate many bulge segments, from (x1, y1) up to but not including (x2, y2) """
+    count = len(x1)
+    if count == 0:
+        return []
+
+    if not have_numpy():
+        return [bulge_points((x1[j], y1[j]), (x2[j], y2[j]), bulge[j], tolerance)
+                for j in range(count)]
+
+    x1 = numpy.asarray(x1, dtype=float)
+    y1 = numpy.asarray(y1, dtype=float)
+    x2 = numpy.asarray(x2, dtype=float)
+    y2 = numpy.asarray(y2, dtype=float)
+    bulge = numpy.asarray(bulge, dtype=float)
+
+    # same as bulge_to_arc(), with coincident end points given a dummy chord
+    dx = x2 - x1
+    dy = y2 - y1
+    same = (dx == 0) & (dy == 0)
+    chord = numpy.where(same, 1.0, numpy.hypot(dx, dy))
+    sweep = 4 * numpy.arctan(bulge)
+    radius = chord / (2 * numpy.sin(numpy.fabs(sweep) / 2))
+    offset = radius * numpy.cos(sweep / 2) * numpy.where(bulge > 0, 1, -1)
+    cx = (x1 + x2) / 2 - offset * dy / chord
+    cy = (y1 + y2) / 2 + offset * dx / chord
+    start = numpy.arctan2(y1 - cy, x1 - cx)
+
+    arcs = _arc_batch_numpy(cx, cy, radius, start, numpy.where(same, 0.0, sweep), tolerance)
+
+    x1 = x1.tolist()
+    y1 = y1.tolist()
+    result = []
+    for j, points in enumerate(arcs):
+        points[0] = (x1[j], y1[j])
+        result.append(points[:-1])
+    return result
@@ -0,0 +1,46 @@
+import os
+import stat
+
+import pytest
+
+from atomic_file import UMASK, atomic_write, copy_atomic
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_mode(tmpdir):
+    path = str(tmpdir.join("new.kicad_mod"))
+    with atomic_write(path) as f:
+        f.write("text")
+    assert mode(path) == 0o666 & ~UMASK
+    with open(path) as f:
+        assert f.read() == "text"
+    assert os.listdir(str(tmpdir)) == ["new.kicad_mod"]
+
+
+def test_existing_mode_kept(tmpdir):
+    path = str(tmpdir.join("old.kicad_mod"))
+    source = str(tmpdir.join("source"))
+    for name in (path, source):
+        with open(name, "w") as f:
+            f.write(name)
+    os.chmod(path, 0o640)
+    copy_atomic(source, path)
+    assert mode(path) == 0o640
+    with open(path) as f:
+        assert f.read() == source
+
+
+def test_failed_write_keeps_file(tmpdir):
+    path = str(tmpdir.join("old.kicad_mod"))
+    with open(path, "w") as f:
+        f.write("old")
+    with pytest.raises(ValueError):
+        with atomic_write(path) as f:
+            f.write("new")
+            raise ValueError()
+    with open(path) as f:
+        assert f.read() == "old"
+    assert os.listdir(str(tmpdir)) == ["old.kicad_mod"]
@@ -0,0 +1,92 @@
+import os
+
+from conversion_cache import ConversionCache, make_key
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_put_and_get(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    key = make_key("a", "b")
+    source = str(tmp_path / "source.kicad_mod")
+    dest = str(tmp_path / "dest.kicad_mod")
+    write(source, "(module a)")
+
+    assert not cache.get(key, dest)
+    assert not os.path.exists(dest)
+
+    cache.put(key, source)
+    assert cache.get(key, dest)
+    assert read(dest) == "(module a)"
+    assert make_key("a", "b") != make_key("ab", "")
+
+
+def test_least_recently_used_removed(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"), max_size=25)
+    source = str(tmp_path / "source.kicad_mod")
+    dest = str(tmp_path / "dest.kicad_mod")
+    write(source, "0123456789")
+
+    keys = [make_key(str(n)) for n in range(3)]
+    cache.put(keys[0], source)
+    cache.put(keys[1], source)
+    os.utime(cache.path(keys[0]), (1000, 1000))
+    os.utime(cache.path(keys[1]), (2000, 2000))
+    assert cache.get(keys[0], dest)
+
+    # over the limit, keys[1] is now the oldest
+    cache.put(keys[2], source)
+    assert cache.get(keys[0], dest)
+    assert not cache.get(keys[1], dest)
+    assert cache.get(keys[2], dest)
+
+
+def test_folder_walked_only_when_over_size(tmp_path, monkeypatch):
+    cache = ConversionCache(str(tmp_path / "cache"), max_size=105)
+    source = str(tmp_path / "source.kicad_mod")
+    write(source, "0123456789")
+    walks = []
+    walk = os.walk
+    monkeypatch.setattr(os, "walk", lambda folder: walks.append(folder) or walk(folder))
+
+    for n in range(10):
+        cache.put(make_key(str(n)), source)
+    assert len(walks) == 1
+
+    # over the limit, the oldest entries are removed to below 90% of it
+    cache.put(make_key("10"), source)
+    assert len(walks) == 2
+    assert sum(len(files) for folder, dirs, files in walk(cache.folder)) == 9
+
+
+def test_entry_removed_by_another_process(tmp_path, monkeypatch):
+    cache = ConversionCache(str(tmp_path / "cache"), max_size=25)
+    source = str(tmp_path / "source.kicad_mod")
+    dest = str(tmp_path / "dest.kicad_mod")
+    write(source, "0123456789")
+
+    keys = [make_key(str(n)) for n in range(3)]
+    for n, key in enumerate(keys[:2]):
+        cache.put(key, source)
+        os.utime(cache.path(key), (1000 * (n + 1), 1000 * (n + 1)))
+
+    def remove_first(path):
+        # the oldest entry is removed by another process first
+        remove(path)
+        if path == cache.path(keys[0]):
+            raise FileNotFoundError(path)
+    remove = os.remove
+    monkeypatch.setattr(os, "remove", remove_first)
+
+    cache.put(keys[2], source)
+    assert not cache.get(keys[0], dest)
+    assert cache.get(keys[1], dest)
+    assert cache.get(keys[2], dest)
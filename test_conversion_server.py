@@ -0,0 +1,45 @@
+import os
+import threading
+
+import pytest
+
+from conversion_server import ConversionServer
+from dxf2kicad_client import ConversionError, request_conversion
+from dxf2kicad_mod import ConversionContext, convert_file
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")
+
+
+@pytest.fixture
+def server():
+    server = ConversionServer(("127.0.0.1", 0), jobs=2, queue_size=4)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_server_matches_convert_file(server, tmp_path):
+    port = server.server_address[1]
+    for name in ["test.dxf", "test_hatch.dxf"]:
+        dxf_path = os.path.join(TESTS, name)
+        footprint_path = str(tmp_path / name.replace(".dxf", ".kicad_mod"))
+        convert_file(ConversionContext(tedit=0), dxf_path, footprint_path)
+
+        response = request_conversion(dxf_path, name.replace(".dxf", ""), options={"tedit": 0}, port=port)
+        with open(footprint_path, newline="") as f:
+            assert response["footprint"] == f.read()
+        assert response["converted"] > 0
+
+    assert server.status()["converted"] == 2
+
+
+def test_server_reports_errors(server):
+    port = server.server_address[1]
+    with pytest.raises(ConversionError, match="no file"):
+        request_conversion(os.path.join(TESTS, "missing.dxf"), port=port)
+    with pytest.raises(ConversionError):
+        request_conversion(os.path.join(TESTS, "..", "README.md"), port=port)
+    assert server.status()["failed"] == 1
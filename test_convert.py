@@ -0,0 +1,286 @@
+import argparse
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ezdxf
+
+from conversion_cache import ConversionCache
+from conversion_server import make_context
+from dxf2kicad_mod import (cache_key, convert, convert_file, is_batch_input, settings_from_args, stream_layers,
+                           ConversionContext, Settings, Units)
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")
+
+
+def test_convert_returns_footprint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    footprint = convert(os.path.join(TESTS, "test_hatch.dxf"))
+    assert footprint.name == "test_hatch"
+    assert len(footprint.polys) == 4
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_conversions_keep_their_settings():
+    mil = Settings()
+    mil.use_mil()
+    mil.layers = {"0": "B.Cu"}
+    contexts = [ConversionContext(), ConversionContext(mil)]
+
+    path = os.path.join(TESTS, "test_hatch.dxf")
+    expected = [convert(path, ctx).polys for ctx in contexts]
+    assert expected[0] != expected[1]
+
+    with ThreadPoolExecutor(4) as pool:
+        results = [pool.submit(convert, path, ctx) for ctx in contexts * 4]
+        for n, result in enumerate(results):
+            assert result.result().polys == expected[n % 2]
+
+
+@pytest.mark.parametrize("name", ["test.dxf", "test_data.dxf", "test_hatch.dxf"])
+def test_stream_matches_readfile(name):
+    path = os.path.join(TESTS, name)
+    loaded = convert(path)
+    streamed = convert(path, ConversionContext(stream=True))
+    assert streamed.polys == loaded.polys
+    assert streamed.lines == loaded.lines
+
+
+def test_stream_yields_finished_layers(tmp_path):
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    for n, layer in enumerate("ABACA"):
+        msp.add_line((n, 0), (n, 1), dxfattribs={"layer": layer})
+        msp.add_circle((n, 3), 1, dxfattribs={"layer": layer})
+    path = str(tmp_path / "layers.dxf")
+    doc.saveas(path)
+
+    read = [(n, table.layer, len(table)) for n, (table, hatches, inserts) in stream_layers(ConversionContext(), path)]
+    assert read == [(1, "B", 2), (2, "C", 2), (0, "A", 6)]
+
+    loaded = convert(path)
+    for jobs in (1, 2):
+        streamed = convert(path, ConversionContext(stream=True, jobs=jobs))
+        assert streamed.polys == loaded.polys
+        assert streamed.lines == loaded.lines
+
+
+def test_stream_pool_only_for_large_layers(tmp_path, monkeypatch):
+    import concurrent.futures
+    import dxf2kicad_mod
+
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    draw_squares(msp, 20)
+    for n in range(3):
+        msp.add_line((n, -2), (n, -1), dxfattribs={"layer": "small"})
+    path = str(tmp_path / "layers.dxf")
+    doc.saveas(path)
+    loaded = convert(path)
+
+    pools = []
+
+    class Pool(concurrent.futures.ProcessPoolExecutor):
+        def submit(self, function, *args):
+            pools.append(args[1].layer)
+            return super().submit(function, *args)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", Pool)
+    streamed = convert(path, ConversionContext(stream=True, jobs=2))
+    assert pools == []
+    assert streamed.polys == loaded.polys
+
+    monkeypatch.setattr(dxf2kicad_mod, "PARALLEL_MIN_SEGMENTS", 20)
+    streamed = convert(path, ConversionContext(stream=True, jobs=2))
+    assert pools == ["0"]
+    assert streamed.polys == loaded.polys
+    assert streamed.lines == loaded.lines
+
+
+def test_fixed_tedit_saves_same_file(tmp_path):
+    first = str(tmp_path / "first.kicad_mod")
+    second = str(tmp_path / "second.kicad_mod")
+    convert(os.path.join(TESTS, "test.dxf")).save(first, tedit=0)
+    convert(os.path.join(TESTS, "test.dxf")).save(second, tedit=0)
+    with open(first) as f1, open(second) as f2:
+        text = f1.read()
+        assert text == f2.read()
+    assert "(tedit 0)" in text
+
+
+def draw_squares(msp, count):
+    """ rows of squares, some with an arc for a side, and open lines between them """
+    for n in range(count):
+        x = (n % 5) * 10
+        y = (n // 5) * 10
+        msp.add_line((x, y), (x + 4, y))
+        msp.add_line((x + 4, y), (x + 4, y + 4))
+        if n % 3:
+            msp.add_line((x + 4, y + 4), (x, y + 4))
+        else:
+            msp.add_arc((x + 2, y + 4), 2, 0, 180)
+        msp.add_line((x, y + 4), (x, y))
+        msp.add_line((x + 5, y + 1), (x + 6, y + 2))
+        msp.add_circle((x + 2, y + 2), 1)
+
+
+def test_incremental_matches_full_conversion(tmp_path):
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    draw_squares(msp, 20)
+    dxf_path = str(tmp_path / "drawing.dxf")
+    incremental = str(tmp_path / "incremental.kicad_mod")
+    full = str(tmp_path / "full.kicad_mod")
+    ctx = ConversionContext(tedit=0, incremental=True)
+
+    doc.saveas(dxf_path)
+    convert_file(ctx, dxf_path, incremental)
+
+    # move one line, delete another and join two squares
+    lines = msp.query("LINE")
+    lines[6].dxf.end = (4.5, 4)
+    msp.delete_entity(lines[20])
+    msp.add_line((14, 10), (20, 10))
+    doc.saveas(dxf_path)
+
+    convert_file(ctx, dxf_path, incremental)
+    convert(dxf_path, ConversionContext(), "incremental").save(full, tedit=0)
+    with open(incremental) as f1, open(full) as f2:
+        # the descriptions name different files
+        assert f1.readline() == f2.readline()
+        assert "descr" in f1.readline() and "descr" in f2.readline()
+        assert f1.read() == f2.read()
+
+
+def test_cache_with_incremental(tmp_path, capsys):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    ctx = ConversionContext(tedit=0, incremental=True, cache=cache)
+    paths = []
+    for n in range(2):
+        doc = ezdxf.new()
+        draw_squares(doc.modelspace(), 5 + n)
+        dxf_path = str(tmp_path / "drawing{}.dxf".format(n))
+        doc.saveas(dxf_path)
+        paths.append((dxf_path, str(tmp_path / "drawing{}.kicad_mod".format(n))))
+
+    for dxf_path, footprint_path in paths:
+        convert_file(ctx, dxf_path, footprint_path)
+        assert os.path.exists(cache.path(cache_key(ctx, dxf_path, footprint_path)))
+    assert "cached" not in capsys.readouterr().out
+
+    for dxf_path, footprint_path in paths:
+        os.remove(footprint_path)
+        convert_file(ctx, dxf_path, footprint_path)
+    assert capsys.readouterr().out.count("(cached)") == 2
+    with open(paths[0][1]) as f1, open(paths[1][1]) as f2:
+        assert f1.read() != f2.read()
+
+
+def test_converter_version_does_not_import_ezdxf():
+    code = "import sys, dxf2kicad_mod; dxf2kicad_mod.converter_version(); print('ezdxf' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(TESTS),
+                            check=True, stdout=subprocess.PIPE, text=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_settings_file_keeps_layers(tmp_path):
+    settings = Settings()
+    settings.layers = {"0": "B.Cu", "Outline": "Edge.Cuts"}
+    settings.arc_tolerance = 0.01
+    path = str(tmp_path / "settings.json")
+    settings.save_to_file(path)
+
+    loaded = Settings.load_from_file(path)
+    assert loaded.layers == settings.layers
+    assert loaded.arc_tolerance == 0.01
+
+
+def test_mil_units_option():
+    args = argparse.Namespace(settings=None, native_arcs=False, units="MIL")
+    settings = settings_from_args(args)
+    assert settings.units == Units.MIL
+
+    path = os.path.join(TESTS, "test_hatch.dxf")
+    cli = convert(path, ConversionContext(settings))
+    server = convert(path, make_context(options={"units": "mil"}))
+    assert cli.polys == server.polys
+    assert cli.polys != convert(path).polys
+
+
+def test_file_name_with_bracket_is_not_batch(tmp_path):
+    path = tmp_path / "part[1].dxf"
+    assert is_batch_input(str(path))
+    path.write_text("")
+    assert not is_batch_input(str(path))
+    assert is_batch_input(str(tmp_path))
+    assert is_batch_input(str(tmp_path / "*.dxf"))
+
+
+def test_watch_keeps_settings_while_file_is_bad(tmp_path, monkeypatch, capsys):
+    import dxf2kicad_mod
+
+    doc = ezdxf.new()
+    draw_squares(doc.modelspace(), 5)
+    dxf_path = str(tmp_path / "drawing.dxf")
+    footprint_path = str(tmp_path / "drawing.kicad_mod")
+    doc.saveas(dxf_path)
+    settings_file = tmp_path / "settings.json"
+    settings_file.write_text('{"layers": {"0": "B.Cu"}}')
+
+    def footprint_layers():
+        with open(footprint_path) as f:
+            text = f.read()
+        return "B.Cu" in text, "B.Mask" in text
+
+    loads = []
+    polls = iter([
+        lambda: None,                                                    # the drawing is seen
+        lambda: settings_file.write_text('{"layers": {"0": "F.S'),       # converted, settings half saved
+        lambda: None,                                                    # bad settings seen
+        lambda: loads.append(footprint_layers()),                        # load failed, not converted again
+        lambda: settings_file.write_text('{"layers": {"0": "B.Mask"}}'),
+        lambda: loads.append(len(loads)),                                # new settings seen, not loaded yet
+    ])
+
+    def sleep(seconds):
+        try:
+            next(polls)()
+        except StopIteration:
+            raise KeyboardInterrupt()
+
+    def load():
+        loads.append("load")
+        return Settings.read_file(str(settings_file))
+
+    monkeypatch.setattr(dxf2kicad_mod.time, "sleep", sleep)
+    ctx = ConversionContext(Settings.read_file(str(settings_file)), tedit=0)
+    dxf2kicad_mod.watch(ctx, lambda: [(dxf_path, footprint_path)], str(settings_file), load)
+
+    assert loads == ["load", (True, False), 2, "load"]
+    assert "settings not changed" in capsys.readouterr().err
+    assert footprint_layers() == (False, True)
+
+
+def test_failed_save_keeps_footprint(tmp_path, monkeypatch):
+    from dxf2kicad_common.kicad_mod import KicadMod
+
+    dxf_path = os.path.join(TESTS, "test.dxf")
+    path = str(tmp_path / "test.kicad_mod")
+    convert_file(ConversionContext(tedit=0), dxf_path, path)
+    with open(path) as f:
+        saved = f.read()
+
+    def save(footprint, filename, tedit=None):
+        with open(filename, "w") as f:
+            f.write("(module")
+        raise OSError("no space left")
+
+    monkeypatch.setattr(KicadMod, "save", save)
+    with pytest.raises(OSError):
+        convert_file(ConversionContext(tedit=0), dxf_path, path)
+    with open(path) as f:
+        assert f.read() == saved
+    assert os.listdir(str(tmp_path)) == ["test.kicad_mod"]
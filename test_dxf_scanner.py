@@ -0,0 +1,86 @@
+import os
+
+import ezdxf
+import pytest
+
+from dxf_scanner import scan_layers, ScanError
+
+TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")
+
+COLUMNS = ['kind', 'flags', 'x0', 'y0', 'x1', 'y1', 'cx', 'cy', 'radius', 'start_angle', 'end_angle',
+           'width', 'vstart', 'vcount', 'vx', 'vy', 'vbulge', 'handles']
+
+
+def assert_same_layers(path):
+    dxf2kicad_mod = pytest.importorskip("dxf2kicad_mod")
+    ctx = dxf2kicad_mod.ConversionContext()
+    expected = dxf2kicad_mod.read_layers(ctx, dxf2kicad_mod.read_dxf(ctx, path))
+    layers = scan_layers(path, ctx.settings.min_line_width)
+
+    assert [table.layer for table, _, _ in layers] == [table.layer for table, _, _ in expected]
+    for (table, _, _), (expected_table, _, _) in zip(layers, expected):
+        for col in COLUMNS:
+            assert getattr(table, col) == getattr(expected_table, col), col
+
+
+@pytest.mark.parametrize("name", ["test.dxf", "test_data.dxf", "test_dxf_to_pad.dxf"])
+def test_same_as_ezdxf(name):
+    assert_same_layers(os.path.join(TESTS, name))
+
+
+def test_all_entity_types(tmp_path):
+    doc = ezdxf.new("R2000")
+    doc.layers.add("B")
+    doc.layers.add("A")
+    msp = doc.modelspace()
+    msp.add_circle((1, 2), 3, dxfattribs={'layer': 'A'})
+    msp.add_arc((1, 2), 3, 10, 200, dxfattribs={'layer': 'C'})
+    msp.add_lwpolyline([(0, 0, 0.5), (1, 0, 0), (1, 1, -1)], format='xyb', close=True,
+                       dxfattribs={'layer': 'B', 'const_width': 0.3})
+    msp.add_polyline2d([(0, 0), (3, 0), (3, 3)], close=True, dxfattribs={'layer': 'A'})
+    msp.add_polyline2d([(0, 0), (3, 0)], dxfattribs={'layer': 'A'})
+    path = str(tmp_path / "mix.dxf")
+    doc.saveas(path)
+
+    assert_same_layers(path)
+
+
+def test_unsupported_entity():
+    with pytest.raises(ScanError):
+        scan_layers(os.path.join(TESTS, "test_hatch.dxf"), 0.2)
+
+
+def test_binary_dxf(tmp_path):
+    doc = ezdxf.new()
+    doc.modelspace().add_line((0, 0), (1, 1))
+    path = str(tmp_path / "binary.dxf")
+    doc.saveas(path, fmt="bin")
+
+    with pytest.raises(ScanError):
+        scan_layers(path, 0.2)
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / "empty.dxf")
+    open(path, "w").close()
+    with pytest.raises(ScanError):
+        scan_layers(path, 0.2)
+
+
+@pytest.mark.parametrize("code", ["10", "67"])
+def test_bad_number(tmp_path, code):
+    doc = ezdxf.new()
+    doc.modelspace().add_line((0, 0), (1, 1))
+    path = str(tmp_path / "bad.dxf")
+    doc.saveas(path)
+
+    with open(path) as f:
+        lines = f.read().split("\n")
+    # a tag with a bad value straight after the entity type
+    line = lines.index("LINE", lines.index("ENTITIES"))
+    lines[line + 1:line + 1] = [code, "1.0.0"]
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+    with pytest.raises(ScanError):
+        scan_layers(path, 0.2)
@@ -0,0 +1,53 @@
+import os
+
+from geometry_snapshot import ROW_COLUMNS, VERTEX_COLUMNS, source_info, save_snapshot, load_snapshot
+from segment_table import SegmentTable
+
+
+def make_layers():
+    first = SegmentTable("F.SilkS")
+    first.add_line((0, 0), (1, 1), 0.2, "1A")
+    first.add_arc((1, 2), 5, 30, 300, 0, "1B")
+    first.add_poly([(0, 0, 0.5), (4, 0, 0), (4, 4, -0.3)], True, True, 0.1, "1C")
+    second = SegmentTable("Edge.Cuts")
+    second.add_circle((10, -3), 1.5, 0, None)
+    second.add_poly([(1, 1, 0), (2, 2, 1)], False, False)
+    return [(first, [], []), (second, [], [])]
+
+
+def save(tmp_path, layers, key="key"):
+    dxf_path = str(tmp_path / "drawing.dxf")
+    with open(dxf_path, "w") as f:
+        f.write("0\nEOF\n")
+    path = dxf_path + ".snapshot"
+    save_snapshot(path, source_info(dxf_path), layers, key)
+    return path, dxf_path
+
+
+def test_snapshot_round_trip(tmp_path):
+    layers = make_layers()
+    path, dxf_path = save(tmp_path, layers)
+
+    loaded = load_snapshot(path, dxf_path, "key")
+    assert len(loaded) == len(layers)
+    for (table, hatches, inserts), (expected, _, _) in zip(loaded, layers):
+        assert table.layer == expected.layer
+        assert table.handles == expected.handles
+        for name in ROW_COLUMNS + VERTEX_COLUMNS:
+            assert getattr(table, name) == getattr(expected, name)
+
+
+def test_snapshot_only_used_for_same_file_and_key(tmp_path):
+    path, dxf_path = save(tmp_path, make_layers())
+    assert load_snapshot(path, dxf_path, "other key") is None
+
+    # a new modification time with the same contents is still the same file
+    st = os.stat(dxf_path)
+    os.utime(dxf_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert load_snapshot(path, dxf_path, "key") is not None
+
+    with open(dxf_path, "w") as f:
+        f.write("0\nEOX\n")
+    assert load_snapshot(path, dxf_path, "key") is None
+
+    assert load_snapshot(path + ".missing", dxf_path, "key") is None
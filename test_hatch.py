@@ -0,0 +1,101 @@
+import math
+
+import ezdxf
+import pytest
+
+from hatch import hatch_polygons, signed_area, point_in_polygon
+
+
+def new_hatch(style=0):
+    doc = ezdxf.new()
+    hatch = doc.modelspace().add_hatch()
+    hatch.dxf.hatch_style = style
+    return hatch
+
+
+def square(size, x=0, y=0):
+    return [(x, y), (x + size, y), (x + size, y + size), (x, y + size)]
+
+
+def test_polyline_path():
+    hatch = new_hatch()
+    hatch.paths.add_polyline_path(square(10), is_closed=True)
+
+    polygons = hatch_polygons(hatch, 0.005)
+    assert len(polygons) == 1
+    assert polygons[0][0] == polygons[0][-1]
+    assert signed_area(polygons[0][:-1]) == pytest.approx(100)
+
+
+def test_edge_path_with_clockwise_arc():
+    hatch = new_hatch()
+    path = hatch.paths.add_edge_path()
+    path.add_line((0, 0), (10, 0))
+    path.add_line((10, 0), (10, 10))
+    # half circle bulging into the square, from (10, 10) to (0, 10)
+    path.add_arc((5, 10), 5, 180, 360, ccw=False)
+    path.add_line((0, 10), (0, 0))
+
+    points = hatch_polygons(hatch, 0.001)[0]
+    assert signed_area(points[:-1]) == pytest.approx(100 - math.pi * 25 / 2, rel=1e-3)
+    assert not point_in_polygon((5, 8), points)
+
+
+def test_islands():
+    hatch = new_hatch()
+    hatch.paths.add_polyline_path(square(30), is_closed=True)
+    hatch.paths.add_polyline_path(square(10, 10, 10), is_closed=True)
+    hatch.paths.add_polyline_path(square(2, 14, 14), is_closed=True)
+
+    polygons = hatch_polygons(hatch, 0.005)
+    assert len(polygons) == 2
+    assert signed_area(polygons[0][:-1]) == pytest.approx(900 - 100)
+    assert point_in_polygon((5, 5), polygons[0])
+    assert not point_in_polygon((12, 12), polygons[0])
+    assert signed_area(polygons[1][:-1]) == pytest.approx(4)
+
+    # outer style leaves out the island in the island
+    assert len(hatch_polygons(new_hatch_from(hatch, 1), 0.005)) == 1
+    # ignore style fills the whole outline
+    polygons = hatch_polygons(new_hatch_from(hatch, 2), 0.005)
+    assert signed_area(polygons[0][:-1]) == pytest.approx(900)
+
+
+def new_hatch_from(hatch, style):
+    copy = new_hatch(style)
+    for path in hatch.paths:
+        copy.paths.add_polyline_path([(v[0], v[1]) for v in path.vertices], is_closed=True)
+    return copy
+
+
+def proper_crossings(points):
+    """ pairs of edges of a closed point list which cross each other, not counting touching """
+    def side(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    edges = list(zip(points[:-1], points[1:]))
+    crossings = []
+    for n, (a, b) in enumerate(edges):
+        for m in range(n + 1, len(edges)):
+            c, d = edges[m]
+            if (side(a, b, c) * side(a, b, d) < 0 and side(c, d, a) * side(c, d, b) < 0):
+                crossings.append((n, m))
+    return crossings
+
+
+def test_holes_side_by_side():
+    hatch = new_hatch()
+    # the outline has a point reaching in from the right, nearer to the left
+    # hole than anything else, with the tall hole between them
+    hatch.paths.add_polyline_path([(0, 0), (20, 0), (20, 9.9), (12, 10), (20, 10.1), (20, 20), (0, 20)],
+                                  is_closed=True)
+    hatch.paths.add_polyline_path([(9, 0.5), (9.5, 0.5), (9.5, 19.5), (9, 19.5)], is_closed=True)
+    hatch.paths.add_polyline_path(square(2, 6, 9), is_closed=True)
+
+    polygons = hatch_polygons(hatch, 0.005)
+    assert len(polygons) == 1
+    assert proper_crossings(polygons[0]) == []
+    assert signed_area(polygons[0][:-1]) == pytest.approx(400 - 0.8 - 0.5 * 19 - 4)
+    assert point_in_polygon((5, 5), polygons[0])
+    assert not point_in_polygon((9.25, 10), polygons[0])
+    assert not point_in_polygon((7, 10), polygons[0])
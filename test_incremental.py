@@ -0,0 +1,42 @@
+from incremental import component_key, connected_components, row_fingerprint
+from segment_table import SegmentTable, segment_points
+
+
+def test_components_join_rows_which_meet():
+    table = SegmentTable("0")
+    table.add_line((0, 0), (1, 0), handle="A")
+    table.add_line((5, 5), (6, 5), handle="B")
+    table.add_arc((1, 1), 1, 270, 0, handle="C")         # from (1, 0) to (2, 1)
+    table.add_circle((1, 0), 1, handle="D")
+    table.add_line((2, 1.0000001), (3, 3), handle="E")
+
+    chained = [True, True, True, False, True]
+    assert connected_components(table, chained, 0.001) == [[0, 2, 4], [1], [3]]
+
+
+def test_component_key_changes_with_geometry():
+    table = SegmentTable("0")
+    table.add_line((0, 0), (1, 0), handle="A")
+    table.add_line((0, 0), (1, 0), handle="B")
+    table.add_line((0, 0), (1, 1), handle="A")
+    fingerprints = [row_fingerprint(table, i) for i in range(len(table))]
+
+    assert fingerprints[0] == fingerprints[1]
+    assert component_key(table, [0], fingerprints) != component_key(table, [1], fingerprints)
+    assert component_key(table, [0], fingerprints) != component_key(table, [2], fingerprints)
+
+
+def test_subset_copies_rows():
+    table = SegmentTable("F.SilkS")
+    table.add_line((0, 0), (1, 0), 0.2, "A")
+    table.add_poly([(0, 0, 0.5), (4, 0, 0), (4, 4, -0.3)], True, True, 0.1, "B")
+    table.add_arc((1, 2), 5, 30, 300, 0, "C")
+    table.add_poly([(1, 1, 0), (2, 2, 1)], False, False, 0, "D")
+
+    subset = table.subset([1, 3])
+    assert subset.layer == "F.SilkS"
+    assert subset.handles == ["B", "D"]
+    for n, i in enumerate([1, 3]):
+        assert subset.vertices(n) == table.vertices(i)
+        assert subset.is_closed(n) == table.is_closed(i)
+        assert segment_points(subset, n) == segment_points(table, i)
@@ -0,0 +1,87 @@
+import io
+import random
+
+import pytest
+
+from dxf2kicad_common.sexpr import NumberFormatter, SexprBuilder, SexprItem
+
+
+def random_numbers(count, seed=1):
+    rnd = random.Random(seed)
+    choices = [0, 0.0, -0.0, 7, -12, 1e-5, -3e-7, 0.0001, 1e-11, 99999.5, 1e5, 1e20, float("inf")]
+    numbers = []
+    for _ in range(count):
+        if rnd.random() < 0.2:
+            numbers.append(rnd.choice(choices))
+        elif rnd.random() < 0.5:
+            numbers.append(round(rnd.uniform(-100, 100), 4))
+        else:
+            numbers.append(rnd.uniform(-1000, 1000))
+    return numbers
+
+
+def test_numbers_same_as_sexpr_item():
+    numbers = random_numbers(5000)
+    expected = [SexprItem(val) for val in numbers]
+    assert NumberFormatter().numbers(numbers) == expected
+    for first in range(0, len(numbers), 7):
+        assert NumberFormatter().numbers(numbers[first:first + 7]) == expected[first:first + 7]
+
+
+@pytest.mark.parametrize("precision", [1, 3, 4, 6, 12])
+def test_numbers_precision(precision):
+    numbers = random_numbers(2000, seed=precision)
+    formatter = NumberFormatter(precision)
+    expected = [str(round(val, precision)).rstrip('0').rstrip('.') if type(val) == float else str(val)
+                for val in numbers]
+    assert formatter.numbers(numbers) == expected
+
+
+def test_numbers_other_types():
+    formatter = NumberFormatter()
+    assert formatter.numbers([1.5, True, "x y"]) == ["1.5", "True", '"x y"']
+    assert formatter.numbers([]) == []
+
+
+def test_token_cached():
+    formatter = NumberFormatter()
+    assert formatter.token("layer", "F.SilkS") == "(layer F.SilkS)"
+    assert formatter.token("width", 1.0) == "(width 1)"
+    assert formatter.token("width", 1) == "(width 1)"
+    assert formatter.token("layer", "F.SilkS") is formatter.token("layer", "F.SilkS")
+
+
+def test_token_signed_zero():
+    formatter = NumberFormatter()
+    assert formatter.token("width", 0.0) == SexprItem(0.0, "width")
+    assert formatter.token("width", -0.0) == SexprItem(-0.0, "width")
+    assert formatter.token("width", 0.0) == SexprItem(0.0, "width")
+    assert formatter.token("width", 0.0) != formatter.token("width", -0.0)
+
+
+def build(builder, values, points=True):
+    builder.addItems(["name", {"layer": "F.Cu"}], newline=False)
+    builder.startGroup("pts", newline=True, indent=True)
+    if points:
+        builder.addPoints(iter(values))
+    else:
+        for i in range(0, len(values), 2):
+            builder.addItem({"xy": [values[i], values[i + 1]]})
+    builder.endGroup(newline=True)
+    builder.endGroup(newline=True)
+
+
+def test_points_same_as_items():
+    values = random_numbers(2 * 10000)
+    expected = SexprBuilder("module")
+    build(expected, values, points=False)
+
+    builder = SexprBuilder("module")
+    build(builder, values)
+    assert builder.output == expected.output
+
+    stream = io.StringIO()
+    builder = SexprBuilder("module", stream)
+    build(builder, values)
+    builder.flush()
+    assert stream.getvalue() == expected.output
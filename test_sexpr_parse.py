@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from dxf2kicad_common import sexpr
+from dxf2kicad_common.sexpr import parse_sexp, parse_terms
+
+# the cases of tests/sexpr_demo.py
+SEXP = ''' ( ( data "quoted data" "123" "4.5" "4." ".5" "." "-123" "-4.5" "-4." "-.5" "+123" "+4.5" "+4." "+.5")
+     (data "with \\"escaped quotes\\"" "with\nnewline" "with\rreturn")
+     (numbers 123 1.2 4. .5 -123 -1.2 +123 +1.2 (123 (4.5) )
+     (data "(more" "data)")))'''
+
+PARSED = [['data', 'quoted data', '123', '4.5', '4.', '.5', '.', '-123', '-4.5', '-4.', '-.5',
+           '+123', '+4.5', '+4.', '+.5'],
+          ['data', 'with "escaped quotes"', 'with\nnewline', 'with\rreturn'],
+          ['numbers', 123, 1.2, '4.', '.5', -123, -1.2, '+123', 1.2, [123, [4.5]],
+           ['data', '(more', 'data)']]]
+
+
+def split_off(monkeypatch):
+    # every text parsed a term at a time with term_regex
+    monkeypatch.setattr(sexpr, "_split_terms", lambda sexp: None)
+
+
+def test_parse(monkeypatch):
+    assert sexpr._split_terms(SEXP) is not None
+    assert parse_sexp(SEXP) == PARSED
+    split_off(monkeypatch)
+    assert parse_terms(SEXP) == PARSED
+
+
+def test_numbers_before_newline():
+    assert parse_sexp("(at 1.5\n-2\n)") == ["at", 1.5, -2]
+    assert parse_sexp("(xy 1 2)") == ["xy", 1, 2]
+    assert type(parse_sexp("(width 1.0)")[1]) == int
+
+
+@pytest.mark.parametrize("text", [
+    '(a 1.5(b))',              # number straight before a bracket is a string
+    '(a x"b c")',              # a quote inside a term is part of it
+    '(a b^c "^")',             # ^ is skipped outside quoted strings
+    '(a "b"c "d""e")',
+    '(a "[1, 2]" [ ] , "\\\\")',
+    '(a 1' + '0' * 400 + ')',
+    '(a "\x01" b)',
+    '(a) (b)',
+    '(a "unclosed)',
+    '(a "b\\" c "d")',
+    '(a "" b"" (c "(" ")") 1e5 +1 -.5)',
+])
+def test_same_as_regex(text, monkeypatch):
+    parsed = parse_sexp(text)
+    split_off(monkeypatch)
+    assert repr(parse_sexp(text)) == repr(parsed)
+
+
+def test_random_same_as_regex(monkeypatch):
+    rnd = random.Random(1)
+    terms = ['(', ')', ' ', '\n', 'a', '1', '-2', '1.5', '+3', '.5', '"', '\\"', '"q r"', '^', 'x(']
+    texts = ['(' + ''.join(rnd.choice(terms) for _ in range(rnd.randint(1, 12))) + ')' for _ in range(3000)]
+
+    def parse_all():
+        results = []
+        for text in texts:
+            try:
+                results.append(repr(parse_sexp(text)))
+            except (AssertionError, IndexError) as ex:
+                results.append(type(ex).__name__)
+        return results
+
+    parsed = parse_all()
+    split_off(monkeypatch)
+    assert parse_all() == parsed
+
+
+@pytest.mark.parametrize("text", ['(a (b)', '(a))', '(a "b)"'])
+def test_unbalanced(text, monkeypatch):
+    with pytest.raises(AssertionError):
+        parse_sexp(text)
+    split_off(monkeypatch)
+    with pytest.raises(AssertionError):
+        parse_sexp(text)
@@ -0,0 +1,133 @@
+import pytest
+
+from dxf2kicad_common import sexpr_table
+from dxf2kicad_common.kicad_sym import KicadLibrary
+from dxf2kicad_common.sexpr import parse_sexp
+from dxf2kicad_common.sexpr_table import SexprNode, SexprTable
+
+SEXP = ''' ( ( data "quoted data" "123" "4.5" "4." ".5" "." "-123" "-4.5" "-4." "-.5" "+123" "+4.5" "+4." "+.5")
+     (data "with \\"escaped quotes\\"" "with\nnewline" "with\rreturn")
+     (numbers 123 1.2 4. .5 -123 -1.2 +123 +1.2 (123 (4.5) )
+     (data "(more" "data)" 1.5(b) "µF" x^y)))'''
+
+LIBRARY = '''(kicad_symbol_lib (version 20201005) (generator kicad_symbol_editor)
+  (symbol "Test:R" (pin_numbers hide) (pin_names (offset 0)) (in_bom yes) (on_board yes)
+    (property "Reference" "R" (id 0) (at 2.032 0 90)
+      (effects (font (size 1.27 1.27)))
+    )
+    (property "Value" "R (\\"small\\")" (id 1) (at 0 0 90)
+      (effects (font (size 1.27 1.27)))
+    )
+    (symbol "R_0_1"
+      (rectangle (start -1.016 -2.54) (end 1.016 2.54)
+        (stroke (width 0.254)) (fill (type none))
+      )
+    )
+    (symbol "R_1_1"
+      (pin passive line (at 0 3.81 270) (length 1.27)
+        (name "~" (effects (font (size 1.27 1.27))))
+        (number "1" (effects (font (size 1.27 1.27))))
+      )
+    )
+  )
+  (symbol "Test:C" (extends "R")
+    (property "Reference" "C" (id 0) (at 0 0 0)
+      (effects (font (size 1.27 1.27)))
+    )
+  )
+  (symbol "Test:L" (power) (in_bom yes) (on_board yes)
+    (property "Reference" "L" (id 0) (at 0 0 0)
+      (effects (font (size 1.27 1.27)))
+    )
+    (symbol "L_1_1"
+      (polyline (pts (xy 0 1) (xy 0 -1)) (stroke (width 0)) (fill (type none)))
+    )
+  )
+)
+'''
+
+
+def check_node(node, value):
+    assert node.value() == value
+    terms = node.terms()
+    assert len(terms) == len(value)
+    for term, expected in zip(terms, value):
+        if isinstance(term, SexprNode):
+            check_node(term, expected)
+        else:
+            assert repr(term) == repr(expected)
+    if value and isinstance(value[0], str):
+        assert node.head == value[0]
+
+
+@pytest.mark.parametrize("text", [SEXP, LIBRARY])
+def test_same_as_parse_sexp(text):
+    table = SexprTable(text)
+    check_node(table.root, parse_sexp(text))
+
+
+@pytest.mark.parametrize("text", [SEXP, LIBRARY, '(a "b)" (c) "\\"(")'])
+def test_numpy_same_as_re(text):
+    pytest.importorskip("numpy")
+    sexpr_table._have_numpy()
+    data = text.encode('utf-8')
+    assert sexpr_table._table_numpy(data) == sexpr_table._table_re(data)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+@pytest.mark.parametrize("text", [SEXP, LIBRARY, '(a "b\\")" (c) ")\\"(")'])
+def test_numpy_chunks(text, chunk_size):
+    # groups, quoted strings and escaped quotes across the chunk edges
+    pytest.importorskip("numpy")
+    sexpr_table._have_numpy()
+    data = text.encode('utf-8')
+    assert sexpr_table._table_numpy(data, chunk_size) == sexpr_table._table_re(data)
+
+
+@pytest.mark.parametrize("text", ['(a (b)', '(a))', '(a "b)"', ')(', '(a "b) c'])
+def test_numpy_unbalanced(text):
+    pytest.importorskip("numpy")
+    sexpr_table._have_numpy()
+    assert sexpr_table._table_numpy(text.encode('utf-8'), 2) is None
+
+
+@pytest.mark.parametrize("text", ['(a (b)', '(a))', '(a "b)"', ')('])
+def test_unbalanced(text):
+    with pytest.raises(AssertionError):
+        SexprTable(text)
+    with pytest.raises(AssertionError):
+        sexpr_table._table_re(text.encode('utf-8'))
+
+
+def test_empty(tmpdir):
+    filename = str(tmpdir.join("empty.kicad_sym"))
+    open(filename, "w").close()
+    with pytest.raises(AssertionError):
+        SexprTable.from_file(filename)
+
+
+def test_children():
+    root = SexprTable(LIBRARY).root
+    assert root.head == 'kicad_symbol_lib'
+    assert [node[1] for node in root.children('symbol')] == ['Test:R', 'Test:C', 'Test:L']
+    assert root.find('version')[1] == 20201005
+    assert root.find('footprint') is None
+    resistor = root.find('symbol')
+    assert [node.head for node in resistor.children()] == ['pin_numbers', 'pin_names', 'in_bom', 'on_board',
+                                                           'property', 'property', 'symbol', 'symbol']
+    assert resistor.find('property')[2] == 'R'
+
+
+def test_library_names(tmpdir):
+    filename = str(tmpdir.join("test.kicad_sym"))
+    with open(filename, "w") as f:
+        f.write(LIBRARY)
+
+    assert KicadLibrary.names_from_file(filename) == ['R', 'C', 'L']
+
+    library = KicadLibrary.from_file(filename)
+    some = KicadLibrary.from_file(filename, names=['L', 'R'])
+    assert [symbol.name for symbol in some.symbols] == ['R', 'L']
+    assert [symbol.get_sexpr() for symbol in some.symbols] == \
+        [library.symbols[0].get_sexpr(), library.symbols[2].get_sexpr()]
+    assert KicadLibrary.from_file(filename, names=[]).symbols == []
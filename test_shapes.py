@@ -0,0 +1,52 @@
+import math
+
+import pytest
+
+from shapes import Shapes, SHAPE_ARC, SHAPE_LINES, SHAPE_POLY, matrix_scale
+
+
+def rotation(degrees, scale=1, dx=0, dy=0):
+    a = math.radians(degrees)
+    return (scale * math.cos(a), scale * math.sin(a), -scale * math.sin(a), scale * math.cos(a), dx, dy)
+
+
+def test_rotated_arc_stays_arc():
+    shapes = Shapes()
+    shapes.add_arc((0, 0), (1, 0), 90, 0.1, "0")
+    shapes.add_poly([(0, 0), (1, 0), (1, 1)], 0, "F.Cu")
+
+    result = shapes.transformed(rotation(90, 2, 10, 0), 0.005)
+    kind, layer, width, (center, start, sweep) = result.items[0]
+    assert kind == SHAPE_ARC
+    assert center == pytest.approx((10, 0))
+    assert start == pytest.approx((10, 2))
+    assert sweep == 90
+    assert width == pytest.approx(0.2)
+
+    kind, layer, width, points = result.items[1]
+    assert kind == SHAPE_POLY and layer == "F.Cu"
+    assert points[2] == pytest.approx((8, 2))
+
+
+def test_mirrored_arc_reverses():
+    shapes = Shapes()
+    shapes.add_arc((0, 0), (1, 0), 90, 0, "0")
+    shapes.add_arc((0, 0), (1, 0), 360, 0, "0")
+
+    result = shapes.transformed((-1, 0, 0, 1, 0, 0), 0.005)
+    assert result.items[0][3][2] == -90
+    assert result.items[1][3][2] == 360
+
+
+def test_non_uniform_scale_tessellates_arcs():
+    shapes = Shapes()
+    shapes.add_arc((0, 0), (1, 0), 180, 0, "0")
+
+    matrix = (3, 0, 0, 1, 0, 0)
+    assert matrix_scale(matrix) == 3
+    kind, layer, width, points = shapes.transformed(matrix, 0.005).items[0]
+    assert kind == SHAPE_LINES
+    assert points[0] == pytest.approx((3, 0))
+    assert points[-1] == pytest.approx((-3, 0))
+    for x, y in points:
+        assert (x / 3) ** 2 + y ** 2 == pytest.approx(1)
@@ -0,0 +1,102 @@
+import math
+import random
+
+import pytest
+
+import tessellate
+from tessellate import arc_points, bulge_points, arc_step_count, _arc_batch_numpy, _arc_batch_python, bulge_batch
+from segment_table import SegmentTable, segment_points
+
+needs_numpy = pytest.mark.skipif(not tessellate.have_numpy(), reason="numpy not installed")
+
+
+def random_arcs(count, seed=1):
+    rnd = random.Random(seed)
+    return ([rnd.uniform(-50, 50) for _ in range(count)],
+            [rnd.uniform(-50, 50) for _ in range(count)],
+            [rnd.uniform(0.001, 50) for _ in range(count)],
+            [rnd.uniform(-2 * math.pi, 2 * math.pi) for _ in range(count)],
+            [rnd.uniform(-2 * math.pi, 2 * math.pi) for _ in range(count)])
+
+
+def assert_same_points(a, b):
+    assert len(a) == len(b)
+    for pa, pb in zip(a, b):
+        assert len(pa) == len(pb)
+        for p, q in zip(pa, pb):
+            assert p[0] == pytest.approx(q[0], abs=1e-9)
+            assert p[1] == pytest.approx(q[1], abs=1e-9)
+
+
+def test_chord_error_within_tolerance():
+    for radius in [0.01, 0.05, 1, 100, 10000]:
+        for tolerance in [0.001, 0.005, 0.1]:
+            pts = arc_points(0, 0, radius, 0, math.pi, tolerance)
+            step = math.pi / (len(pts) - 1)
+            assert radius * (1 - math.cos(step / 2)) <= tolerance + 1e-12
+            assert step <= tessellate.MAX_ARC_STEP + 1e-12
+
+
+def test_point_count_bounded():
+    # a 100mm circle must not need more than a few hundred points
+    assert arc_step_count(100, 2 * math.pi, 0.005) < 400
+
+
+def test_bulge_direction():
+    # bulge 1 is a counter-clockwise half circle
+    pts = bulge_points((0, 0), (2, 2), 1, 0.001)
+    assert pts[0] == (0, 0)
+    assert min(math.hypot(x - 2, y) for x, y in pts) < 0.01
+    # negative bulge goes the other way
+    pts = bulge_points((0, 0), (2, 2), -1, 0.001)
+    assert min(math.hypot(x, y - 2) for x, y in pts) < 0.01
+
+
+@needs_numpy
+def test_arc_batch_matches_python():
+    arcs = random_arcs(500)
+    for tolerance in [0.001, 0.005, 0.5]:
+        assert_same_points(_arc_batch_numpy(*arcs, tolerance), _arc_batch_python(*arcs, tolerance))
+
+
+@needs_numpy
+def test_bulge_batch_matches_python():
+    rnd = random.Random(2)
+    count = 1000
+    x1 = [rnd.uniform(-10, 10) for _ in range(count)]
+    y1 = [rnd.uniform(-10, 10) for _ in range(count)]
+    x2 = [rnd.choice([x, rnd.uniform(-10, 10)]) for x in x1]
+    y2 = [rnd.choice([y, rnd.uniform(-10, 10)]) for y in y1]
+    bulge = [rnd.choice([-1, 1]) * rnd.uniform(0.001, 5) for _ in range(count)]
+
+    expected = [bulge_points((x1[j], y1[j]), (x2[j], y2[j]), bulge[j], 0.005) for j in range(count)]
+    assert_same_points(bulge_batch(x1, y1, x2, y2, bulge, 0.005), expected)
+
+
+def test_table_tessellate_matches_segment_points():
+    table = SegmentTable("0")
+    table.add_arc((1, 2), 5, 30, 300)
+    table.add_arc((0, 0), 0.3, 270, 90)
+    table.add_line((0, 0), (1, 1))
+    table.add_poly([(0, 0, 0.5), (4, 0, 0), (4, 4, -0.3), (0, 4, 1)], True, True)
+    table.add_poly([(0, 0, 0.5), (4, 0, 0), (4, 4, 2)], False, False)
+
+    expected = [segment_points(table, i, direction, 0.005)
+                for i in range(len(table)) for direction in (1, -1)]
+    table.tessellate(0.005)
+    assert_same_points([segment_points(table, i, direction, 0.005)
+                        for i in range(len(table)) for direction in (1, -1)], expected)
+
+
+def test_table_circles_share_tessellation():
+    table = SegmentTable("0")
+    table.add_circle((0, 0), 1.5)
+    table.add_circle((10, -3), 1.5)
+    table.add_circle((2, 2), 0.2)
+
+    expected = [segment_points(table, i, 1, 0.005) for i in range(len(table))]
+    table.tessellate(0.005)
+    assert len(table.circle_cache) == 2
+    assert_same_points([segment_points(table, i, 1, 0.005) for i in range(len(table))], expected)
+    for points in expected:
+        assert points[0] == points[-1]
@@ -1,6 +1,9 @@
 
 
-from sexpr import *
+# Parse an s-expression and write it back, run from the repository folder
+# with: python -m tests.sexpr_demo
+
+from dxf2kicad_common.sexpr import *
 
 sexp = ''' ( ( data "quoted data" "123" "4.5" "4." ".5" "." "-123" "-4.5" "-4." "-.5" "+123" "+4.5" "+4." "+.5")
      (data "with \\"escaped quotes\\"" "with\nnewline" "with\rreturn")